@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import gzip
+import math
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from functools import cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from gutenberg_dl.epub import wrap_chapter_html, write_epub
+from gutenberg_dl.models import BookMetadata, Chapter, ImageAsset
+
+BOOK_PATH = "/authors/bench/books/buch/"
+EPUB_PATH = "/ebooks/4711.epub3.images"
+
+
+@dataclass(frozen=True)
+class SiteConfig:
+    chapters: int = 50
+    paragraphs: int = 40
+    images_per_chapter: int = 2
+    image_size: int = 64 * 1024
+    latency: float = 0.0
+    epub_chapters: int = 50
+    gzip: bool = False
+
+
+class MockSite:
+    """Serve a synthetic Projekt Gutenberg book and a gutenberg.org EPUB.
+
+    Every response is built up front, so the measured time is spent in the
+    client. ``latency`` seconds are slept before each response to simulate
+    a remote server. Each chapter has its own images plus one image that is
+    shared by all chapters. With ``gzip`` HTML pages are sent gzip-encoded to
+    clients that accept it.
+    """
+
+    def __init__(self, config: SiteConfig) -> None:
+        self.config = config
+        self.requests = 0
+        self._pages: dict[str, tuple[str, bytes]] = {}
+        self._gzipped: dict[str, bytes] = {}
+        self._build_pages()
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                site.requests += 1
+                if site.config.latency:
+                    time.sleep(site.config.latency)
+                page = site._pages.get(self.path)
+                if page is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                content_type, body = page
+                accepted = self.headers.get("Accept-Encoding", "")
+                encoded = site._gzipped.get(self.path)
+                self.send_response(200)
+                if encoded is not None and "gzip" in accepted:
+                    body = encoded
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, args=(0.05,), daemon=True
+        )
+
+    def __enter__(self) -> MockSite:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def url(self, path: str) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    @property
+    def book_url(self) -> str:
+        return self.url(BOOK_PATH)
+
+    @property
+    def epub_url(self) -> str:
+        return self.url(EPUB_PATH)
+
+    def chapter_pages(self) -> list[bytes]:
+        return [
+            self._pages[f"{BOOK_PATH}chapter-{index}/"][1]
+            for index in range(1, self.config.chapters + 1)
+        ]
+
+    def _build_pages(self) -> None:
+        config = self.config
+        self._pages[BOOK_PATH] = ("text/html; charset=utf-8", _book_page(config))
+        self._pages["/images/shared.png"] = ("image/png", _image(0, config))
+        for index in range(1, config.chapters + 1):
+            self._pages[f"{BOOK_PATH}chapter-{index}/"] = (
+                "text/html; charset=utf-8",
+                _chapter_page(index, config),
+            )
+            for number in range(1, config.images_per_chapter + 1):
+                self._pages[f"/images/{index}/figure-{number}.png"] = (
+                    "image/png",
+                    _image(index * 1000 + number, config),
+                )
+        self._pages[EPUB_PATH] = ("application/epub+zip", _epub_file(config))
+        if config.gzip:
+            self._gzipped = {
+                path: gzip.compress(body, compresslevel=6)
+                for path, (content_type, body) in self._pages.items()
+                if content_type.startswith("text/html")
+            }
+
+
+def _book_page(config: SiteConfig) -> bytes:
+    links = "".join(
+        f'<li><a href="chapter-{index}/">'
+        f'<span class="book-reader__chapter-title">Kapitel {index}</span></a></li>'
+        for index in range(1, config.chapters + 1)
+    )
+    return f"""<!DOCTYPE html>
+<html lang="de">
+  <body>
+    <div class="book-reader" data-gutenberg-book-id="4711">
+      <h1 class="book-reader__title">Benchmarkbuch</h1>
+      <a class="book-reader__author-link">Bench Autor</a>
+      <p class="book-reader__description">Synthetisches Buch.</p>
+      <nav class="book-reader__chapter-list"><ul>{links}</ul></nav>
+    </div>
+  </body>
+</html>
+""".encode()
+
+
+def _chapter_page(index: int, config: SiteConfig) -> bytes:
+    paragraphs = "".join(
+        f"<p>{_paragraph(index, number)}</p>\n"
+        for number in range(1, config.paragraphs + 1)
+    )
+    images = "".join(
+        f'<img src="/images/{index}/figure-{number}.png" alt="Abbildung {number}"/>\n'
+        for number in range(1, config.images_per_chapter + 1)
+    )
+    if config.images_per_chapter:
+        images += '<img src="/images/shared.png" alt="Vignette"/>\n'
+    return f"""<!DOCTYPE html>
+<html lang="de">
+  <head><script>var tracking = true;</script></head>
+  <body>
+    <h2 class="book-reader__chapter-heading">Kapitel {index}</h2>
+    <div class="book-reader__chapter-content-wrapper">
+      {images}{paragraphs}
+    </div>
+  </body>
+</html>
+""".encode()
+
+
+def _paragraph(chapter: int, number: int) -> str:
+    return (
+        f"Absatz {number} von Kapitel {chapter}: Es war einmal ein "
+        "<em>synthetischer</em> Text, der lang genug ist, um dem Parser "
+        "etwas Arbeit zu machen, mit Umlauten wie äöü und einem "
+        '<a href="#note">Verweis</a> auf eine Anmerkung. ' * 3
+    )
+
+
+def _image(seed: int, config: SiteConfig) -> bytes:
+    """Return a decodable RGB PNG of about ``image_size`` bytes.
+
+    The pixels are a noisy gradient, so re-encoding has some work to do. A
+    ``tEXt`` chunk pads the file to ``image_size`` when it comes out smaller.
+    """
+    side = max(1, math.isqrt(config.image_size // 2))
+    while True:
+        png = _png(side, random.Random(seed))
+        if len(png) <= config.image_size or side == 1:
+            break
+        side = max(1, side * 9 // 10)
+    padding = config.image_size - len(png) - 12 - len(b"Comment\0")
+    if padding > 0:
+        text = _png_chunk(b"tEXt", b"Comment\0" + b"x" * padding)
+        png = png[:-12] + text + png[-12:]
+    return png
+
+
+def _png(side: int, rng: random.Random) -> bytes:
+    base = _gradient(side)
+    mask = int.from_bytes(b"\x1f" * len(base), "big")
+    noise = int.from_bytes(rng.randbytes(len(base)), "big") & mask
+    pixels = (int.from_bytes(base, "big") ^ noise).to_bytes(len(base), "big")
+    stride = side * 3
+    rows = b"".join(
+        b"\0" + pixels[start : start + stride]
+        for start in range(0, len(pixels), stride)
+    )
+    header = struct.pack(">IIBBBBB", side, side, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", header)
+        + _png_chunk(b"IDAT", zlib.compress(rows, 6))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+@cache
+def _gradient(side: int) -> bytes:
+    return bytes(
+        channel & 0xE0
+        for y in range(side)
+        for x in range(side)
+        for channel in (x + y, x * 2, y * 2)
+    )
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    crc = zlib.crc32(kind + data)
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+
+def _epub_file(config: SiteConfig) -> bytes:
+    metadata = BookMetadata(
+        title="Benchmark EPUB",
+        author="Bench Autor",
+        language="en",
+        identifier="bench-4711",
+        description=None,
+        source_url="https://www.gutenberg.org/ebooks/4711",
+    )
+    items: list[Chapter | ImageAsset] = [
+        ImageAsset(
+            url=f"images/{index}.png",
+            file_name=f"images/{index}.png",
+            media_type="image/png",
+            content=_image(index, config),
+        )
+        for index in range(1, config.epub_chapters + 1)
+    ]
+    items.extend(
+        Chapter(
+            title=f"Chapter {index}",
+            html=wrap_chapter_html(
+                f"Chapter {index}",
+                "".join(
+                    f"<p>{_paragraph(index, number)}</p>"
+                    for number in range(1, config.paragraphs + 1)
+                ),
+                "en",
+            ),
+            file_name=f"chapter_{index}.xhtml",
+        )
+        for index in range(1, config.epub_chapters + 1)
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_epub(os.path.join(directory, "bench.epub"), metadata, items)
+        with open(path, "rb") as handle:
+            return handle.read()
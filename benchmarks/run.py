@@ -0,0 +1,263 @@
+"""Offline benchmarks for gutenberg-dl.
+
+Run with ``python -m benchmarks.run``. A local mock server serves a synthetic
+Projekt Gutenberg book and a gutenberg.org EPUB, so the numbers do not depend
+on the network and can be compared between commits.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+import click
+
+from gutenberg_dl.epub import build_epub, write_epub
+from gutenberg_dl.models import Book
+from gutenberg_dl.net import HttpSession
+from gutenberg_dl.sources import download_epub, fetch_book, stream_book
+from gutenberg_dl.sources.projekt import CHAPTER_PARSERS, _parse_chapter
+
+from .mock_site import BOOK_PATH, MockSite, SiteConfig
+
+
+@dataclass(frozen=True)
+class Measurement:
+    name: str
+    best: float
+    median: float
+    cpu: float
+    peak_memory: int
+
+
+def measure(name: str, func: Callable[[], object], repeat: int) -> Measurement:
+    """Time ``func`` ``repeat`` times, then run it once more to record the
+    peak traced memory. Memory tracing slows Python down, so it is kept out
+    of the timed runs. ``cpu`` is the lowest CPU time of this process in one
+    run; work done in worker processes is not included.
+    """
+    timings: list[float] = []
+    cpu_times: list[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        func()
+        cpu_times.append(time.process_time() - cpu_started)
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Measurement(
+        name=name,
+        best=min(timings),
+        median=statistics.median(timings),
+        cpu=min(cpu_times),
+        peak_memory=peak,
+    )
+
+
+def run_benchmarks(
+    config: SiteConfig,
+    repeat: int = 3,
+    jobs: int = 4,
+    image_jobs: int = 4,
+    parse_workers: int = 1,
+    parser: str = "bs4",
+) -> list[Measurement]:
+    def log(message: str) -> None:
+        pass
+
+    results: list[Measurement] = []
+    with MockSite(config) as site, tempfile.TemporaryDirectory() as directory:
+        output_path = os.path.join(directory, "book.epub")
+
+        def fetch() -> Book:
+            with HttpSession() as session:
+                return fetch_book(
+                    site.book_url,
+                    False,
+                    log,
+                    jobs=jobs,
+                    session=session,
+                    image_jobs=image_jobs,
+                    parse_workers=parse_workers,
+                    parser=parser,
+                )
+
+        def build() -> object:
+            with HttpSession() as session:
+                metadata, items = stream_book(
+                    site.book_url,
+                    False,
+                    log,
+                    jobs=jobs,
+                    session=session,
+                    image_jobs=image_jobs,
+                    parse_workers=parse_workers,
+                    parser=parser,
+                )
+                return write_epub(output_path, metadata, items)
+
+        pages = site.chapter_pages()
+        base_url = site.url(BOOK_PATH)
+
+        def parse() -> object:
+            if parse_workers <= 1:
+                return [_parse_chapter(page, base_url, False, parser) for page in pages]
+            with ProcessPoolExecutor(max_workers=parse_workers) as executor:
+                return list(
+                    executor.map(
+                        _parse_chapter,
+                        pages,
+                        [base_url] * len(pages),
+                        [False] * len(pages),
+                        [parser] * len(pages),
+                    )
+                )
+
+        book = fetch()
+
+        def write() -> object:
+            return build_epub(book, output_path)
+
+        def download() -> object:
+            with HttpSession() as session:
+                return download_epub(
+                    site.epub_url, directory + os.sep, False, log, session=session
+                )
+
+        results.append(measure("fetch_book", fetch, repeat))
+        results.append(measure("stream_and_write", build, repeat))
+        results.append(measure("parse_chapters", parse, repeat))
+        results.append(measure("write_epub", write, repeat))
+        results.append(measure("download_epub", download, repeat))
+    return results
+
+
+@click.command()
+@click.option("--chapters", type=click.IntRange(min=1), default=50, show_default=True)
+@click.option("--paragraphs", type=click.IntRange(min=1), default=40, show_default=True)
+@click.option(
+    "--images-per-chapter", type=click.IntRange(min=0), default=2, show_default=True
+)
+@click.option(
+    "--image-size",
+    type=click.IntRange(min=16),
+    default=64 * 1024,
+    show_default=True,
+    help="Size of each synthetic image in bytes.",
+)
+@click.option(
+    "--latency",
+    type=click.FloatRange(min=0),
+    default=0.0,
+    show_default=True,
+    help="Seconds the mock server waits before each response.",
+)
+@click.option(
+    "--gzip",
+    "use_gzip",
+    is_flag=True,
+    default=False,
+    help="Serve HTML pages gzip-encoded to clients that accept it.",
+)
+@click.option("--repeat", type=click.IntRange(min=1), default=3, show_default=True)
+@click.option("--jobs", type=click.IntRange(min=1), default=4, show_default=True)
+@click.option("--image-jobs", type=click.IntRange(min=1), default=4, show_default=True)
+@click.option(
+    "--parse-workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Processes parsing chapters; compare against the default of 1.",
+)
+@click.option(
+    "--parser",
+    type=click.Choice(CHAPTER_PARSERS),
+    default="bs4",
+    show_default=True,
+    help="Chapter parser used by the fetch, stream and parse benchmarks.",
+)
+@click.option(
+    "--json",
+    "json_path",
+    type=click.Path(dir_okay=False, allow_dash=True, path_type=str),
+    default=None,
+    help="Also write the results as JSON ('-' for stdout).",
+)
+def main(
+    chapters: int,
+    paragraphs: int,
+    images_per_chapter: int,
+    image_size: int,
+    latency: float,
+    use_gzip: bool,
+    repeat: int,
+    jobs: int,
+    image_jobs: int,
+    parse_workers: int,
+    parser: str,
+    json_path: str | None,
+) -> None:
+    """Measure fetch, parse and EPUB write performance against a mock server."""
+    config = SiteConfig(
+        chapters=chapters,
+        paragraphs=paragraphs,
+        images_per_chapter=images_per_chapter,
+        image_size=image_size,
+        latency=latency,
+        epub_chapters=chapters,
+        gzip=use_gzip,
+    )
+    results = run_benchmarks(
+        config,
+        repeat=repeat,
+        jobs=jobs,
+        image_jobs=image_jobs,
+        parse_workers=parse_workers,
+        parser=parser,
+    )
+
+    click.echo(
+        f"{'benchmark':<18} {'best':>9} {'median':>9} {'cpu':>9} {'peak mem':>10}",
+        err=True,
+    )
+    for result in results:
+        click.echo(
+            f"{result.name:<18} {result.best:>8.3f}s {result.median:>8.3f}s "
+            f"{result.cpu:>8.3f}s {result.peak_memory / (1024 * 1024):>7.1f}MiB",
+            err=True,
+        )
+
+    if json_path:
+        data = {
+            "config": asdict(config),
+            "repeat": repeat,
+            "jobs": jobs,
+            "image_jobs": image_jobs,
+            "parse_workers": parse_workers,
+            "parser": parser,
+            "results": [asdict(result) for result in results],
+        }
+        if json_path == "-":
+            json.dump(data, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+        else:
+            with open(json_path, "w", encoding="utf-8") as handle:
+                json.dump(data, handle, indent=2)
+                handle.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Startup time benchmark for the gutenberg-dl command line.
+
+Run with ``python -m benchmarks.startup``. Every scenario runs in a fresh
+interpreter, so the numbers include all imports a short-lived invocation
+pays for. Heavy optional modules that a scenario pulls in are listed too.
+"""
+
+from __future__ import annotations
+
+import json
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+
+import click
+
+HEAVY_MODULES = ("bs4", "ebooklib", "lxml", "rich", "PIL", "sqlite3", "cProfile")
+
+SCENARIOS = {
+    "python": "pass",
+    "import_cli": "import gutenberg_dl.cli",
+    "cli_help": (
+        "from gutenberg_dl.cli import main\n"
+        "try:\n"
+        "    main(['download', '--help'])\n"
+        "except SystemExit:\n"
+        "    pass"
+    ),
+    "gutenberg_source": (
+        "import gutenberg_dl.cli\n"
+        "from gutenberg_dl.sources.registry import detect_source\n"
+        "detect_source('https://www.gutenberg.org/ebooks/1').load()"
+    ),
+    "projekt_source": (
+        "import gutenberg_dl.cli\n"
+        "from gutenberg_dl.sources.registry import detect_source\n"
+        "detect_source('https://www.projekt-gutenberg.org/autor/buch/').load()"
+    ),
+}
+
+
+@dataclass(frozen=True)
+class StartupMeasurement:
+    name: str
+    best: float
+    median: float
+    heavy_modules: list[str]
+
+
+def heavy_modules(code: str) -> list[str]:
+    """Return the entries of ``HEAVY_MODULES`` imported by running ``code``."""
+    probe = (
+        f"{code}\nimport sys\n"
+        f"print('heavy:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", probe],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    report = output.rsplit("heavy:", 1)[-1].strip()
+    return [name for name in report.split(",") if name]
+
+
+def measure_startup(name: str, code: str, repeat: int) -> StartupMeasurement:
+    timings: list[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", code], check=True, stdout=subprocess.DEVNULL
+        )
+        timings.append(time.perf_counter() - started)
+    return StartupMeasurement(
+        name=name,
+        best=min(timings),
+        median=statistics.median(timings),
+        heavy_modules=heavy_modules(code),
+    )
+
+
+def run_startup_benchmarks(repeat: int = 5) -> list[StartupMeasurement]:
+    return [measure_startup(name, code, repeat) for name, code in SCENARIOS.items()]
+
+
+@click.command()
+@click.option("--repeat", type=click.IntRange(min=1), default=5, show_default=True)
+@click.option(
+    "--json",
+    "json_path",
+    type=click.Path(dir_okay=False, allow_dash=True, path_type=str),
+    default=None,
+    help="Also write the results as JSON ('-' for stdout).",
+)
+def main(repeat: int, json_path: str | None) -> None:
+    """Measure interpreter startup plus gutenberg-dl imports per scenario."""
+    results = run_startup_benchmarks(repeat)
+
+    click.echo(f"{'scenario':<18} {'best':>9} {'median':>9}  heavy modules", err=True)
+    for result in results:
+        click.echo(
+            f"{result.name:<18} {result.best:>8.3f}s {result.median:>8.3f}s  "
+            f"{', '.join(result.heavy_modules) or '-'}",
+            err=True,
+        )
+
+    if json_path:
+        data = {
+            "repeat": repeat,
+            "results": [asdict(result) for result in results],
+        }
+        if json_path == "-":
+            json.dump(data, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+        else:
+            with open(json_path, "w", encoding="utf-8") as handle:
+                json.dump(data, handle, indent=2)
+                handle.write("\n")
+
+
+if __name__ == "__main__":
+    main()
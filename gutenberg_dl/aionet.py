@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import asyncio
+import http.client
+import io
+import os
+import ssl
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from urllib.error import HTTPError
+from urllib.parse import urljoin, urlsplit
+
+from .net import (
+    CHUNK_SIZE,
+    DEFAULT_ACCEPT,
+    DEFAULT_USER_AGENT,
+    MAX_REDIRECTS,
+    REDIRECT_STATUSES,
+    DownloadedFile,
+    FetchResult,
+    SessionStats,
+)
+from .ratelimit import (
+    DEFAULT_MAX_CONNECTIONS,
+    RetryBudget,
+    RetryPolicy,
+    parse_retry_after,
+)
+
+MAX_HEADER_BYTES = 64 * 1024
+RETRY_ERRORS = (ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError)
+
+_PoolKey = tuple[str, str, int]
+
+
+class _Connection:
+    def __init__(
+        self, key: _PoolKey, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.key = key
+        self.reader = reader
+        self.writer = writer
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class AsyncHttpResponse:
+    """Response whose body is read from the connection on demand."""
+
+    def __init__(
+        self,
+        status: int,
+        reason: str,
+        headers: http.client.HTTPMessage,
+        final_url: str,
+        conn: _Connection,
+        timeout: float,
+    ) -> None:
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.final_url = final_url
+        self._conn = conn
+        self._timeout = timeout
+        encoding = (headers.get("Transfer-Encoding") or "").lower()
+        self._chunked = "chunked" in encoding
+        length = headers.get("Content-Length")
+        self._remaining: int | None = None
+        if status in (204, 304) or 100 <= status < 200:
+            self._remaining = 0
+        elif not self._chunked and length is not None and length.isdigit():
+            self._remaining = int(length)
+        self._chunk_left = 0
+        self.complete = self._remaining == 0
+        connection = (headers.get("Connection") or "").lower()
+        self.will_close = "close" in connection or (
+            not self._chunked and self._remaining is None
+        )
+
+    @property
+    def content_type(self) -> str | None:
+        return self.headers.get("Content-Type")
+
+    async def read(self, amt: int | None = None) -> bytes:
+        if amt is None:
+            parts: list[bytes] = []
+            while True:
+                chunk = await self.read(64 * 1024)
+                if not chunk:
+                    return b"".join(parts)
+                parts.append(chunk)
+        if self.complete:
+            return b""
+        return await asyncio.wait_for(self._read_some(amt), self._timeout)
+
+    async def _read_some(self, amt: int) -> bytes:
+        reader = self._conn.reader
+        if self._chunked:
+            if self._chunk_left == 0:
+                line = await reader.readline()
+                if not line.endswith(b"\n"):
+                    # The connection closed before the next chunk header.
+                    raise asyncio.IncompleteReadError(line, None)
+                try:
+                    size = int(line.split(b";", 1)[0].strip(), 16)
+                except ValueError:
+                    raise ConnectionError(f"Malformed chunk size: {line!r}") from None
+                if size == 0:
+                    while (await reader.readline()).strip():
+                        pass
+                    self.complete = True
+                    return b""
+                self._chunk_left = size
+            data = await reader.readexactly(min(amt, self._chunk_left))
+            self._chunk_left -= len(data)
+            if self._chunk_left == 0:
+                await reader.readexactly(2)
+            return data
+        if self._remaining is None:
+            data = await reader.read(amt)
+            if not data:
+                self.complete = True
+            return data
+        data = await reader.readexactly(min(amt, self._remaining))
+        self._remaining -= len(data)
+        if self._remaining == 0:
+            self.complete = True
+        return data
+
+
+class AsyncHttpSession:
+    """Non-blocking counterpart of :class:`gutenberg_dl.net.HttpSession`.
+
+    Keep-alive connections are pooled per scheme, host and port and at most
+    ``max_connections_per_host`` requests run against one host at a time.
+    Redirects are followed, and the same :class:`RetryPolicy` as in the
+    blocking session is applied. Proxies and the response cache are not
+    supported.
+    """
+
+    def __init__(
+        self,
+        max_connections_per_host: int = DEFAULT_MAX_CONNECTIONS,
+        user_agent: str = DEFAULT_USER_AGENT,
+        retry: RetryPolicy | None = None,
+    ) -> None:
+        self.max_connections_per_host = max_connections_per_host
+        self.user_agent = user_agent
+        self.retry = retry or RetryPolicy()
+        self.stats = SessionStats()
+        self._context = ssl.create_default_context()
+        self._idle: dict[_PoolKey, list[_Connection]] = {}
+        self._limits: dict[_PoolKey, asyncio.Semaphore] = {}
+
+    async def __aenter__(self) -> AsyncHttpSession:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        pools = list(self._idle.values())
+        self._idle.clear()
+        for pool in pools:
+            for conn in pool:
+                conn.close()
+
+    async def fetch(
+        self,
+        url: str,
+        timeout: float = 30,
+        headers: dict[str, str] | None = None,
+    ) -> FetchResult:
+        budget = RetryBudget(self.retry)
+        while True:
+            try:
+                async with self.open(
+                    url, timeout=timeout, headers=headers, budget=budget
+                ) as response:
+                    content = await response.read()
+                break
+            except RETRY_ERRORS:
+                if budget.exhausted:
+                    raise
+                await asyncio.sleep(budget.delay())
+                budget.attempt += 1
+        return FetchResult(
+            content=content,
+            final_url=response.final_url,
+            content_type=response.content_type,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+
+    @asynccontextmanager
+    async def open(
+        self,
+        url: str,
+        timeout: float = 30,
+        headers: dict[str, str] | None = None,
+        budget: RetryBudget | None = None,
+    ) -> AsyncIterator[AsyncHttpResponse]:
+        request_headers = {"User-Agent": self.user_agent, "Accept": DEFAULT_ACCEPT}
+        if headers:
+            request_headers.update(headers)
+        budget = budget or RetryBudget(self.retry)
+
+        for _ in range(MAX_REDIRECTS + 1):
+            response = await self._send_retrying(url, timeout, request_headers, budget)
+            location = response.headers.get("Location")
+            if response.status in REDIRECT_STATUSES and location:
+                await response.read()
+                self._release(response)
+                url = urljoin(url, location)
+                continue
+            if response.status >= 400:
+                body = await response.read()
+                self._release(response)
+                raise HTTPError(
+                    url,
+                    response.status,
+                    response.reason,
+                    response.headers,
+                    io.BytesIO(body),
+                )
+            try:
+                yield response
+            finally:
+                self._release(response)
+            return
+
+        raise HTTPError(url, 310, "Too many redirects", http.client.HTTPMessage(), None)
+
+    async def _send_retrying(
+        self, url: str, timeout: float, headers: dict[str, str], budget: RetryBudget
+    ) -> AsyncHttpResponse:
+        while True:
+            try:
+                response = await self._send(url, timeout, headers)
+            except RETRY_ERRORS:
+                if budget.exhausted:
+                    raise
+                await asyncio.sleep(budget.delay())
+                budget.attempt += 1
+                continue
+            if response.status not in self.retry.statuses:
+                return response
+            if budget.exhausted:
+                return response
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            await response.read()
+            self._release(response)
+            await asyncio.sleep(budget.delay(retry_after))
+            budget.attempt += 1
+
+    async def _send(
+        self, url: str, timeout: float, headers: dict[str, str]
+    ) -> AsyncHttpResponse:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {url}")
+        host = parts.hostname or ""
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, host, port)
+        target = parts.path or "/"
+        if parts.query:
+            target = f"{target}?{parts.query}"
+        host_header = host if parts.port is None else f"{host}:{port}"
+        lines = [f"GET {target} HTTP/1.1", f"Host: {host_header}"]
+        # Bodies are not decoded, so identity replaces any caller preference.
+        lines.extend(
+            f"{name}: {value}"
+            for name, value in headers.items()
+            if name.lower() != "accept-encoding"
+        )
+        lines.append("Accept-Encoding: identity")
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+        limit = self._limits.setdefault(
+            key, asyncio.Semaphore(self.max_connections_per_host)
+        )
+        await limit.acquire()
+        try:
+            conn = self._acquire(key)
+            reused = conn is not None
+            if conn is None:
+                conn = await self._connect(key, timeout)
+            try:
+                response = await self._request(conn, request, url, timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                conn.close()
+                if not reused:
+                    raise
+                conn = await self._connect(key, timeout)
+                try:
+                    response = await self._request(conn, request, url, timeout)
+                except BaseException:
+                    conn.close()
+                    raise
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            limit.release()
+            raise
+        self.stats.requests += 1
+        return response
+
+    async def _request(
+        self, conn: _Connection, request: bytes, url: str, timeout: float
+    ) -> AsyncHttpResponse:
+        conn.writer.write(request)
+        await conn.writer.drain()
+        head = await asyncio.wait_for(_read_head(conn.reader), timeout)
+        status_line, _, header_block = head.partition(b"\r\n")
+        version, status, reason = (status_line.decode("latin-1").split(" ", 2) + [""])[
+            :3
+        ]
+        if not version.startswith("HTTP/") or not status.isdigit():
+            raise ConnectionError(f"Malformed status line from {url}")
+        headers = http.client.parse_headers(io.BytesIO(header_block))
+        return AsyncHttpResponse(
+            int(status), reason.strip(), headers, url, conn, timeout
+        )
+
+    def _acquire(self, key: _PoolKey) -> _Connection | None:
+        pool = self._idle.get(key)
+        while pool:
+            conn = pool.pop()
+            if not conn.writer.is_closing() and not conn.reader.at_eof():
+                self.stats.connections_reused += 1
+                return conn
+            conn.close()
+        return None
+
+    async def _connect(self, key: _PoolKey, timeout: float) -> _Connection:
+        scheme, host, port = key
+        context = self._context if scheme == "https" else None
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=context), timeout
+        )
+        self.stats.connections_opened += 1
+        return _Connection(key, reader, writer)
+
+    def _release(self, response: AsyncHttpResponse) -> None:
+        conn = response._conn
+        self._limits[conn.key].release()
+        if response.will_close or not response.complete:
+            conn.close()
+            return
+        pool = self._idle.setdefault(conn.key, [])
+        if len(pool) < self.max_connections_per_host:
+            pool.append(conn)
+        else:
+            conn.close()
+
+
+async def download_file_async(
+    url: str,
+    dest_path: str,
+    session: AsyncHttpSession,
+    timeout: float = 60,
+) -> DownloadedFile:
+    """Stream ``url`` to ``dest_path`` through a ``.part`` file.
+
+    File writes run in the loop's default executor.
+    """
+    loop = asyncio.get_running_loop()
+    part_path = f"{dest_path}.part"
+    size = 0
+    try:
+        async with session.open(url, timeout=timeout) as response:
+            handle = await loop.run_in_executor(None, open, part_path, "wb")
+            try:
+                while True:
+                    chunk = await response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    await loop.run_in_executor(None, handle.write, chunk)
+                    size += len(chunk)
+            finally:
+                handle.close()
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    os.replace(part_path, dest_path)
+    return DownloadedFile(
+        path=dest_path,
+        final_url=response.final_url,
+        content_type=response.content_type,
+        size=size,
+        resumed=False,
+    )
+
+
+async def _read_head(reader: asyncio.StreamReader) -> bytes:
+    head = await reader.readuntil(b"\r\n\r\n")
+    if len(head) > MAX_HEADER_BYTES:
+        raise ConnectionError("Response header too large")
+    return head[:-2]
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections import deque
+from collections.abc import Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from typing import Callable, TextIO
+from urllib.parse import urlparse
+
+
+@dataclass(frozen=True)
+class BookResult:
+    url: str
+    ok: bool
+    output_path: str | None
+    bytes: int
+    elapsed: float
+    error: str | None
+
+
+def read_url_list(handle: TextIO) -> list[str]:
+    urls: list[str] = []
+    for line in handle:
+        value = line.strip()
+        if value and not value.startswith("#"):
+            urls.append(value)
+    return urls
+
+
+def run_batch(
+    urls: Iterable[str],
+    process: Callable[[str], str],
+    workers: int = 4,
+    per_host: int = 2,
+) -> list[BookResult]:
+    """Run ``process`` for every URL on a thread pool.
+
+    At most ``per_host`` books from the same host are processed at once.
+    ``process`` returns the output path; any exception it raises is recorded
+    as a failure for that URL. Results are returned in input order.
+    """
+    pending = deque(enumerate(urls))
+    results: dict[int, BookResult] = {}
+    running: dict[Future[BookResult], tuple[int, str]] = {}
+    host_load: dict[str, int] = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            for _ in range(len(pending)):
+                if len(running) >= workers:
+                    break
+                index, url = pending.popleft()
+                host = urlparse(url).netloc.lower()
+                if host_load.get(host, 0) >= per_host:
+                    pending.append((index, url))
+                    continue
+                host_load[host] = host_load.get(host, 0) + 1
+                future = executor.submit(_run_one, url, process)
+                running[future] = (index, host)
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, host = running.pop(future)
+                host_load[host] -= 1
+                results[index] = future.result()
+
+    return [results[index] for index in sorted(results)]
+
+
+def write_summary(
+    results: list[BookResult], handle: TextIO, elapsed: float | None = None
+) -> None:
+    summary = {
+        "succeeded": sum(1 for result in results if result.ok),
+        "failed": sum(1 for result in results if not result.ok),
+        "bytes": sum(result.bytes for result in results),
+        "elapsed": elapsed,
+        "books": [asdict(result) for result in results],
+    }
+    json.dump(summary, handle, indent=2)
+    handle.write("\n")
+
+
+def _run_one(url: str, process: Callable[[str], str]) -> BookResult:
+    started = time.perf_counter()
+    try:
+        output_path = process(url)
+    except Exception as exc:
+        return BookResult(
+            url=url,
+            ok=False,
+            output_path=None,
+            bytes=0,
+            elapsed=time.perf_counter() - started,
+            error=str(exc) or type(exc).__name__,
+        )
+    return BookResult(
+        url=url,
+        ok=True,
+        output_path=output_path,
+        bytes=os.path.getsize(output_path),
+        elapsed=time.perf_counter() - started,
+        error=None,
+    )
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import os
+from collections.abc import Iterable
+from typing import Callable
+
+from .epub import DEFAULT_COMPRESS_LEVEL
+from .events import EventHandler
+from .formats import format_paths, write_formats
+from .images import ImageOptimizer, ImageOptions
+from .models import BookMetadata, Chapter, ImageAsset
+from .sources.projekt import stream_book, sync_book
+from .sources.registry import BuildOptions
+from .utils import make_book_filename, resolve_output_path, slugify
+
+
+def build_projekt_epub(
+    url: str, options: BuildOptions, log: Callable[[str], None]
+) -> str:
+    """Registry handler for projekt-gutenberg.org URLs."""
+    out_path = options.out_path
+    debug_dir = None
+    if options.debug:
+        base_dir = os.getcwd()
+        if out_path and os.path.isdir(out_path):
+            base_dir = out_path
+        elif out_path:
+            base_dir = os.path.dirname(out_path) or base_dir
+        debug_dir = os.path.join(base_dir, "gutenberg-dl-debug", slugify(url))
+        log(f"Writing debug files to {debug_dir}")
+
+    if options.sync and options.work_dir:
+        result = sync_book(
+            url,
+            options.no_images,
+            log,
+            options.work_dir,
+            debug_dir=debug_dir,
+            jobs=options.jobs,
+            session=options.session,
+            image_jobs=options.image_jobs,
+            on_event=options.on_event,
+            parse_workers=options.parse_workers,
+            parser=options.parser,
+        )
+        default_name = make_book_filename(result.metadata.author, result.metadata.title)
+        output_path = resolve_output_path(out_path, default_name)
+        output_paths = format_paths(output_path, options.formats)
+        first_path = next(iter(output_paths.values()))
+        if result.up_to_date and all(map(os.path.exists, output_paths.values())):
+            log(f"No chapters changed; keeping {first_path}")
+            return first_path
+        write_book(
+            output_path,
+            result.metadata,
+            result.items,
+            options.image_options,
+            log,
+            options.on_event,
+            options.compress_level,
+            options.formats,
+        )
+        result.commit()
+        return first_path
+
+    metadata, items = stream_book(
+        url,
+        options.no_images,
+        log,
+        debug_dir=debug_dir,
+        jobs=options.jobs,
+        session=options.session,
+        image_jobs=options.image_jobs,
+        work_dir=options.work_dir,
+        resume=options.resume,
+        on_event=options.on_event,
+        parse_workers=options.parse_workers,
+        parser=options.parser,
+    )
+    default_name = make_book_filename(metadata.author, metadata.title)
+    output_path = resolve_output_path(out_path, default_name)
+    return write_book(
+        output_path,
+        metadata,
+        items,
+        options.image_options,
+        log,
+        options.on_event,
+        options.compress_level,
+        options.formats,
+    )
+
+
+def write_book(
+    output_path: str,
+    metadata: BookMetadata,
+    items: Iterable[Chapter | ImageAsset],
+    image_options: ImageOptions | None,
+    log: Callable[[str], None],
+    on_event: EventHandler | None = None,
+    compress_level: int = DEFAULT_COMPRESS_LEVEL,
+    formats: tuple[str, ...] = ("epub",),
+) -> str:
+    """Write the book in every requested format and return the first path.
+
+    The EPUB keeps ``output_path``; other formats replace its extension.
+    """
+    output_paths = format_paths(output_path, formats)
+    if image_options is None:
+        write_formats(output_paths, metadata, items, on_event, compress_level)
+    else:
+        with ImageOptimizer(image_options) as optimizer:
+            write_formats(
+                output_paths,
+                metadata,
+                optimizer.process(items),
+                on_event,
+                compress_level,
+            )
+        stats = optimizer.stats
+        if stats.images:
+            log(
+                f"Optimized {stats.optimized}/{stats.images} images: "
+                f"{stats.bytes_before / 1024:.0f} KiB -> "
+                f"{stats.bytes_after / 1024:.0f} KiB"
+            )
+    first_path, *other_paths = output_paths.values()
+    for path in other_paths:
+        log(f"Wrote {path}")
+    return first_path
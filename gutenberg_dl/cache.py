@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+from .utils import atomic_write
+
+DEFAULT_CACHE_SIZE = 1024 * 1024 * 1024
+EVICTION_LOCK_TIMEOUT = 60.0
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    url: str
+    final_url: str
+    content_type: str | None
+    etag: str | None
+    last_modified: str | None
+    digest: str
+    size: int
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """Persistent HTTP response cache shared by concurrent processes.
+
+    Bodies are stored once per SHA-256 digest under ``objects/`` and each URL
+    has a small JSON entry under ``entries/``. Every file is written to a
+    temporary name and renamed into place, so readers never see partial data.
+    The modification time of an entry records its last use for LRU eviction.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_SIZE) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries_dir = os.path.join(directory, "entries")
+        self._objects_dir = os.path.join(directory, "objects")
+        os.makedirs(self._entries_dir, exist_ok=True)
+        os.makedirs(self._objects_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size_estimate: int | None = None
+
+    def lookup(self, url: str) -> CacheEntry | None:
+        path = self._entry_path(url)
+        try:
+            with open(path, encoding="utf-8") as handle:
+                data = json.load(handle)
+            entry = CacheEntry(**data)
+        except (OSError, ValueError, TypeError):
+            return None
+        if entry.url != url:
+            return None
+        return entry
+
+    def read(self, entry: CacheEntry) -> bytes | None:
+        try:
+            with open(self._object_path(entry.digest), "rb") as handle:
+                content = handle.read()
+        except OSError:
+            return None
+        if hashlib.sha256(content).hexdigest() != entry.digest:
+            return None
+        self._touch(self._entry_path(entry.url))
+        return content
+
+    def store(
+        self,
+        url: str,
+        final_url: str,
+        content: bytes,
+        content_type: str | None,
+        etag: str | None,
+        last_modified: str | None,
+    ) -> CacheEntry | None:
+        if not etag and not last_modified:
+            return None
+        if len(content) > self.max_bytes:
+            return None
+        digest = hashlib.sha256(content).hexdigest()
+        entry = CacheEntry(
+            url=url,
+            final_url=final_url,
+            content_type=content_type,
+            etag=etag,
+            last_modified=last_modified,
+            digest=digest,
+            size=len(content),
+        )
+        object_path = self._object_path(digest)
+        added = 0
+        if not os.path.exists(object_path):
+            atomic_write(object_path, content)
+            added = len(content)
+        atomic_write(self._entry_path(url), json.dumps(asdict(entry)).encode("utf-8"))
+
+        with self._lock:
+            if self._size_estimate is None:
+                self._size_estimate = self._disk_usage()
+            else:
+                self._size_estimate += added
+            over_limit = self._size_estimate > self.max_bytes
+        if over_limit:
+            self.evict()
+        return entry
+
+    def evict(self) -> None:
+        lock_path = os.path.join(self.directory, "evict.lock")
+        if not _try_lock(lock_path):
+            return
+        try:
+            entries = self._list_entries()
+            entries.sort(key=lambda item: item[0])
+            referenced: dict[str, int] = {}
+            for _, _, entry in entries:
+                referenced[entry.digest] = entry.size
+            total = sum(referenced.values())
+            remaining: dict[str, int] = {}
+            for _, _, entry in entries:
+                remaining[entry.digest] = remaining.get(entry.digest, 0) + 1
+
+            for _, path, entry in entries:
+                if total <= self.max_bytes:
+                    break
+                _remove(path)
+                remaining[entry.digest] -= 1
+                if remaining[entry.digest] == 0:
+                    total -= entry.size
+
+            live = {digest for digest, count in remaining.items() if count}
+            for name, path in self._list_objects():
+                if name not in live:
+                    _remove(path)
+            with self._lock:
+                self._size_estimate = total
+        finally:
+            _remove(lock_path)
+
+    def _list_entries(self) -> list[tuple[float, str, CacheEntry]]:
+        entries: list[tuple[float, str, CacheEntry]] = []
+        for root, _, files in os.walk(self._entries_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    mtime = os.stat(path).st_mtime
+                    with open(path, encoding="utf-8") as handle:
+                        entry = CacheEntry(**json.load(handle))
+                except (OSError, ValueError, TypeError):
+                    _remove(path)
+                    continue
+                entries.append((mtime, path, entry))
+        return entries
+
+    def _list_objects(self) -> list[tuple[str, str]]:
+        objects: list[tuple[str, str]] = []
+        cutoff = time.time() - EVICTION_LOCK_TIMEOUT
+        for root, _, files in os.walk(self._objects_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.startswith(".tmp"):
+                    try:
+                        if os.stat(path).st_mtime < cutoff:
+                            _remove(path)
+                    except OSError:
+                        pass
+                    continue
+                objects.append((name, path))
+        return objects
+
+    def _disk_usage(self) -> int:
+        total = 0
+        for _, path in self._list_objects():
+            try:
+                total += os.stat(path).st_size
+            except OSError:
+                continue
+        return total
+
+    def _entry_path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self._entries_dir, key[:2], f"{key}.json")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self._objects_dir, digest[:2], digest)
+
+    def _touch(self, path: str) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+
+def _try_lock(path: str) -> bool:
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            stale = os.stat(path).st_mtime < time.time() - EVICTION_LOCK_TIMEOUT
+        except OSError:
+            return False
+        if stale:
+            _remove(path)
+        return False
+    os.close(fd)
+    return True
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
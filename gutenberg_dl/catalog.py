@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import hashlib
+import io
+import sqlite3
+from collections.abc import Iterable, Iterator
+from contextlib import closing
+from dataclasses import dataclass
+from typing import TextIO
+
+DEFAULT_CATALOG_DB = "gutenberg-catalog.sqlite"
+EBOOK_URL_TEMPLATE = "https://www.gutenberg.org/ebooks/{id}"
+INGEST_BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    type TEXT,
+    issued TEXT,
+    title TEXT,
+    language TEXT,
+    authors TEXT,
+    subjects TEXT,
+    locc TEXT,
+    bookshelves TEXT,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS book_languages (
+    book_id INTEGER NOT NULL REFERENCES books(id) ON DELETE CASCADE,
+    language TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS book_authors (
+    book_id INTEGER NOT NULL REFERENCES books(id) ON DELETE CASCADE,
+    author TEXT NOT NULL COLLATE NOCASE
+);
+CREATE TABLE IF NOT EXISTS book_subjects (
+    book_id INTEGER NOT NULL REFERENCES books(id) ON DELETE CASCADE,
+    subject TEXT NOT NULL COLLATE NOCASE
+);
+CREATE INDEX IF NOT EXISTS book_languages_language
+    ON book_languages(language, book_id);
+CREATE INDEX IF NOT EXISTS book_languages_book ON book_languages(book_id);
+CREATE INDEX IF NOT EXISTS book_authors_author ON book_authors(author, book_id);
+CREATE INDEX IF NOT EXISTS book_authors_book ON book_authors(book_id);
+CREATE INDEX IF NOT EXISTS book_subjects_subject
+    ON book_subjects(subject, book_id);
+CREATE INDEX IF NOT EXISTS book_subjects_book ON book_subjects(book_id);
+"""
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    id: int
+    type: str
+    issued: str
+    title: str
+    languages: list[str]
+    authors: list[str]
+    subjects: list[str]
+    locc: str
+    bookshelves: str
+
+    @property
+    def url(self) -> str:
+        return EBOOK_URL_TEMPLATE.format(id=self.id)
+
+
+@dataclass(frozen=True)
+class IngestResult:
+    added: int
+    updated: int
+    unchanged: int
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def open_catalog_file(path: str) -> TextIO:
+    """Open ``pg_catalog.csv`` or its gzip-compressed form for streaming."""
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def read_catalog_csv(handle: TextIO) -> Iterator[CatalogEntry]:
+    """Yield entries of the Project Gutenberg ``pg_catalog.csv`` one by one."""
+    for row in csv.DictReader(handle):
+        raw_id = (row.get("Text#") or "").strip()
+        if not raw_id.isdigit():
+            continue
+        yield CatalogEntry(
+            id=int(raw_id),
+            type=(row.get("Type") or "").strip(),
+            issued=(row.get("Issued") or "").strip(),
+            title=(row.get("Title") or "").strip(),
+            languages=_split(row.get("Language")),
+            authors=_split(row.get("Authors")),
+            subjects=_split(row.get("Subjects")),
+            locc=(row.get("LoCC") or "").strip(),
+            bookshelves=(row.get("Bookshelves") or "").strip(),
+        )
+
+
+def ingest(conn: sqlite3.Connection, entries: Iterable[CatalogEntry]) -> IngestResult:
+    """Insert or update catalog entries in batches.
+
+    Each row stores a digest of its fields, so re-ingesting a newer dump only
+    rewrites the books that changed. Books missing from the dump are kept.
+    """
+    added = updated = unchanged = 0
+    batch: list[CatalogEntry] = []
+
+    def flush() -> None:
+        nonlocal added, updated, unchanged
+        ids = [entry.id for entry in batch]
+        placeholders = ",".join("?" * len(ids))
+        known = dict(
+            conn.execute(
+                f"SELECT id, digest FROM books WHERE id IN ({placeholders})", ids
+            ).fetchall()
+        )
+        with conn:
+            for entry in batch:
+                digest = _digest(entry)
+                old = known.get(entry.id)
+                if old == digest:
+                    unchanged += 1
+                    continue
+                if old is None:
+                    added += 1
+                else:
+                    updated += 1
+                    conn.execute("DELETE FROM books WHERE id = ?", (entry.id,))
+                _insert(conn, entry, digest)
+        batch.clear()
+
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= INGEST_BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+    return IngestResult(added=added, updated=updated, unchanged=unchanged)
+
+
+def ingest_file(db_path: str, catalog_path: str) -> IngestResult:
+    with closing(connect(db_path)) as conn, open_catalog_file(catalog_path) as handle:
+        return ingest(conn, read_catalog_csv(handle))
+
+
+def query_ids(
+    conn: sqlite3.Connection,
+    language: str | None = None,
+    author: str | None = None,
+    subject: str | None = None,
+    book_type: str | None = "Text",
+    limit: int | None = None,
+) -> Iterator[int]:
+    """Yield IDs of matching books in ascending order.
+
+    ``language`` must match a language code exactly; ``author`` and
+    ``subject`` match case-insensitively anywhere in the name.
+    """
+    clauses: list[str] = []
+    params: list[object] = []
+    if language:
+        clauses.append("id IN (SELECT book_id FROM book_languages WHERE language = ?)")
+        params.append(language.lower())
+    if author:
+        clauses.append("id IN (SELECT book_id FROM book_authors WHERE author LIKE ?)")
+        params.append(f"%{author}%")
+    if subject:
+        clauses.append("id IN (SELECT book_id FROM book_subjects WHERE subject LIKE ?)")
+        params.append(f"%{subject}%")
+    if book_type:
+        clauses.append("type = ?")
+        params.append(book_type)
+    sql = "SELECT id FROM books"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    for (book_id,) in conn.execute(sql, params):
+        yield book_id
+
+
+def _insert(conn: sqlite3.Connection, entry: CatalogEntry, digest: str) -> None:
+    conn.execute(
+        "INSERT INTO books (id, type, issued, title, language, authors, subjects,"
+        " locc, bookshelves, digest) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            entry.id,
+            entry.type,
+            entry.issued,
+            entry.title,
+            "; ".join(entry.languages),
+            "; ".join(entry.authors),
+            "; ".join(entry.subjects),
+            entry.locc,
+            entry.bookshelves,
+            digest,
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO book_languages (book_id, language) VALUES (?, ?)",
+        [(entry.id, language.lower()) for language in entry.languages],
+    )
+    conn.executemany(
+        "INSERT INTO book_authors (book_id, author) VALUES (?, ?)",
+        [(entry.id, author) for author in entry.authors],
+    )
+    conn.executemany(
+        "INSERT INTO book_subjects (book_id, subject) VALUES (?, ?)",
+        [(entry.id, subject) for subject in entry.subjects],
+    )
+
+
+def _digest(entry: CatalogEntry) -> str:
+    fields = [
+        entry.type,
+        entry.issued,
+        entry.title,
+        *entry.languages,
+        "\x1e",
+        *entry.authors,
+        "\x1e",
+        *entry.subjects,
+        entry.locc,
+        entry.bookshelves,
+    ]
+    return hashlib.sha1("\x1f".join(fields).encode("utf-8")).hexdigest()
+
+
+def _split(value: str | None) -> list[str]:
+    if not value:
+        return []
+    return [part.strip() for part in value.split(";") if part.strip()]
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Any
+
+from .net import FetchResult
+from .utils import atomic_write, slugify
+
+DEFAULT_WORK_DIR = "gutenberg-dl-work"
+
+
+class BookCheckpoint:
+    """Store parsed chapters and downloaded images of one book on disk.
+
+    Files live under ``<work_dir>/<book identifier>/`` and are keyed by the
+    SHA-1 of the chapter or image URL. Every file is written atomically, so an
+    interrupted run leaves only complete checkpoints behind. Without
+    ``resume`` any checkpoints from an earlier run are discarded.
+    """
+
+    def __init__(self, work_dir: str, identifier: str, resume: bool = True) -> None:
+        self.directory = os.path.join(work_dir, slugify(identifier))
+        if not resume and os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def has_chapter(self, url: str) -> bool:
+        return os.path.exists(self._chapter_path(url))
+
+    def load_chapter(
+        self, url: str, no_images: bool
+    ) -> tuple[str | None, str, list[str]] | None:
+        try:
+            with open(self._chapter_path(url), encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if data.get("url") != url or data.get("no_images") != no_images:
+            return None
+        return data["title"], data["body_html"], list(data["image_urls"])
+
+    def save_chapter(
+        self,
+        url: str,
+        no_images: bool,
+        title: str | None,
+        body_html: str,
+        image_urls: list[str],
+    ) -> None:
+        data = {
+            "url": url,
+            "no_images": no_images,
+            "title": title,
+            "body_html": body_html,
+            "image_urls": image_urls,
+        }
+        atomic_write(self._chapter_path(url), json.dumps(data).encode("utf-8"))
+
+    def load_image(self, url: str) -> FetchResult | None:
+        path = self._image_path(url)
+        try:
+            with open(f"{path}.json", encoding="utf-8") as handle:
+                data = json.load(handle)
+            with open(path, "rb") as handle:
+                content = handle.read()
+        except (OSError, ValueError):
+            return None
+        if data.get("url") != url or data.get("size") != len(content):
+            return None
+        return FetchResult(
+            content=content,
+            final_url=data["final_url"],
+            content_type=data["content_type"],
+        )
+
+    def save_image(self, url: str, result: FetchResult) -> None:
+        path = self._image_path(url)
+        data = {
+            "url": url,
+            "final_url": result.final_url,
+            "content_type": result.content_type,
+            "size": len(result.content),
+        }
+        atomic_write(path, result.content)
+        atomic_write(f"{path}.json", json.dumps(data).encode("utf-8"))
+
+    def load_sync_state(self) -> dict[str, Any] | None:
+        try:
+            with open(self._sync_path(), encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        return data if isinstance(data, dict) else None
+
+    def save_sync_state(self, state: dict[str, Any]) -> None:
+        atomic_write(self._sync_path(), json.dumps(state).encode("utf-8"))
+
+    def _sync_path(self) -> str:
+        return os.path.join(self.directory, "sync.json")
+
+    def _chapter_path(self, url: str) -> str:
+        return os.path.join(self.directory, "chapters", f"{_url_key(url)}.json")
+
+    def _image_path(self, url: str) -> str:
+        return os.path.join(self.directory, "images", _url_key(url))
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
@@ -1,13 +1,29 @@
 from __future__ import annotations
 
+import json
 import os
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Callable, TextIO
 from urllib.parse import urlparse
 
 import click
 
-from .epub import build_epub
-from .sources import download_epub, fetch_book
-from .utils import make_book_filename, resolve_output_path, slugify
+from .batch import read_url_list, run_batch, write_summary
+from .cache import DEFAULT_CACHE_SIZE, ResponseCache
+from .checkpoint import DEFAULT_WORK_DIR
+from .events import Metrics, combine_handlers
+from .formats import FORMATS
+from .net import HttpSession
+from .ratelimit import DEFAULT_MAX_CONNECTIONS, RateLimiter, RetryPolicy
+from .sources.registry import BuildOptions, Source, detect_source, find_source
+
+if TYPE_CHECKING:
+    from .profiling import Profiler
+    from .progress import ProgressDisplay
 
 
 def _normalize_url(url: str) -> str:
@@ -17,73 +33,675 @@ def _normalize_url(url: str) -> str:
     return f"https://{url.lstrip('/')}"
 
 
-def _detect_source(url: str) -> str:
-    host = urlparse(url).netloc.lower()
-    if "projekt-gutenberg.org" in host:
-        return "projekt"
-    if "gutenberg.org" in host:
-        return "gutenberg"
-    raise click.ClickException(
-        "Unsupported URL. Use projekt-gutenberg.org or gutenberg.org URLs."
+def _detect_source(url: str, name: str = "auto") -> Source:
+    if name.lower() != "auto":
+        source = find_source(name)
+        if source is None:
+            raise click.BadParameter(f"Unknown source {name!r}.", param_hint="--source")
+        return source
+    source = detect_source(url)
+    if source is None:
+        raise click.ClickException(
+            "Unsupported URL. Use projekt-gutenberg.org or gutenberg.org URLs."
+        )
+    return source
+
+
+def _parse_formats(value: str) -> tuple[str, ...]:
+    formats = tuple(
+        dict.fromkeys(name.strip().lower() for name in value.split(",") if name.strip())
     )
+    unknown = [name for name in formats if name not in FORMATS]
+    if unknown or not formats:
+        raise click.BadParameter(
+            f"Expected a comma-separated list of {', '.join(FORMATS)}.",
+            param_hint="--format",
+        )
+    return formats
 
 
-def _logger(quiet: bool):
+def _logger(
+    quiet: bool, prefix: str = "", display: ProgressDisplay | None = None
+) -> Callable[[str], None]:
     def log(message: str) -> None:
-        if not quiet:
-            click.echo(message, err=True)
+        if quiet:
+            return
+        if display is not None:
+            display.print(f"{prefix}{message}")
+        else:
+            click.echo(f"{prefix}{message}", err=True)
 
     return log
 
 
-@click.command()
-@click.argument("url")
+class _DefaultGroup(click.Group):
+    """Run the ``download`` command unless a subcommand is named first."""
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        if not args or (args[0] not in self.commands and args[0] != "--help"):
+            args = ["download", *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=_DefaultGroup)
+def main() -> None:
+    """Download or build EPUB files from Gutenberg sources.
+
+    Without a command name the arguments are passed to the download command.
+    """
+
+
+@main.command("download")
+@click.argument("urls", nargs=-1)
+@click.option(
+    "--from-file",
+    "url_file",
+    type=click.File("r"),
+    default=None,
+    help="Read additional URLs from a file, one per line ('-' for stdin).",
+)
 @click.option("--out", "out_path", type=click.Path(path_type=str), default=None)
 @click.option(
     "--source",
-    type=click.Choice(["auto", "projekt", "gutenberg"], case_sensitive=False),
     default="auto",
     show_default=True,
+    help="Source backend: auto, projekt, gutenberg or one added by a plugin.",
 )
 @click.option(
     "--no-images", is_flag=True, default=False, help="Skip downloading images."
 )
 @click.option("--quiet", is_flag=True, default=False, help="Suppress progress output.")
 @click.option("--debug", is_flag=True, default=False, help="Save debug HTML output.")
-def main(
-    url: str,
+@click.option(
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of chapters to download in parallel.",
+)
+@click.option(
+    "--image-jobs",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="Number of images to download in parallel.",
+)
+@click.option(
+    "--parse-workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of processes parsing Projekt Gutenberg chapters.",
+)
+@click.option(
+    "--parser",
+    type=click.Choice(["bs4", "stream"]),
+    default="bs4",
+    show_default=True,
+    help="Projekt Gutenberg chapter parser; 'stream' skips the BeautifulSoup tree.",
+)
+@click.option(
+    "--compress-level",
+    type=click.IntRange(min=0, max=9),
+    default=6,
+    show_default=True,
+    help="Deflate level of EPUB text entries; 0 stores everything.",
+)
+@click.option(
+    "--format",
+    "output_formats",
+    default="epub",
+    show_default=True,
+    help=f"Comma-separated output formats ({', '.join(FORMATS)}), written from "
+    "one fetch.",
+)
+@click.option(
+    "--optimize-images",
+    is_flag=True,
+    default=False,
+    help="Downscale and re-encode Projekt Gutenberg images (requires Pillow).",
+)
+@click.option(
+    "--max-image-dimension",
+    type=click.IntRange(min=1),
+    default=1600,
+    show_default=True,
+    help="Longest image side in pixels with --optimize-images.",
+)
+@click.option(
+    "--jpeg-quality",
+    type=click.IntRange(min=1, max=95),
+    default=80,
+    show_default=True,
+    help="JPEG quality used by --optimize-images.",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False, path_type=str),
+    default=None,
+    envvar="GUTENBERG_DL_CACHE_DIR",
+    help="Cache HTTP responses in this directory and revalidate them on reuse.",
+)
+@click.option(
+    "--cache-size",
+    type=click.IntRange(min=1),
+    default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+    show_default=True,
+    help="Maximum size of the response cache in MiB.",
+)
+@click.option(
+    "--work-dir",
+    type=click.Path(file_okay=False, path_type=str),
+    default=None,
+    help="Checkpoint parsed chapters and images of Projekt Gutenberg books here.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help=f"Reuse checkpoints from --work-dir (default ./{DEFAULT_WORK_DIR}).",
+)
+@click.option(
+    "--sync",
+    is_flag=True,
+    default=False,
+    help="Revalidate chapters from the last build and rebuild only on changes.",
+)
+@click.option(
+    "--rate-limit",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help="Maximum requests per second to one host (default: unlimited).",
+)
+@click.option(
+    "--max-connections",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_CONNECTIONS,
+    show_default=True,
+    help="Maximum concurrent requests to one host; halved while the host "
+    "answers 429 or 503.",
+)
+@click.option(
+    "--retries",
+    type=click.IntRange(min=0),
+    default=3,
+    show_default=True,
+    help="Retry failed requests, 429 and 5xx responses this often with backoff.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="Number of books processed in parallel in batch mode.",
+)
+@click.option(
+    "--per-host",
+    type=click.IntRange(min=1),
+    default=2,
+    show_default=True,
+    help="Maximum number of books fetched from one host at a time in batch mode.",
+)
+@click.option(
+    "--stats",
+    "stats_format",
+    type=click.Choice(["text", "json"], case_sensitive=False),
+    default=None,
+    help="Report time spent in network, parsing and writing plus bytes "
+    "downloaded and throughput. 'json' writes to stdout.",
+)
+@click.option(
+    "--progress",
+    "show_progress",
+    is_flag=True,
+    default=False,
+    help="Show a live progress display with the transfer rate.",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    help="Write a cProfile report and collapsed stacks next to the output.",
+)
+@click.option(
+    "--summary",
+    "summary_path",
+    type=click.Path(dir_okay=False, allow_dash=True, path_type=str),
+    default=None,
+    help="Write a JSON summary of all processed books ('-' for stdout).",
+)
+def download(
+    urls: tuple[str, ...],
+    url_file: TextIO | None,
     out_path: str | None,
     source: str,
     no_images: bool,
     quiet: bool,
     debug: bool,
+    jobs: int,
+    image_jobs: int,
+    parse_workers: int,
+    parser: str,
+    compress_level: int,
+    output_formats: str,
+    optimize_images: bool,
+    max_image_dimension: int,
+    jpeg_quality: int,
+    cache_dir: str | None,
+    cache_size: int,
+    work_dir: str | None,
+    resume: bool,
+    sync: bool,
+    rate_limit: float | None,
+    max_connections: int,
+    retries: int,
+    workers: int,
+    per_host: int,
+    stats_format: str | None,
+    show_progress: bool,
+    profile: bool,
+    summary_path: str | None,
 ) -> None:
-    """Download or build EPUB files from Gutenberg sources."""
-    url = _normalize_url(url)
+    """Download or build EPUB files from Gutenberg sources.
+
+    Pass several URLs, or a list with --from-file, to process them in one run.
+    """
+    all_urls = [_normalize_url(url) for url in urls]
+    if url_file is not None:
+        all_urls.extend(_normalize_url(url) for url in read_url_list(url_file))
+    all_urls = list(dict.fromkeys(all_urls))
+    if not all_urls:
+        raise click.UsageError("Missing URL argument or --from-file list.")
+    if summary_path == "-" and stats_format == "json":
+        raise click.UsageError("--summary - and --stats json both write to stdout.")
+    batch = len(all_urls) > 1 or url_file is not None or summary_path is not None
+    if batch and out_path and os.path.isfile(out_path):
+        raise click.UsageError("--out must be a directory when processing many URLs.")
+    if batch and out_path and not out_path.endswith(os.sep):
+        out_path = out_path + os.sep
+
+    formats = _parse_formats(output_formats)
+    if (resume or sync) and not work_dir:
+        work_dir = DEFAULT_WORK_DIR
+
+    image_options = None
+    if optimize_images and not no_images:
+        from .images import ImageOptions
+
+        image_options = ImageOptions(
+            max_dimension=max_image_dimension, jpeg_quality=jpeg_quality
+        )
+
+    cache = None
+    if cache_dir:
+        cache = ResponseCache(cache_dir, max_bytes=cache_size * 1024 * 1024)
+
+    metrics = Metrics()
+    display = None
+    if show_progress and not quiet:
+        from .progress import ProgressDisplay
+
+        display = ProgressDisplay()
+    on_event = combine_handlers([metrics, display])
+    profiler = None
+    if profile:
+        from .profiling import Profiler
+
+        profiler = Profiler()
+    started = time.perf_counter()
+
+    session = HttpSession(
+        max_idle_per_host=max_connections,
+        cache=cache,
+        on_event=on_event,
+        retry=RetryPolicy(attempts=retries + 1),
+        rate_limiter=RateLimiter(
+            rate=rate_limit,
+            burst=max(1, round(rate_limit or 1)),
+            max_connections=max_connections,
+        ),
+    )
+    with session, _showing(display), _profiling(profiler):
+        options = BuildOptions(
+            session=session,
+            out_path=out_path,
+            no_images=no_images,
+            debug=debug,
+            jobs=jobs,
+            image_jobs=image_jobs,
+            parse_workers=parse_workers,
+            parser=parser,
+            compress_level=compress_level,
+            formats=formats,
+            work_dir=work_dir,
+            resume=resume,
+            sync=sync,
+            image_options=image_options,
+            on_event=on_event,
+        )
+
+        def process(url: str, log: Callable[[str], None]) -> str:
+            handler = _detect_source(url, source).load()
+            output_path = handler(url, options, log)
+            log(f"Saved {formats[0].upper()} to {output_path}")
+            return output_path
+
+        log = _logger(quiet, display=display)
+        if not batch:
+            output_path = process(all_urls[0], log)
+            _log_session_stats(session, log)
+            _report_stats(stats_format, metrics, session, started, log)
+            _write_profile(profiler, os.path.splitext(output_path)[0], log)
+            return
+
+        positions = {url: index for index, url in enumerate(all_urls, start=1)}
+
+        def process_logged(url: str) -> str:
+            prefix = f"[{positions[url]}/{len(all_urls)}] "
+            return process(url, _logger(quiet, prefix, display))
+
+        results = run_batch(all_urls, process_logged, workers, per_host)
+        elapsed = time.perf_counter() - started
+        for result in results:
+            if not result.ok:
+                log(f"Failed {result.url}: {result.error}")
+        failed = sum(1 for result in results if not result.ok)
+        log(
+            f"Processed {len(results)} books in {elapsed:.1f}s: "
+            f"{len(results) - failed} succeeded, {failed} failed"
+        )
+        _log_session_stats(session, log)
+        _report_stats(stats_format, metrics, session, started, log)
+        _write_profile(profiler, os.path.join(out_path or "", "gutenberg-dl"), log)
+
+    if summary_path == "-":
+        write_summary(results, sys.stdout, elapsed)
+    elif summary_path:
+        with open(summary_path, "w", encoding="utf-8") as handle:
+            write_summary(results, handle, elapsed)
+    if failed:
+        raise SystemExit(1)
+
+
+@main.group("catalog")
+def catalog_group() -> None:
+    """Select books from the Project Gutenberg offline catalog."""
+
+
+_catalog_db_option = click.option(
+    "--db",
+    "db_path",
+    type=click.Path(dir_okay=False, path_type=str),
+    default="gutenberg-catalog.sqlite",
+    show_default=True,
+    envvar="GUTENBERG_DL_CATALOG",
+    help="SQLite catalog database.",
+)
+
+
+@catalog_group.command("ingest")
+@click.argument("catalog_file", type=click.Path(exists=True, dir_okay=False))
+@_catalog_db_option
+def catalog_ingest(catalog_file: str, db_path: str) -> None:
+    """Load pg_catalog.csv (optionally .gz) into the catalog database.
+
+    Ingesting a newer dump only rewrites books whose entries changed.
+    """
+    from .catalog import ingest_file
+
+    result = ingest_file(db_path, catalog_file)
+    click.echo(
+        f"Catalog {db_path}: {result.added} added, {result.updated} updated, "
+        f"{result.unchanged} unchanged",
+        err=True,
+    )
+
+
+@catalog_group.command("query")
+@_catalog_db_option
+@click.option("--language", default=None, help="Language code, e.g. 'de'.")
+@click.option("--author", default=None, help="Part of an author name.")
+@click.option("--subject", default=None, help="Part of a subject heading.")
+@click.option(
+    "--type",
+    "book_type",
+    default="Text",
+    show_default=True,
+    help="Catalog type; pass '' to include all types.",
+)
+@click.option("--limit", type=click.IntRange(min=1), default=None)
+@click.option(
+    "--urls",
+    is_flag=True,
+    default=False,
+    help="Print ebook URLs for 'download --from-file -' instead of IDs.",
+)
+def catalog_query(
+    db_path: str,
+    language: str | None,
+    author: str | None,
+    subject: str | None,
+    book_type: str,
+    limit: int | None,
+    urls: bool,
+) -> None:
+    """Print the IDs of matching books, one per line."""
+    from .catalog import EBOOK_URL_TEMPLATE, query_ids
+    from .catalog import connect as connect_catalog
+
+    if not os.path.exists(db_path):
+        raise click.ClickException(
+            f"Catalog {db_path} does not exist; run 'catalog ingest' first."
+        )
+    conn = connect_catalog(db_path)
+    try:
+        for book_id in query_ids(
+            conn,
+            language=language,
+            author=author,
+            subject=subject,
+            book_type=book_type or None,
+            limit=limit,
+        ):
+            click.echo(EBOOK_URL_TEMPLATE.format(id=book_id) if urls else book_id)
+    finally:
+        conn.close()
+
+
+@main.command("scan")
+@click.argument(
+    "directory", type=click.Path(exists=True, file_okay=False, path_type=str)
+)
+@click.option(
+    "--index",
+    "index_path",
+    type=click.Path(dir_okay=False, path_type=str),
+    default="gutenberg-library.sqlite",
+    show_default=True,
+    help="SQLite index that caches metadata by path, size and mtime.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of processes reading EPUB files (default: CPU count).",
+)
+@click.option(
+    "--json", "as_json", is_flag=True, default=False, help="Print JSON lines."
+)
+@click.option("--quiet", is_flag=True, default=False, help="Suppress progress output.")
+def scan(
+    directory: str, index_path: str, workers: int | None, as_json: bool, quiet: bool
+) -> None:
+    """Print title, author, language and identifier of every EPUB in DIRECTORY."""
+    from .library import scan_library
+
     log = _logger(quiet)
+    result = scan_library(directory, index_path, workers=workers, log=log)
+    for entry in result.entries:
+        if as_json:
+            click.echo(json.dumps(asdict(entry), ensure_ascii=False))
+        else:
+            fields = (
+                entry.path,
+                entry.title,
+                entry.author,
+                entry.language,
+                entry.identifier,
+            )
+            click.echo("\t".join(field or "" for field in fields))
+    log(
+        f"Scanned {len(result.entries)} EPUB files: {result.scanned} read, "
+        f"{result.cached} cached, {result.removed} removed, {result.errors} errors"
+    )
+
+
+@main.command("mirror")
+@click.argument("ids", nargs=-1, required=True)
+@click.option(
+    "--dir",
+    "directory",
+    type=click.Path(file_okay=False, path_type=str),
+    default="gutenberg-mirror",
+    show_default=True,
+    help="Mirror directory; books are stored as <id>/pg<id>-images.epub.",
+)
+@click.option(
+    "--no-images", is_flag=True, default=False, help="Mirror EPUBs without images."
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="Number of books downloaded in parallel.",
+)
+@click.option(
+    "--rate-limit",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help="Maximum requests per second (default: unlimited).",
+)
+@click.option("--base-url", default="https://www.gutenberg.org", show_default=True)
+@click.option("--quiet", is_flag=True, default=False, help="Suppress progress output.")
+def mirror(
+    ids: tuple[str, ...],
+    directory: str,
+    no_images: bool,
+    workers: int,
+    rate_limit: float | None,
+    base_url: str,
+    quiet: bool,
+) -> None:
+    """Mirror Project Gutenberg EPUBs for IDS, e.g. '1-1000 1342'.
 
-    if source == "auto":
-        source = _detect_source(url)
-    else:
-        source = source.lower()
+    Unchanged books are revalidated with conditional requests and skipped.
+    """
+    from .mirror import mirror_books, parse_id_ranges
 
-    if source == "gutenberg":
-        result = download_epub(url, out_path, no_images, log)
-        log(f"Saved EPUB to {result.output_path}")
+    try:
+        book_ids = parse_id_ranges(ids)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc), param_hint="IDS") from exc
+    log = _logger(quiet)
+    limiter = RateLimiter(
+        rate=rate_limit,
+        burst=max(1, round(rate_limit or 1)),
+        max_connections=workers,
+    )
+    with HttpSession(max_idle_per_host=workers, rate_limiter=limiter) as session:
+        result = mirror_books(
+            book_ids,
+            directory,
+            no_images=no_images,
+            workers=workers,
+            session=session,
+            base_url=base_url,
+            log=log,
+        )
+    log(
+        f"Mirrored {len(book_ids)} IDs: {result.downloaded} downloaded "
+        f"({result.bytes / (1024 * 1024):.1f} MiB), {result.current} current, "
+        f"{result.missing} missing, {len(result.failed)} failed"
+    )
+    if result.failed:
+        raise SystemExit(1)
+
+
+def _log_session_stats(session: HttpSession, log: Callable[[str], None]) -> None:
+    stats = session.stats
+    log(
+        f"HTTP requests: {stats.requests}, connections opened: "
+        f"{stats.connections_opened}, reused: {stats.connections_reused} "
+        f"({stats.reuse_ratio:.0%})"
+    )
+    if session.cache is not None:
+        log(f"HTTP cache: {stats.cache_hits} responses revalidated from disk")
+    if stats.compressed_bytes:
+        log(
+            f"HTTP compression: {stats.compressed_bytes / 1024:.0f} KiB received for "
+            f"{stats.decompressed_bytes / 1024:.0f} KiB of content "
+            f"({stats.decompressed_bytes / stats.compressed_bytes:.1f}x)"
+        )
+
+
+def _report_stats(
+    stats_format: str | None,
+    metrics: Metrics,
+    session: HttpSession,
+    started: float,
+    log: Callable[[str], None],
+) -> None:
+    if stats_format is None:
+        return
+    summary = metrics.summary(time.perf_counter() - started)
+    if stats_format.lower() == "json":
+        summary["http"] = {
+            "requests": session.stats.requests,
+            "connections_opened": session.stats.connections_opened,
+            "connections_reused": session.stats.connections_reused,
+            "compressed_bytes": session.stats.compressed_bytes,
+            "decompressed_bytes": session.stats.decompressed_bytes,
+        }
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write("\n")
         return
+    throughput = summary["throughput"] or 0.0
+    log(
+        f"Time: {summary['elapsed']:.1f}s total, "
+        f"{summary['network_seconds']:.1f}s network, "
+        f"{summary['parse_seconds']:.1f}s parsing, "
+        f"{summary['write_seconds']:.1f}s writing"
+    )
+    log(
+        f"Downloaded {summary['bytes_downloaded'] / 1024:.0f} KiB "
+        f"({throughput / 1024:.0f} KiB/s), "
+        f"wrote {summary['bytes_written'] / 1024:.0f} KiB"
+    )
 
-    debug_dir = None
-    if debug:
-        base_dir = os.getcwd()
-        if out_path and os.path.isdir(out_path):
-            base_dir = out_path
-        elif out_path:
-            base_dir = os.path.dirname(out_path) or base_dir
-        debug_dir = os.path.join(base_dir, "gutenberg-dl-debug", slugify(url))
-        log(f"Writing debug files to {debug_dir}")
-
-    book = fetch_book(url, no_images, log, debug_dir=debug_dir)
-    default_name = make_book_filename(book.author, book.title)
-    output_path = resolve_output_path(out_path, default_name)
-    build_epub(book, output_path)
-    log(f"Saved EPUB to {output_path}")
+
+@contextmanager
+def _profiling(profiler: Profiler | None) -> Iterator[None]:
+    if profiler is None:
+        yield
+        return
+    with profiler:
+        yield
+
+
+def _write_profile(
+    profiler: Profiler | None, stem: str, log: Callable[[str], None]
+) -> None:
+    if profiler is None:
+        return
+    paths = profiler.write(f"{stem}.profile")
+    log(f"Wrote profile to {', '.join(paths)}")
+
+
+@contextmanager
+def _showing(display: ProgressDisplay | None) -> Iterator[None]:
+    if display is None:
+        yield
+        return
+    with display:
+        yield
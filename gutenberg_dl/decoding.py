@@ -0,0 +1,160 @@
+"""Decompression of HTTP response bodies by ``Content-Encoding``.
+
+gzip and deflate are always supported, brotli (``brotli`` or
+``brotlicffi``) and zstd (``zstandard``) when the package is installed. Bodies
+are decompressed chunk by chunk and decoding stops as soon as the output
+exceeds the size limit, so a small compressed response cannot expand into
+an arbitrarily large one.
+"""
+
+from __future__ import annotations
+
+import itertools
+import zlib
+from collections.abc import Iterable, Iterator
+from functools import cache
+from importlib.util import find_spec
+from typing import Callable
+
+DEFAULT_MAX_DECODED_SIZE = 64 * 1024 * 1024
+OUTPUT_CHUNK_SIZE = 64 * 1024
+# brotli and zstd cannot cap the output of one call; small inputs bound it.
+INPUT_SLICE_SIZE = 4 * 1024
+
+Decoder = Callable[[Iterator[bytes]], Iterator[bytes]]
+
+
+class DecompressionLimitError(ValueError):
+    """The decompressed response body exceeds the allowed size."""
+
+
+@cache
+def supported_encodings() -> tuple[str, ...]:
+    """Content codings to offer in ``Accept-Encoding``, best first."""
+    encodings = []
+    if find_spec("zstandard") is not None:
+        encodings.append("zstd")
+    if find_spec("brotli") is not None or find_spec("brotlicffi") is not None:
+        encodings.append("br")
+    encodings.extend(["gzip", "deflate"])
+    return tuple(encodings)
+
+
+def accept_encoding() -> str:
+    return ", ".join(supported_encodings())
+
+
+def decode_body(
+    chunks: Iterable[bytes],
+    content_encoding: str | None,
+    max_size: int = DEFAULT_MAX_DECODED_SIZE,
+) -> bytes:
+    """Undo ``content_encoding`` on a body read as ``chunks``.
+
+    Several codings are undone in reverse order of the header. Raises
+    :class:`DecompressionLimitError` when the result would exceed
+    ``max_size`` bytes and :class:`ValueError` for unknown or corrupt
+    codings.
+    """
+    codings = [
+        coding.strip().lower()
+        for coding in (content_encoding or "").split(",")
+        if coding.strip()
+    ]
+    stream = iter(chunks)
+    for coding in reversed(codings):
+        stream = _decoder(coding)(stream)
+
+    parts: list[bytes] = []
+    size = 0
+    try:
+        for part in stream:
+            size += len(part)
+            if size > max_size:
+                raise DecompressionLimitError(
+                    f"Response body exceeds {max_size} bytes after decompression."
+                )
+            parts.append(part)
+    except zlib.error as exc:
+        raise ValueError(f"Could not decode {content_encoding} body: {exc}") from exc
+    return b"".join(parts)
+
+
+def _decoder(coding: str) -> Decoder:
+    if coding == "identity":
+        return lambda stream: stream
+    if coding in ("gzip", "x-gzip"):
+        return _gzip_chunks
+    if coding == "deflate":
+        return _deflate_chunks
+    if coding == "br" and "br" in supported_encodings():
+        return _brotli_chunks
+    if coding == "zstd" and "zstd" in supported_encodings():
+        return _zstd_chunks
+    raise ValueError(f"Unsupported Content-Encoding: {coding!r}")
+
+
+def _gzip_chunks(stream: Iterator[bytes]) -> Iterator[bytes]:
+    return _zlib_chunks(stream, 16 + zlib.MAX_WBITS)
+
+
+def _deflate_chunks(stream: Iterator[bytes]) -> Iterator[bytes]:
+    # "deflate" should be zlib-wrapped, but some servers send raw deflate.
+    first = next(stream, b"")
+    zlib_header = (
+        len(first) >= 2
+        and first[0] & 0x0F == 8
+        and (first[0] << 8 | first[1]) % 31 == 0
+    )
+    wbits = zlib.MAX_WBITS if zlib_header else -zlib.MAX_WBITS
+    return _zlib_chunks(itertools.chain([first], stream), wbits)
+
+
+def _zlib_chunks(stream: Iterator[bytes], wbits: int) -> Iterator[bytes]:
+    decompressor = zlib.decompressobj(wbits)
+    received = False
+    for chunk in stream:
+        received = received or bool(chunk)
+        data = chunk
+        while data and not decompressor.eof:
+            part = decompressor.decompress(data, OUTPUT_CHUNK_SIZE)
+            if part:
+                yield part
+            data = decompressor.unconsumed_tail
+    if received and not decompressor.eof:
+        raise ValueError("Compressed response body is truncated.")
+
+
+def _brotli_chunks(stream: Iterator[bytes]) -> Iterator[bytes]:
+    try:
+        import brotli
+    except ImportError:
+        import brotlicffi as brotli  # type: ignore[no-redef]
+
+    decompressor = brotli.Decompressor()
+    for data in _slices(stream):
+        try:
+            part = decompressor.process(data)
+        except brotli.error as exc:
+            raise ValueError(f"Could not decode br body: {exc}") from exc
+        if part:
+            yield part
+
+
+def _zstd_chunks(stream: Iterator[bytes]) -> Iterator[bytes]:
+    import zstandard
+
+    decompressor = zstandard.ZstdDecompressor().decompressobj()
+    for data in _slices(stream):
+        try:
+            part = decompressor.decompress(data)
+        except zstandard.ZstdError as exc:
+            raise ValueError(f"Could not decode zstd body: {exc}") from exc
+        if part:
+            yield part
+
+
+def _slices(stream: Iterator[bytes]) -> Iterator[bytes]:
+    for chunk in stream:
+        for start in range(0, len(chunk), INPUT_SLICE_SIZE):
+            yield chunk[start : start + INPUT_SLICE_SIZE]
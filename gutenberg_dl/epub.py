@@ -1,12 +1,45 @@
 from __future__ import annotations
 
 import html
+import itertools
+import os
+import time
+import zipfile
+from collections import deque
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Union
 
-from ebooklib import epub
+from ebooklib.utils import parse_html_string
+from lxml import etree
 
-from .models import Book, Chapter
+from .events import EPUB_WRITTEN, Event, EventHandler
+from .models import Book, BookMetadata, Chapter, ImageAsset
+from .profiling import profiled
 from .utils import ensure_parent_dir
 
+DEFAULT_COMPRESS_LEVEL = 6
+
+# Media types whose content is already compressed; deflating them again
+# costs time and saves next to nothing, so they are stored.
+STORED_MEDIA_TYPES = frozenset(
+    {
+        "image/jpeg",
+        "image/png",
+        "image/gif",
+        "image/webp",
+        "image/avif",
+        "audio/mpeg",
+        "audio/mp4",
+        "video/mp4",
+        "font/woff",
+        "font/woff2",
+    }
+)
+
+EntryContent = Union[bytes, Callable[[], bytes]]
+
 DEFAULT_CSS = """
 body {
   font-family: serif;
@@ -34,7 +67,85 @@ img {
 }
 """
 
+CONTAINER_XML = """<?xml version="1.0" encoding="utf-8"?>
+<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container" version="1.0">
+  <rootfiles>
+    <rootfile media-type="application/oebps-package+xml" full-path="EPUB/content.opf"/>
+  </rootfiles>
+</container>
+"""
+
+PACKAGE_TEMPLATE = """<?xml version='1.0' encoding='utf-8'?>
+<package xmlns="http://www.idpf.org/2007/opf" unique-identifier="id" version="3.0">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/" \
+xmlns:opf="http://www.idpf.org/2007/opf">
+{metadata}
+  </metadata>
+  <manifest>
+{manifest}
+  </manifest>
+  <spine toc="ncx">
+{spine}
+  </spine>
+</package>
+"""
+
+NCX_TEMPLATE = """<?xml version='1.0' encoding='utf-8'?>
+<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">
+  <head>
+    <meta content="{identifier}" name="dtb:uid"/>
+    <meta content="0" name="dtb:depth"/>
+    <meta content="0" name="dtb:totalPageCount"/>
+    <meta content="0" name="dtb:maxPageNumber"/>
+  </head>
+  <docTitle>
+    <text>{title}</text>
+  </docTitle>
+  <navMap>
+{nav_points}
+  </navMap>
+</ncx>
+"""
+
+NCX_NAV_POINT_TEMPLATE = """    <navPoint id="{id}">
+      <navLabel>
+        <text>{title}</text>
+      </navLabel>
+      <content src="{src}"/>
+    </navPoint>"""
+
+NAV_TEMPLATE = """<?xml version='1.0' encoding='utf-8'?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" \
+lang="{language}" xml:lang="{language}">
+  <head>
+    <title>{title}</title>
+  </head>
+  <body>
+    <nav epub:type="toc" id="id" role="doc-toc">
+      <h2>{title}</h2>
+      <ol>
+{entries}
+      </ol>
+    </nav>
+  </body>
+</html>
+"""
+
+CHAPTER_TEMPLATE = """<?xml version='1.0' encoding='utf-8'?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" \
+lang="{language}" xml:lang="{language}">
+  <head>
+    <title>{title}</title>
+    <link href="style/style.css" rel="stylesheet" type="text/css"/>
+  </head>
+  <body>{body}</body>
+</html>
+"""
 
+
+@profiled("wrap_chapter_html")
 def wrap_chapter_html(title: str, body_html: str, language: str) -> str:
     safe_title = html.escape(title, quote=True)
     if not body_html.strip():
@@ -54,59 +165,258 @@ def wrap_chapter_html(title: str, body_html: str, language: str) -> str:
     )
 
 
-def _add_chapters(
-    epub_book: epub.EpubBook,
-    chapters: list[Chapter],
-    language: str,
-    style_item: epub.EpubItem,
-) -> list[epub.EpubHtml]:
-    items: list[epub.EpubHtml] = []
-    for chapter in chapters:
-        item = epub.EpubHtml(
-            title=chapter.title, file_name=chapter.file_name, lang=language
+class EpubWriter:
+    """Write an EPUB file incrementally.
+
+    ``mimetype`` is stored first, then chapters and images are appended to
+    the archive in the order they are added. Chapters are rendered on
+    ``workers`` threads, at most ``workers * 2`` entries ahead of the one
+    being written, and deflated with ``compress_level``. Media types in
+    :data:`STORED_MEDIA_TYPES` are stored uncompressed, and a
+    ``compress_level`` of 0 stores every entry. The package document, NCX
+    and navigation document are written by :meth:`close`. The archive is
+    built under a ``.part`` name and renamed into place once complete.
+    ``on_event`` receives an ``epub_written`` event with the file size and
+    the time spent writing.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        metadata: BookMetadata,
+        on_event: EventHandler | None = None,
+        compress_level: int = DEFAULT_COMPRESS_LEVEL,
+        workers: int | None = None,
+    ) -> None:
+        self.output_path = output_path
+        self.metadata = metadata
+        self.on_event = on_event
+        self.compress_level = compress_level
+        self.write_seconds = 0.0
+        self._workers = workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self._workers)
+        self._pending: deque[tuple[zipfile.ZipInfo, Future[bytes]]] = deque()
+        self._temp_path = f"{output_path}.part"
+        self._manifest: list[tuple[str, str, str, str | None]] = [
+            ("style", "style/style.css", "text/css", None)
+        ]
+        self._chapters: list[tuple[str, str, str]] = []
+        self._image_count = 0
+        ensure_parent_dir(output_path)
+        self._zip = zipfile.ZipFile(self._temp_path, "w", zipfile.ZIP_DEFLATED)
+        self._zip.writestr(
+            "mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED
         )
-        item.content = chapter.html
-        item.add_item(style_item)
-        epub_book.add_item(item)
-        items.append(item)
-    return items
-
-
-def build_epub(book: Book, output_path: str) -> str:
-    epub_book = epub.EpubBook()
-    epub_book.set_identifier(book.identifier)
-    epub_book.set_title(book.title)
-    epub_book.set_language(book.language)
-    if book.author:
-        epub_book.add_author(book.author)
-    if book.description:
-        epub_book.add_metadata("DC", "description", book.description)
-    if book.source_url:
-        epub_book.add_metadata("DC", "source", book.source_url)
-
-    style_item = epub.EpubItem(
-        uid="style",
-        file_name="style/style.css",
-        media_type="text/css",
-        content=DEFAULT_CSS,
-    )
-    epub_book.add_item(style_item)
-
-    for image in book.images:
-        img_item = epub.EpubImage()
-        img_item.file_name = image.file_name
-        img_item.media_type = image.media_type
-        img_item.content = image.content
-        epub_book.add_item(img_item)
-
-    chapter_items = _add_chapters(epub_book, book.chapters, book.language, style_item)
-    epub_book.toc = [
-        epub.Link(item.file_name, item.title, item.file_name) for item in chapter_items
-    ]
-    epub_book.spine = ["nav"] + chapter_items
-    epub_book.add_item(epub.EpubNcx())
-    epub_book.add_item(epub.EpubNav())
-
-    ensure_parent_dir(output_path)
-    epub.write_epub(output_path, epub_book)
+        self._write_entry("META-INF/container.xml", CONTAINER_XML.encode("utf-8"))
+        self._write_entry("EPUB/style/style.css", DEFAULT_CSS.encode("utf-8"))
+
+    def __enter__(self) -> EpubWriter:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *exc_info: object) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add(self, item: Chapter | ImageAsset) -> None:
+        started = time.perf_counter()
+        if isinstance(item, Chapter):
+            self.add_chapter(item)
+        else:
+            self.add_image(item)
+        self.write_seconds += time.perf_counter() - started
+
+    def add_image(self, image: ImageAsset) -> None:
+        item_id = f"image_{self._image_count}"
+        self._image_count += 1
+        self._manifest.append((item_id, image.file_name, image.media_type, None))
+        self._write_entry(
+            f"EPUB/{image.file_name}",
+            image.content,
+            stored=image.media_type in STORED_MEDIA_TYPES,
+        )
+
+    def add_chapter(self, chapter: Chapter) -> None:
+        item_id = f"chapter_{len(self._chapters)}"
+        self._chapters.append((item_id, chapter.file_name, chapter.title))
+        self._manifest.append(
+            (item_id, chapter.file_name, "application/xhtml+xml", None)
+        )
+        self._write_entry(
+            f"EPUB/{chapter.file_name}",
+            partial(render_chapter_xhtml, chapter, self.metadata.language),
+        )
+
+    def close(self) -> str:
+        started = time.perf_counter()
+        self._write_entry("EPUB/content.opf", self._package_document().encode())
+        self._write_entry("EPUB/toc.ncx", self._ncx_document().encode())
+        self._write_entry("EPUB/nav.xhtml", self._nav_document().encode())
+        while self._pending:
+            self._write_next()
+        self._executor.shutdown()
+        self._zip.close()
+        os.replace(self._temp_path, self.output_path)
+        self.write_seconds += time.perf_counter() - started
+        if self.on_event is not None:
+            self.on_event(
+                Event(
+                    EPUB_WRITTEN,
+                    url=self.metadata.source_url,
+                    bytes=os.path.getsize(self.output_path),
+                    duration=self.write_seconds,
+                )
+            )
+        return self.output_path
+
+    def abort(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._pending.clear()
+        self._zip.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+    def _write_entry(
+        self, name: str, content: EntryContent, stored: bool = False
+    ) -> None:
+        info = zipfile.ZipInfo(name, date_time=time.localtime(time.time())[:6])
+        info.external_attr = 0o600 << 16
+        if stored or self.compress_level == 0:
+            info.compress_type = zipfile.ZIP_STORED
+        else:
+            info.compress_type = zipfile.ZIP_DEFLATED
+        self._pending.append((info, self._executor.submit(_render_entry, content)))
+        while self._pending and (
+            len(self._pending) > self._workers * 2 or self._pending[0][1].done()
+        ):
+            self._write_next()
+
+    def _write_next(self) -> None:
+        info, future = self._pending.popleft()
+        self._zip.writestr(
+            info,
+            future.result(),
+            compress_type=info.compress_type,
+            compresslevel=self.compress_level,
+        )
+
+    def _package_document(self) -> str:
+        meta = self.metadata
+        modified = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        metadata_lines = [
+            f'    <meta property="dcterms:modified">{modified}</meta>',
+            f'    <dc:identifier id="id">{_escape(meta.identifier)}</dc:identifier>',
+            f"    <dc:title>{_escape(meta.title)}</dc:title>",
+            f"    <dc:language>{_escape(meta.language)}</dc:language>",
+        ]
+        if meta.author:
+            metadata_lines.append(
+                f'    <dc:creator id="creator">{_escape(meta.author)}</dc:creator>'
+            )
+        if meta.description:
+            metadata_lines.append(
+                f"    <dc:description>{_escape(meta.description)}</dc:description>"
+            )
+        if meta.source_url:
+            metadata_lines.append(
+                f"    <dc:source>{_escape(meta.source_url)}</dc:source>"
+            )
+
+        manifest = [
+            *self._manifest,
+            ("ncx", "toc.ncx", "application/x-dtbncx+xml", None),
+            ("nav", "nav.xhtml", "application/xhtml+xml", "nav"),
+        ]
+        manifest_lines = []
+        for item_id, href, media_type, properties in manifest:
+            extra = f' properties="{properties}"' if properties else ""
+            manifest_lines.append(
+                f'    <item href="{_escape(href)}" id="{item_id}" '
+                f'media-type="{_escape(media_type)}"{extra}/>'
+            )
+        spine_lines = ['    <itemref idref="nav"/>'] + [
+            f'    <itemref idref="{item_id}"/>' for item_id, _, _ in self._chapters
+        ]
+        return PACKAGE_TEMPLATE.format(
+            metadata="\n".join(metadata_lines),
+            manifest="\n".join(manifest_lines),
+            spine="\n".join(spine_lines),
+        )
+
+    def _ncx_document(self) -> str:
+        nav_points = "\n".join(
+            NCX_NAV_POINT_TEMPLATE.format(
+                id=_escape(file_name), title=_escape(title), src=_escape(file_name)
+            )
+            for _, file_name, title in self._chapters
+        )
+        return NCX_TEMPLATE.format(
+            identifier=_escape(self.metadata.identifier),
+            title=_escape(self.metadata.title),
+            nav_points=nav_points,
+        )
+
+    def _nav_document(self) -> str:
+        entries = "\n".join(
+            f'        <li>\n          <a href="{_escape(file_name)}">'
+            f"{_escape(title)}</a>\n        </li>"
+            for _, file_name, title in self._chapters
+        )
+        language = _escape(self.metadata.language)
+        return NAV_TEMPLATE.format(
+            language=language, title=_escape(self.metadata.title), entries=entries
+        )
+
+
+def render_chapter_xhtml(chapter: Chapter, language: str) -> bytes:
+    document = parse_html_string(chapter.html.encode("utf-8"))
+    body = document.find("body")
+    parts: list[str] = []
+    if body is not None:
+        if body.text:
+            parts.append(_escape(body.text))
+        for child in body:
+            parts.append(etree.tostring(child, encoding="unicode", method="xml"))
+    safe_language = _escape(language)
+    return CHAPTER_TEMPLATE.format(
+        language=safe_language,
+        title=_escape(chapter.title),
+        body="".join(parts),
+    ).encode("utf-8")
+
+
+@profiled("write_epub")
+def write_epub(
+    output_path: str,
+    metadata: BookMetadata,
+    items: Iterable[Chapter | ImageAsset],
+    on_event: EventHandler | None = None,
+    compress_level: int = DEFAULT_COMPRESS_LEVEL,
+    workers: int | None = None,
+) -> str:
+    with EpubWriter(output_path, metadata, on_event, compress_level, workers) as writer:
+        for item in items:
+            writer.add(item)
     return output_path
+
+
+@profiled("build_epub")
+def build_epub(
+    book: Book, output_path: str, compress_level: int = DEFAULT_COMPRESS_LEVEL
+) -> str:
+    return write_epub(
+        output_path,
+        book.metadata,
+        itertools.chain(book.images, book.chapters),
+        compress_level=compress_level,
+    )
+
+
+def _render_entry(content: EntryContent) -> bytes:
+    """Return the bytes of an archive entry; runs on the writer's threads."""
+    return content() if callable(content) else content
+
+
+def _escape(value: str) -> str:
+    return html.escape(value, quote=True)
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Callable
+
+PAGE_FETCHED = "page_fetched"
+CHAPTER_FETCHED = "chapter_fetched"
+IMAGE_FETCHED = "image_fetched"
+CHAPTER_PARSED = "chapter_parsed"
+CACHE_HIT = "cache_hit"
+EPUB_DOWNLOADED = "epub_downloaded"
+EPUB_WRITTEN = "epub_written"
+
+NETWORK_EVENTS = {PAGE_FETCHED, CHAPTER_FETCHED, IMAGE_FETCHED, EPUB_DOWNLOADED}
+
+
+@dataclass(frozen=True)
+class Event:
+    """A progress event.
+
+    ``bytes`` is the payload size and ``duration`` the time in seconds spent
+    on the step the event reports. Events may be emitted from worker threads.
+    """
+
+    kind: str
+    url: str | None = None
+    bytes: int = 0
+    duration: float = 0.0
+
+
+EventHandler = Callable[[Event], None]
+
+
+def combine_handlers(handlers: Iterable[EventHandler | None]) -> EventHandler | None:
+    active = [handler for handler in handlers if handler is not None]
+    if not active:
+        return None
+    if len(active) == 1:
+        return active[0]
+
+    def emit(event: Event) -> None:
+        for handler in active:
+            handler(event)
+
+    return emit
+
+
+@dataclass
+class PhaseStats:
+    count: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+
+
+class Metrics:
+    """Aggregate events into per-kind counts, bytes and durations.
+
+    Durations of concurrent steps are summed, so ``network`` time can exceed
+    the wall time of a run that downloads in parallel. Responses served from
+    the cache count as fetched but not as downloaded.
+    """
+
+    def __init__(self) -> None:
+        self.phases: dict[str, PhaseStats] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Event) -> None:
+        with self._lock:
+            phase = self.phases.setdefault(event.kind, PhaseStats())
+            phase.count += 1
+            phase.bytes += event.bytes
+            phase.seconds += event.duration
+
+    def phase(self, kind: str) -> PhaseStats:
+        with self._lock:
+            return replace(self.phases.get(kind, PhaseStats()))
+
+    def summary(self, elapsed: float | None = None) -> dict[str, Any]:
+        with self._lock:
+            phases = {kind: replace(stats) for kind, stats in self.phases.items()}
+        empty = PhaseStats()
+        fetched = sum(phases.get(kind, empty).bytes for kind in NETWORK_EVENTS)
+        downloaded = fetched - phases.get(CACHE_HIT, empty).bytes
+        network = sum(phases.get(kind, empty).seconds for kind in NETWORK_EVENTS)
+        written = phases.get(EPUB_WRITTEN, empty)
+        return {
+            "elapsed": elapsed,
+            "network_seconds": network,
+            "parse_seconds": phases.get(CHAPTER_PARSED, empty).seconds,
+            "write_seconds": written.seconds,
+            "bytes_fetched": fetched,
+            "bytes_downloaded": downloaded,
+            "bytes_written": written.bytes,
+            "throughput": downloaded / elapsed if elapsed else None,
+            "chapters": phases.get(CHAPTER_FETCHED, empty).count,
+            "images": phases.get(IMAGE_FETCHED, empty).count,
+            "cache_hits": phases.get(CACHE_HIT, empty).count,
+            "cache_hit_bytes": phases.get(CACHE_HIT, empty).bytes,
+            "events": {kind: asdict(stats) for kind, stats in sorted(phases.items())},
+        }
@@ -0,0 +1,354 @@
+"""Write one book in several output formats at once.
+
+Every requested format is written by its own thread from the same stream of
+chapters and images, so a book is fetched (or read from its checkpoint or
+EPUB) only once. Besides the EPUB there is a plain text file for search and
+text-to-speech pipelines and a standalone HTML page whose images are stored
+in a ``<name>_files`` directory next to it.
+
+lxml and the EPUB writer are imported when a book is written, so the CLI can
+validate ``--format`` against :data:`FORMATS` without loading them.
+"""
+
+from __future__ import annotations
+
+import html
+import os
+import posixpath
+import queue
+import re
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Union
+from urllib.parse import urlsplit
+
+from .events import EventHandler
+from .models import BookMetadata, Chapter, ImageAsset
+from .utils import ensure_parent_dir, slugify
+
+if TYPE_CHECKING:
+    import lxml.html
+
+FORMATS = ("epub", "txt", "html")
+FORMAT_EXTENSIONS = {"epub": ".epub", "txt": ".txt", "html": ".html"}
+
+HTML_HEADER = """<!DOCTYPE html>
+<html lang="{language}">
+<head>
+  <meta charset="utf-8" />
+  <title>{title}</title>
+  <style>{css}</style>
+</head>
+<body>
+<h1>{title}</h1>
+"""
+
+_BLOCK_TAGS = frozenset(
+    {
+        "address",
+        "article",
+        "aside",
+        "blockquote",
+        "dd",
+        "div",
+        "dl",
+        "dt",
+        "figcaption",
+        "figure",
+        "footer",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "header",
+        "hr",
+        "li",
+        "ol",
+        "p",
+        "pre",
+        "section",
+        "table",
+        "tr",
+        "ul",
+    }
+)
+_SKIPPED_TAGS = frozenset({"head", "script", "style"})
+_QUEUE_SIZE = 16
+_XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+Item = Union[Chapter, ImageAsset]
+
+
+def format_paths(epub_path: str, formats: Iterable[str]) -> dict[str, str]:
+    """Map each format to its output path, in the requested order.
+
+    The EPUB keeps ``epub_path``; the other formats replace its extension.
+    """
+    stem, _ = os.path.splitext(epub_path)
+    return {
+        name: epub_path if name == "epub" else stem + FORMAT_EXTENSIONS[name]
+        for name in formats
+    }
+
+
+def write_formats(
+    output_paths: dict[str, str],
+    metadata: BookMetadata,
+    items: Iterable[Item],
+    on_event: EventHandler | None = None,
+    compress_level: int | None = None,
+) -> dict[str, str]:
+    """Write ``items`` to every format in ``output_paths`` concurrently.
+
+    ``compress_level`` defaults to the EPUB writer's level.
+    """
+    from .epub import DEFAULT_COMPRESS_LEVEL, write_epub
+
+    if compress_level is None:
+        compress_level = DEFAULT_COMPRESS_LEVEL
+    writers: list[Callable[[Iterable[Item]], str]] = []
+    for name, path in output_paths.items():
+        if name == "epub":
+            writers.append(
+                lambda stream, path=path: write_epub(
+                    path, metadata, stream, on_event, compress_level
+                )
+            )
+        elif name == "txt":
+            writers.append(lambda stream, path=path: write_text(path, metadata, stream))
+        elif name == "html":
+            writers.append(lambda stream, path=path: write_html(path, metadata, stream))
+        else:
+            raise ValueError(f"Unknown output format: {name!r}")
+
+    if len(writers) == 1:
+        writers[0](items)
+    else:
+        _fan_out(items, writers)
+    return output_paths
+
+
+def write_text(output_path: str, metadata: BookMetadata, items: Iterable[Item]) -> str:
+    """Write the chapters as plain text, one blank line between paragraphs."""
+    ensure_parent_dir(output_path)
+    temp_path = f"{output_path}.part"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            handle.write(f"{metadata.title}\n")
+            if metadata.author:
+                handle.write(f"{metadata.author}\n")
+            for item in items:
+                if isinstance(item, Chapter):
+                    handle.write(f"\n\n{html_to_text(item.html)}\n")
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return output_path
+
+
+def write_html(output_path: str, metadata: BookMetadata, items: Iterable[Item]) -> str:
+    """Write all chapters into one HTML page.
+
+    Images go to a ``<name>_files`` directory next to the page. Links
+    between chapters point to the chapter sections of the page.
+    """
+    from .epub import DEFAULT_CSS
+
+    ensure_parent_dir(output_path)
+    stem, _ = os.path.splitext(output_path)
+    assets_dir = f"{stem}_files"
+    assets_name = os.path.basename(assets_dir)
+    images: set[str] = set()
+    temp_path = f"{output_path}.part"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            handle.write(
+                HTML_HEADER.format(
+                    language=html.escape(metadata.language, quote=True),
+                    title=html.escape(metadata.title),
+                    css=DEFAULT_CSS,
+                )
+            )
+            if metadata.author:
+                handle.write(f'<p class="title">{html.escape(metadata.author)}</p>\n')
+            for item in items:
+                if isinstance(item, ImageAsset):
+                    if _write_asset(assets_dir, item):
+                        images.add(item.file_name)
+                    continue
+                handle.write(
+                    f'<section id="{_section_id(item.file_name)}">\n'
+                    f"{_html_section_body(item, assets_name, images)}\n"
+                    "</section>\n"
+                )
+            handle.write("</body>\n</html>\n")
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return output_path
+
+
+def html_to_text(markup: str) -> str:
+    """Return the text of an HTML document as paragraphs.
+
+    Block elements start a new paragraph and ``<br>`` a new line; other
+    whitespace is collapsed.
+    """
+    body = _parse_body(markup)
+    paragraphs: list[str] = []
+    lines: list[str] = []
+    words: list[str] = []
+
+    def end_line() -> None:
+        line = " ".join("".join(words).split())
+        words.clear()
+        if line:
+            lines.append(line)
+
+    def end_paragraph() -> None:
+        end_line()
+        if lines:
+            paragraphs.append("\n".join(lines))
+            lines.clear()
+
+    def walk(node: lxml.html.HtmlElement) -> None:
+        tag = node.tag if isinstance(node.tag, str) else None
+        if tag is not None and tag not in _SKIPPED_TAGS:
+            block = tag in _BLOCK_TAGS
+            if block:
+                end_paragraph()
+            elif tag == "br":
+                end_line()
+            if node.text:
+                words.append(node.text)
+            for child in node:
+                walk(child)
+            if block:
+                end_paragraph()
+        if node.tail:
+            words.append(node.tail)
+
+    walk(body)
+    end_paragraph()
+    return "\n\n".join(paragraphs)
+
+
+def _html_section_body(chapter: Chapter, assets_name: str, images: set[str]) -> str:
+    import lxml.html
+
+    body = _parse_body(chapter.html)
+    base = posixpath.dirname(chapter.file_name)
+    for img in body.iter("img"):
+        target = _resolve_href(base, img.get("src"))
+        if target in images:
+            img.set("src", f"{assets_name}/{target}")
+    for link in body.iter("a"):
+        href = link.get("href")
+        target = _resolve_href(base, href)
+        if target is None or href is None:
+            continue
+        fragment = urlsplit(href).fragment
+        link.set("href", f"#{fragment or _section_id(target)}")
+    parts = [html.escape(body.text)] if body.text else []
+    parts.extend(lxml.html.tostring(child, encoding="unicode") for child in body)
+    return "".join(parts)
+
+
+def _parse_body(markup: str) -> lxml.html.HtmlElement:
+    import lxml.html
+
+    # lxml refuses str input that still carries an encoding declaration.
+    return lxml.html.document_fromstring(_XML_DECLARATION.sub("", markup, 1)).body
+
+
+def _resolve_href(base: str, href: str | None) -> str | None:
+    """Return the path of a relative link inside the book, if it is one."""
+    if not href:
+        return None
+    parts = urlsplit(href)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    return posixpath.normpath(posixpath.join(base, parts.path))
+
+
+def _section_id(file_name: str) -> str:
+    return slugify(posixpath.splitext(file_name)[0])
+
+
+def _write_asset(assets_dir: str, image: ImageAsset) -> bool:
+    name = posixpath.normpath(image.file_name)
+    if posixpath.isabs(name) or name.startswith(".."):
+        return False
+    path = os.path.join(assets_dir, *name.split("/"))
+    ensure_parent_dir(path)
+    with open(path, "wb") as handle:
+        handle.write(image.content)
+    return True
+
+
+class _Aborted(Exception):
+    """Raised inside the writers when the item stream failed."""
+
+
+_END = object()
+_ABORT = object()
+
+
+def _fan_out(
+    items: Iterable[Item], writers: list[Callable[[Iterable[Item]], str]]
+) -> None:
+    queues: list[queue.Queue[object]] = [
+        queue.Queue(maxsize=_QUEUE_SIZE) for _ in writers
+    ]
+    with ThreadPoolExecutor(max_workers=len(writers)) as executor:
+        futures = [
+            executor.submit(writer, _drain(item_queue))
+            for writer, item_queue in zip(writers, queues)
+        ]
+        try:
+            for item in items:
+                for item_queue, future in zip(queues, futures):
+                    _put(item_queue, item, future)
+            for item_queue, future in zip(queues, futures):
+                _put(item_queue, _END, future)
+        except BaseException:
+            for item_queue, future in zip(queues, futures):
+                if not future.done():
+                    _put(item_queue, _ABORT, future, check=False)
+            raise
+        for future in futures:
+            future.result()
+
+
+def _drain(item_queue: queue.Queue[object]) -> Iterator[Item]:
+    while True:
+        item = item_queue.get()
+        if item is _END:
+            return
+        if item is _ABORT:
+            raise _Aborted
+        yield item  # type: ignore[misc]
+
+
+def _put(
+    item_queue: queue.Queue[object],
+    item: object,
+    future: Future[str],
+    check: bool = True,
+) -> None:
+    while True:
+        try:
+            item_queue.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            if future.done():
+                if check:
+                    future.result()
+                    raise RuntimeError("Output writer stopped reading items.") from None
+                return
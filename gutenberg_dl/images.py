@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import io
+import logging
+import os
+import re
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from types import ModuleType
+
+from .models import Chapter, ImageAsset
+from .profiling import reset_worker
+from .utils import unique_filename
+
+DEFAULT_MAX_DIMENSION = 1600
+DEFAULT_JPEG_QUALITY = 80
+
+CONVERTIBLE_TYPES = {"image/bmp", "image/tiff", "image/x-ms-bmp"}
+EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png"}
+
+logger = logging.getLogger(__name__)
+
+_IMG_SRC_RE = re.compile(
+    r"""(<img\b[^>]*?\ssrc\s*=\s*)(["'])([^"'<>]*)\2""", re.IGNORECASE
+)
+
+
+@dataclass(frozen=True)
+class ImageOptions:
+    max_dimension: int | None = DEFAULT_MAX_DIMENSION
+    jpeg_quality: int = DEFAULT_JPEG_QUALITY
+    reencode_png: bool = True
+
+
+@dataclass
+class OptimizeStats:
+    images: int = 0
+    optimized: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+
+def load_pillow() -> ModuleType:
+    try:
+        from PIL import Image
+    except ImportError as exc:
+        raise RuntimeError(
+            "Image optimization requires Pillow: pip install gutenberg-dl[images]"
+        ) from exc
+    return Image
+
+
+def optimize_image(
+    content: bytes, media_type: str, options: ImageOptions
+) -> tuple[bytes, str]:
+    """Downscale and re-encode one image.
+
+    JPEG and PNG images keep their type; BMP and TIFF images are converted
+    to PNG or JPEG depending on transparency. The original bytes are returned
+    whenever re-encoding would not make the image smaller or Pillow cannot
+    decode the image.
+    """
+    if media_type not in EXTENSIONS and media_type not in CONVERTIBLE_TYPES:
+        return content, media_type
+
+    Image = load_pillow()
+    try:
+        return _optimize(Image, content, media_type, options)
+    except (Image.DecompressionBombError, OSError, SyntaxError, ValueError) as exc:
+        logger.debug("Keeping %s image that Pillow cannot decode: %s", media_type, exc)
+        return content, media_type
+
+
+def _optimize(
+    Image: ModuleType, content: bytes, media_type: str, options: ImageOptions
+) -> tuple[bytes, str]:
+    with Image.open(io.BytesIO(content)) as image:
+        image.load()
+        resized = False
+        if options.max_dimension and max(image.size) > options.max_dimension:
+            image.thumbnail(
+                (options.max_dimension, options.max_dimension), Image.LANCZOS
+            )
+            resized = True
+
+        target_type = media_type
+        if media_type in CONVERTIBLE_TYPES:
+            has_alpha = image.mode in ("RGBA", "LA", "PA") or (
+                image.mode == "P" and "transparency" in image.info
+            )
+            target_type = "image/png" if has_alpha else "image/jpeg"
+
+        output = io.BytesIO()
+        if target_type == "image/jpeg":
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            image.save(
+                output,
+                "JPEG",
+                quality=options.jpeg_quality,
+                optimize=True,
+                progressive=True,
+            )
+        else:
+            if not resized and not options.reencode_png and target_type == media_type:
+                return content, media_type
+            image.save(output, "PNG", optimize=True)
+
+    optimized = output.getvalue()
+    if target_type == media_type and not resized and len(optimized) >= len(content):
+        return content, media_type
+    return optimized, target_type
+
+
+class ImageOptimizer:
+    """Optimize the images of an item stream on a process pool.
+
+    Items are yielded in their original order. When an image changes its
+    type, the asset is renamed and the ``src`` references in later chapters
+    are updated to the new file name.
+    """
+
+    def __init__(self, options: ImageOptions, workers: int | None = None) -> None:
+        load_pillow()
+        self.options = options
+        self.stats = OptimizeStats()
+        self._workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self._workers, initializer=reset_worker
+        )
+        self._renames: dict[str, str] = {}
+        self._used_names: set[str] = set()
+
+    def __enter__(self) -> ImageOptimizer:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def process(
+        self, items: Iterable[Chapter | ImageAsset]
+    ) -> Iterator[Chapter | ImageAsset]:
+        pending: deque[
+            tuple[Chapter | ImageAsset, Future[tuple[bytes, str]] | None]
+        ] = deque()
+        in_flight = 0
+        for item in items:
+            if isinstance(item, ImageAsset):
+                self._used_names.add(item.file_name)
+                future = self._executor.submit(
+                    optimize_image, item.content, item.media_type, self.options
+                )
+                pending.append((item, future))
+                in_flight += 1
+            else:
+                pending.append((item, None))
+            while pending and (
+                in_flight > self._workers * 2
+                or pending[0][1] is None
+                or pending[0][1].done()
+            ):
+                item, future = pending.popleft()
+                if future is not None:
+                    in_flight -= 1
+                yield self._finish(item, future)
+        while pending:
+            item, future = pending.popleft()
+            yield self._finish(item, future)
+
+    def _finish(
+        self,
+        item: Chapter | ImageAsset,
+        future: Future[tuple[bytes, str]] | None,
+    ) -> Chapter | ImageAsset:
+        if isinstance(item, Chapter):
+            return self._rewrite_chapter(item)
+        assert future is not None
+        content, media_type = future.result()
+        self.stats.images += 1
+        self.stats.bytes_before += len(item.content)
+        self.stats.bytes_after += len(content)
+        if content == item.content:
+            return item
+        self.stats.optimized += 1
+        file_name = item.file_name
+        if media_type != item.media_type:
+            base, _ = os.path.splitext(file_name)
+            file_name = unique_filename(
+                f"{base}{EXTENSIONS[media_type]}", self._used_names
+            )
+            self._renames[item.file_name] = file_name
+        return replace(
+            item, file_name=file_name, media_type=media_type, content=content
+        )
+
+    def _rewrite_chapter(self, chapter: Chapter) -> Chapter:
+        if not self._renames:
+            return chapter
+        html = _IMG_SRC_RE.sub(self._rename_src, chapter.html)
+        return replace(chapter, html=html)
+
+    def _rename_src(self, match: re.Match[str]) -> str:
+        prefix, quote, src = match.groups()
+        return f"{prefix}{quote}{self._renames.get(src, src)}{quote}"
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import zipfile
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import astuple, dataclass
+from typing import Callable
+from xml.etree.ElementTree import ParseError
+
+from .sources.gutenberg import read_epub_metadata
+
+DEFAULT_LIBRARY_INDEX = "gutenberg-library.sqlite"
+SCAN_CHUNK_SIZE = 16
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    title TEXT,
+    author TEXT,
+    language TEXT,
+    identifier TEXT,
+    error TEXT
+);
+"""
+
+
+@dataclass(frozen=True)
+class LibraryEntry:
+    path: str
+    size: int
+    mtime_ns: int
+    title: str | None
+    author: str | None
+    language: str | None
+    identifier: str | None
+    error: str | None
+
+
+@dataclass(frozen=True)
+class ScanResult:
+    entries: list[LibraryEntry]
+    scanned: int
+    cached: int
+    removed: int
+
+    @property
+    def errors(self) -> int:
+        return sum(1 for entry in self.entries if entry.error)
+
+
+def scan_library(
+    root: str,
+    index_path: str,
+    workers: int | None = None,
+    log: Callable[[str], None] | None = None,
+) -> ScanResult:
+    """Read metadata of every EPUB below ``root`` and cache it in ``index_path``.
+
+    Files whose path, size and modification time match the index are not
+    opened again. New and changed files are read on a process pool. Index
+    rows of files that no longer exist below ``root`` are removed.
+    """
+    root = os.path.abspath(root)
+    conn = sqlite3.connect(index_path)
+    try:
+        conn.executescript(SCHEMA)
+        known = {
+            row[0]: LibraryEntry(*row)
+            for row in conn.execute(
+                "SELECT path, size, mtime_ns, title, author, language, identifier,"
+                " error FROM files WHERE path >= ? AND path < ?",
+                (root + os.sep, root + chr(ord(os.sep) + 1)),
+            )
+        }
+
+        entries: dict[str, LibraryEntry] = {}
+        stale: list[tuple[str, int, int]] = []
+        for path, size, mtime_ns in _iter_epubs(root):
+            entry = known.pop(path, None)
+            if entry is not None and entry.size == size and entry.mtime_ns == mtime_ns:
+                entries[path] = entry
+            else:
+                stale.append((path, size, mtime_ns))
+        cached = len(entries)
+
+        if stale:
+            if log is not None:
+                log(f"Reading {len(stale)} new or changed EPUB files")
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                paths = [path for path, _, _ in stale]
+                results = executor.map(_read_entry, paths, chunksize=SCAN_CHUNK_SIZE)
+                with conn:
+                    for (path, size, mtime_ns), fields in zip(stale, results):
+                        entry = LibraryEntry(path, size, mtime_ns, *fields)
+                        entries[path] = entry
+                        conn.execute(
+                            "INSERT OR REPLACE INTO files"
+                            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            astuple(entry),
+                        )
+        with conn:
+            conn.executemany(
+                "DELETE FROM files WHERE path = ?", [(path,) for path in known]
+            )
+    finally:
+        conn.close()
+
+    return ScanResult(
+        entries=[entries[path] for path in sorted(entries)],
+        scanned=len(stale),
+        cached=cached,
+        removed=len(known),
+    )
+
+
+def _iter_epubs(root: str) -> Iterator[tuple[str, int, int]]:
+    for directory, subdirs, files in os.walk(root):
+        subdirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith(".epub") or name.startswith("."):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            yield path, stat.st_size, stat.st_mtime_ns
+
+
+def _read_entry(
+    path: str,
+) -> tuple[str | None, str | None, str | None, str | None, str | None]:
+    try:
+        metadata = read_epub_metadata(path)
+    except (OSError, KeyError, zipfile.BadZipFile, ParseError, ValueError) as exc:
+        return None, None, None, None, f"{type(exc).__name__}: {exc}"
+    return (
+        metadata.title,
+        metadata.author,
+        metadata.language,
+        metadata.identifier,
+        None,
+    )
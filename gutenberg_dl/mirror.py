@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Callable
+from urllib.error import HTTPError
+
+from .net import CHUNK_SIZE, HttpSession, get_default_session
+from .utils import atomic_write
+
+DEFAULT_BASE_URL = "https://www.gutenberg.org"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_SAVE_INTERVAL = 100
+
+
+@dataclass(frozen=True)
+class MirrorEntry:
+    url: str
+    path: str
+    etag: str | None
+    last_modified: str | None
+    size: int
+    sha256: str
+
+
+@dataclass(frozen=True)
+class MirrorResult:
+    downloaded: int
+    current: int
+    missing: int
+    failed: dict[int, str]
+    bytes: int
+
+
+def parse_id_ranges(specs: Iterable[str]) -> list[int]:
+    """Expand ``"1-10,42"`` style specifications into sorted unique IDs."""
+    ids: set[int] = set()
+    for spec in specs:
+        for part in spec.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            start, sep, end = part.partition("-")
+            if not start.isdigit() or (sep and not end.isdigit()):
+                raise ValueError(f"Invalid ID range: {part!r}")
+            first = int(start)
+            last = int(end) if sep else first
+            if last < first:
+                raise ValueError(f"Invalid ID range: {part!r}")
+            ids.update(range(first, last + 1))
+    return sorted(ids)
+
+
+def mirror_path(book_id: int, no_images: bool) -> str:
+    suffix = "" if no_images else "-images"
+    return os.path.join(str(book_id), f"pg{book_id}{suffix}.epub")
+
+
+def mirror_url(book_id: int, no_images: bool, base_url: str = DEFAULT_BASE_URL) -> str:
+    suffix = ".epub3" if no_images else ".epub3.images"
+    return f"{base_url.rstrip('/')}/ebooks/{book_id}{suffix}"
+
+
+class Manifest:
+    """ETag, size and SHA-256 of every mirrored book, stored as JSON.
+
+    The file is rewritten atomically, so an interrupted run leaves the last
+    complete manifest behind.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self._entries: dict[str, MirrorEntry] = {}
+        self._lock = threading.Lock()
+        self._dirty = 0
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            data = {}
+        for key, value in data.get("books", {}).items():
+            try:
+                self._entries[key] = MirrorEntry(**value)
+            except TypeError:
+                continue
+
+    def get(self, book_id: int) -> MirrorEntry | None:
+        with self._lock:
+            return self._entries.get(str(book_id))
+
+    def set(self, book_id: int, entry: MirrorEntry) -> None:
+        with self._lock:
+            self._entries[str(book_id)] = entry
+            self._dirty += 1
+            save = self._dirty >= MANIFEST_SAVE_INTERVAL
+        if save:
+            self.save()
+
+    def save(self) -> None:
+        with self._lock:
+            books = {
+                key: asdict(self._entries[key])
+                for key in sorted(self._entries, key=int)
+            }
+            self._dirty = 0
+            atomic_write(
+                self.path, json.dumps({"books": books}, indent=1).encode("utf-8")
+            )
+
+
+def mirror_books(
+    ids: Iterable[int],
+    directory: str,
+    no_images: bool = False,
+    workers: int = 4,
+    session: HttpSession | None = None,
+    base_url: str = DEFAULT_BASE_URL,
+    log: Callable[[str], None] | None = None,
+) -> MirrorResult:
+    """Download or revalidate the EPUB of every ID into ``directory``.
+
+    Books already in the manifest are revalidated with ``If-None-Match`` and
+    ``If-Modified-Since`` and skipped when unchanged. New files are streamed
+    to a ``.part`` file, hashed on the way and renamed into place. IDs the
+    server does not know are counted as missing.
+    """
+    session = session or get_default_session()
+    os.makedirs(directory, exist_ok=True)
+    manifest = Manifest(directory)
+    downloaded = current = missing = total_bytes = 0
+    failed: dict[int, str] = {}
+
+    def mirror_one(book_id: int) -> str:
+        return _mirror_one(book_id, directory, no_images, session, base_url, manifest)
+
+    try:
+        for book_id, outcome in _map_bounded(mirror_one, ids, workers):
+            if isinstance(outcome, BaseException):
+                failed[book_id] = str(outcome) or type(outcome).__name__
+                if log is not None:
+                    log(f"Failed {book_id}: {failed[book_id]}")
+            elif outcome == "current":
+                current += 1
+            elif outcome == "missing":
+                missing += 1
+            else:
+                downloaded += 1
+                entry = manifest.get(book_id)
+                total_bytes += entry.size if entry is not None else 0
+                if log is not None:
+                    log(f"Downloaded {book_id}")
+    finally:
+        manifest.save()
+
+    return MirrorResult(
+        downloaded=downloaded,
+        current=current,
+        missing=missing,
+        failed=failed,
+        bytes=total_bytes,
+    )
+
+
+def _mirror_one(
+    book_id: int,
+    directory: str,
+    no_images: bool,
+    session: HttpSession,
+    base_url: str,
+    manifest: Manifest,
+) -> str:
+    url = mirror_url(book_id, no_images, base_url)
+    relative_path = mirror_path(book_id, no_images)
+    dest_path = os.path.join(directory, relative_path)
+    headers: dict[str, str] = {}
+    old = manifest.get(book_id)
+    if old is not None and old.url == url and _has_size(dest_path, old.size):
+        if old.etag:
+            headers["If-None-Match"] = old.etag
+        if old.last_modified:
+            headers["If-Modified-Since"] = old.last_modified
+
+    part_path = f"{dest_path}.part"
+    try:
+        with session.open(url, headers=headers) as response:
+            if response.status == 304:
+                return "current"
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            digest = hashlib.sha256()
+            size = 0
+            with open(part_path, "wb") as handle:
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    handle.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+    except HTTPError as exc:
+        if exc.code in (404, 410):
+            return "missing"
+        raise
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+    os.replace(part_path, dest_path)
+    manifest.set(
+        book_id,
+        MirrorEntry(
+            url=url,
+            path=relative_path,
+            etag=etag,
+            last_modified=last_modified,
+            size=size,
+            sha256=digest.hexdigest(),
+        ),
+    )
+    return "downloaded"
+
+
+def _has_size(path: str, size: int) -> bool:
+    try:
+        return os.path.getsize(path) == size
+    except OSError:
+        return False
+
+
+def _map_bounded(
+    func: Callable[[int], str], ids: Iterable[int], workers: int
+) -> Iterator[tuple[int, str | BaseException]]:
+    executor = ThreadPoolExecutor(max_workers=workers)
+    window: deque[tuple[int, Future[str]]] = deque()
+
+    def drain() -> tuple[int, str | BaseException]:
+        book_id, future = window.popleft()
+        try:
+            return book_id, future.result()
+        except Exception as exc:
+            return book_id, exc
+
+    try:
+        for book_id in ids:
+            window.append((book_id, executor.submit(func, book_id)))
+            if len(window) > workers * 2:
+                yield drain()
+        while window:
+            yield drain()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
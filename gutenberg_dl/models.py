@@ -18,6 +18,16 @@ class ImageAsset:
     content: bytes
 
 
+@dataclass(frozen=True)
+class BookMetadata:
+    title: str
+    author: str
+    language: str
+    identifier: str
+    description: str | None
+    source_url: str
+
+
 @dataclass(frozen=True)
 class Book:
     title: str
@@ -28,3 +38,14 @@ class Book:
     source_url: str
     chapters: list[Chapter]
     images: list[ImageAsset]
+
+    @property
+    def metadata(self) -> BookMetadata:
+        return BookMetadata(
+            title=self.title,
+            author=self.author,
+            language=self.language,
+            identifier=self.identifier,
+            description=self.description,
+            source_url=self.source_url,
+        )
@@ -1,10 +1,46 @@
 from __future__ import annotations
 
+import http.client
+import io
+import os
+import socket
 import ssl
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
 from dataclasses import dataclass
-from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+from urllib.parse import urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass
+
+from .cache import ResponseCache
+from .decoding import DEFAULT_MAX_DECODED_SIZE, accept_encoding, decode_body
+from .events import CACHE_HIT, Event, EventHandler
+from .profiling import profiled, span
+from .ratelimit import (
+    PUSHBACK_STATUSES,
+    HostLimiter,
+    RateLimiter,
+    RetryBudget,
+    RetryPolicy,
+    parse_retry_after,
+)
 
 DEFAULT_USER_AGENT = "gutenberg-dl/0.1 (+https://github.com/holgern/gutenberg-dl)"
+DEFAULT_ACCEPT = "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
+
+CHUNK_SIZE = 64 * 1024
+DOWNLOAD_ATTEMPTS = 3
+MAX_REDIRECTS = 10
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
 
 
 @dataclass(frozen=True)
@@ -12,30 +48,565 @@ class FetchResult:
     content: bytes
     final_url: str
     content_type: str | None
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+@dataclass(frozen=True)
+class DownloadedFile:
+    path: str
+    final_url: str
+    content_type: str | None
+    size: int
+    resumed: bool
+
+
+@dataclass
+class SessionStats:
+    requests: int = 0
+    connections_opened: int = 0
+    connections_reused: int = 0
+    cache_hits: int = 0
+    compressed_bytes: int = 0
+    decompressed_bytes: int = 0
+
+    @property
+    def reuse_ratio(self) -> float:
+        total = self.connections_opened + self.connections_reused
+        if not total:
+            return 0.0
+        return self.connections_reused / total
+
+
+@dataclass
+class HttpResponse:
+    status: int
+    reason: str
+    headers: http.client.HTTPMessage
+    final_url: str
+    raw: http.client.HTTPResponse
+
+    @property
+    def content_type(self) -> str | None:
+        return self.headers.get("Content-Type")
+
+    def read(self, amt: int | None = None) -> bytes:
+        return self.raw.read(amt)
+
+
+_PoolKey = tuple[str, str, int]
+
+
+class HttpSession:
+    """Share keep-alive connections and one SSL context across requests.
+
+    Idle connections are pooled per scheme, host and port. The session is safe
+    to use from several threads at once. Failed connections, timeouts and
+    responses with a status in ``retry.statuses`` are retried with backoff.
+    An optional ``rate_limiter`` throttles requests per host and reduces
+    concurrency when the server answers ``429`` or ``503``. :meth:`fetch` and
+    :meth:`revalidate` accept compressed responses and decompress them up to
+    ``max_decoded_size`` bytes.
+    """
+
+    def __init__(
+        self,
+        max_idle_per_host: int = 8,
+        user_agent: str = DEFAULT_USER_AGENT,
+        cache: ResponseCache | None = None,
+        on_event: EventHandler | None = None,
+        retry: RetryPolicy | None = None,
+        rate_limiter: RateLimiter | None = None,
+        max_decoded_size: int = DEFAULT_MAX_DECODED_SIZE,
+    ) -> None:
+        self.max_idle_per_host = max_idle_per_host
+        self.user_agent = user_agent
+        self.cache = cache
+        self.on_event = on_event
+        self.retry = retry or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.max_decoded_size = max_decoded_size
+        self.stats = SessionStats()
+        self._context = ssl.create_default_context()
+        self._proxies = getproxies()
+        self._idle: dict[_PoolKey, list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> HttpSession:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            pools = list(self._idle.values())
+            self._idle.clear()
+        for pool in pools:
+            for conn in pool:
+                conn.close()
+
+    @profiled("HttpSession.fetch")
+    def fetch(
+        self,
+        url: str,
+        timeout: float = 30,
+        headers: dict[str, str] | None = None,
+    ) -> FetchResult:
+        entry = self.cache.lookup(url) if self.cache is not None else None
+        headers = {"Accept-Encoding": accept_encoding(), **(headers or {})}
+        request_headers = dict(headers)
+        if entry is not None:
+            request_headers.update(entry.conditional_headers())
+
+        budget = RetryBudget(self.retry)
+        while True:
+            try:
+                with self.open(
+                    url, timeout=timeout, headers=request_headers, budget=budget
+                ) as response:
+                    content = self._read_body(response)
+                break
+            except http.client.IncompleteRead:
+                if budget.exhausted:
+                    raise
+                time.sleep(budget.delay())
+                budget.attempt += 1
+
+        if entry is not None and response.status == 304:
+            cached = self.cache.read(entry) if self.cache is not None else None
+            if cached is not None:
+                with self._lock:
+                    self.stats.cache_hits += 1
+                if self.on_event is not None:
+                    self.on_event(Event(CACHE_HIT, url=url, bytes=len(cached)))
+                return FetchResult(
+                    content=cached,
+                    final_url=entry.final_url,
+                    content_type=entry.content_type,
+                    etag=entry.etag,
+                    last_modified=entry.last_modified,
+                )
+            with self.open(url, timeout=timeout, headers=headers) as response:
+                content = self._read_body(response)
+
+        return self._complete(url, response, content)
+
+    def revalidate(
+        self,
+        url: str,
+        etag: str | None,
+        last_modified: str | None,
+        timeout: float = 30,
+    ) -> FetchResult | None:
+        """Fetch ``url`` unless it still matches the given validators.
+
+        Returns ``None`` when the server answers ``304 Not Modified``.
+        """
+        headers = {"Accept-Encoding": accept_encoding()}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        with self.open(url, timeout=timeout, headers=headers) as response:
+            content = self._read_body(response)
+        if response.status == 304:
+            return None
+        return self._complete(url, response, content)
+
+    def _read_body(self, response: HttpResponse) -> bytes:
+        coding = response.headers.get("Content-Encoding")
+        if not coding or coding.strip().lower() == "identity":
+            return response.read()
+        received = 0
+
+        def counted() -> Iterator[bytes]:
+            nonlocal received
+            while True:
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                received += len(chunk)
+                yield chunk
+
+        content = decode_body(counted(), coding, self.max_decoded_size)
+        with self._lock:
+            self.stats.compressed_bytes += received
+            self.stats.decompressed_bytes += len(content)
+        return content
+
+    def _complete(
+        self, url: str, response: HttpResponse, content: bytes
+    ) -> FetchResult:
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if self.cache is not None and response.status == 200:
+            self.cache.store(
+                url,
+                response.final_url,
+                content,
+                response.content_type,
+                etag,
+                last_modified,
+            )
+        return FetchResult(
+            content=content,
+            final_url=response.final_url,
+            content_type=response.content_type,
+            etag=etag,
+            last_modified=last_modified,
+        )
+
+    @contextmanager
+    def open(
+        self,
+        url: str,
+        timeout: float = 30,
+        headers: dict[str, str] | None = None,
+        budget: RetryBudget | None = None,
+    ) -> Iterator[HttpResponse]:
+        """Send a GET request and yield the response once the body can be read.
+
+        Pass ``budget`` to count the retries against the attempts of a caller
+        that also repeats the request.
+        """
+        request_headers = {"User-Agent": self.user_agent, "Accept": DEFAULT_ACCEPT}
+        if headers:
+            request_headers.update(headers)
+        budget = budget or RetryBudget(self.retry)
 
+        for _ in range(MAX_REDIRECTS + 1):
+            key, conn, raw, limiter = self._send_retrying(
+                url, timeout, request_headers, budget
+            )
+            response = HttpResponse(
+                status=raw.status,
+                reason=raw.reason,
+                headers=raw.headers,
+                final_url=url,
+                raw=raw,
+            )
+            location = raw.getheader("Location")
+            if raw.status in REDIRECT_STATUSES and location:
+                raw.read()
+                self._release(key, conn, raw, limiter)
+                url = urljoin(url, location)
+                continue
+            if raw.status >= 400:
+                body = raw.read()
+                self._release(key, conn, raw, limiter)
+                raise HTTPError(
+                    url, raw.status, raw.reason, raw.headers, io.BytesIO(body)
+                )
+            try:
+                yield response
+            finally:
+                self._release(key, conn, raw, limiter)
+            return
 
-def fetch_bytes(url: str, timeout: int = 30) -> FetchResult:
-    request = Request(
-        url,
-        headers={
-            "User-Agent": DEFAULT_USER_AGENT,
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        },
+        raise HTTPError(url, 310, "Too many redirects", http.client.HTTPMessage(), None)
+
+    def _send_retrying(
+        self, url: str, timeout: float, headers: dict[str, str], budget: RetryBudget
+    ) -> tuple[
+        _PoolKey,
+        http.client.HTTPConnection,
+        http.client.HTTPResponse,
+        HostLimiter | None,
+    ]:
+        limiter = None
+        if self.rate_limiter is not None:
+            limiter = self.rate_limiter.host(urlsplit(url).hostname or "")
+        while True:
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                key, conn, raw = self._send(url, timeout, headers)
+            except (socket.timeout, ConnectionError):
+                if limiter is not None:
+                    limiter.release()
+                    limiter.pushback()
+                if budget.exhausted:
+                    raise
+                time.sleep(budget.delay())
+                budget.attempt += 1
+                continue
+            except BaseException:
+                if limiter is not None:
+                    limiter.release()
+                raise
+
+            if raw.status < 400:
+                if limiter is not None:
+                    limiter.success()
+                return key, conn, raw, limiter
+            retry_after = parse_retry_after(raw.getheader("Retry-After"))
+            delay = budget.delay(retry_after)
+            if limiter is not None and raw.status in PUSHBACK_STATUSES:
+                limiter.pushback(delay)
+            if raw.status not in self.retry.statuses or budget.exhausted:
+                return key, conn, raw, limiter
+            raw.read()
+            self._release(key, conn, raw, limiter)
+            time.sleep(delay)
+            budget.attempt += 1
+
+    def _send(
+        self, url: str, timeout: float, headers: dict[str, str]
+    ) -> tuple[_PoolKey, http.client.HTTPConnection, http.client.HTTPResponse]:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {url}")
+        host = parts.hostname or ""
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, host, port)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        conn = self._acquire(key, timeout)
+        reused = conn is not None
+        if conn is None:
+            conn = self._connect(key, timeout)
+        proxied_http = scheme == "http" and self._proxy_for(key) is not None
+        target = url.split("#", 1)[0] if proxied_http else path
+
+        try:
+            raw = _request(conn, target, headers)
+        except STALE_CONNECTION_ERRORS:
+            if not reused:
+                raise
+            conn = self._connect(key, timeout)
+            raw = _request(conn, target, headers)
+
+        with self._lock:
+            self.stats.requests += 1
+        return key, conn, raw
+
+    def _acquire(
+        self, key: _PoolKey, timeout: float
+    ) -> http.client.HTTPConnection | None:
+        with self._lock:
+            pool = self._idle.get(key)
+            if not pool:
+                return None
+            conn = pool.pop()
+            self.stats.connections_reused += 1
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn
+
+    def _connect(self, key: _PoolKey, timeout: float) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        proxy = self._proxy_for(key)
+        conn: http.client.HTTPConnection
+        if proxy is None:
+            if scheme == "https":
+                conn = http.client.HTTPSConnection(
+                    host, port, timeout=timeout, context=self._context
+                )
+            else:
+                conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        else:
+            proxy_host, proxy_port = proxy
+            if scheme == "https":
+                conn = http.client.HTTPSConnection(
+                    proxy_host, proxy_port, timeout=timeout, context=self._context
+                )
+                conn.set_tunnel(host, port)
+            else:
+                conn = http.client.HTTPConnection(
+                    proxy_host, proxy_port, timeout=timeout
+                )
+        with self._lock:
+            self.stats.connections_opened += 1
+        return conn
+
+    def _release(
+        self,
+        key: _PoolKey,
+        conn: http.client.HTTPConnection,
+        raw: http.client.HTTPResponse,
+        limiter: HostLimiter | None = None,
+    ) -> None:
+        if limiter is not None:
+            limiter.release()
+        if raw.will_close or not raw.isclosed():
+            conn.close()
+            return
+        with self._lock:
+            pool = self._idle.setdefault(key, [])
+            if len(pool) < self.max_idle_per_host:
+                pool.append(conn)
+                return
+        conn.close()
+
+    def _proxy_for(self, key: _PoolKey) -> tuple[str, int] | None:
+        scheme, host, _ = key
+        proxy_url = self._proxies.get(scheme)
+        if not proxy_url or proxy_bypass(host):
+            return None
+        proxy = urlsplit(proxy_url if "://" in proxy_url else f"http://{proxy_url}")
+        if not proxy.hostname:
+            return None
+        return proxy.hostname, proxy.port or 80
+
+
+def _request(
+    conn: http.client.HTTPConnection, target: str, headers: dict[str, str]
+) -> http.client.HTTPResponse:
+    try:
+        if conn.sock is None:
+            with span("connect"):
+                conn.connect()
+        conn.request("GET", target, headers=headers)
+        return conn.getresponse()
+    except BaseException:
+        conn.close()
+        raise
+
+
+_default_session: HttpSession | None = None
+_default_session_lock = threading.Lock()
+
+
+def get_default_session() -> HttpSession:
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = HttpSession()
+        return _default_session
+
+
+@profiled("fetch_bytes")
+def fetch_bytes(
+    url: str, timeout: int = 30, session: HttpSession | None = None
+) -> FetchResult:
+    session = session or get_default_session()
+    return session.fetch(url, timeout=timeout)
+
+
+def revalidate_bytes(
+    url: str,
+    etag: str | None,
+    last_modified: str | None,
+    timeout: int = 30,
+    session: HttpSession | None = None,
+) -> FetchResult | None:
+    session = session or get_default_session()
+    return session.revalidate(url, etag, last_modified, timeout=timeout)
+
+
+def fetch_text(
+    url: str, timeout: int = 30, session: HttpSession | None = None
+) -> FetchResult:
+    return fetch_bytes(url, timeout=timeout, session=session)
+
+
+def download_file(
+    url: str,
+    dest_path: str,
+    timeout: int = 60,
+    session: HttpSession | None = None,
+) -> DownloadedFile:
+    """Stream ``url`` to ``dest_path`` through a resumable ``.part`` file.
+
+    A partial file left by an interrupted run is continued with an HTTP Range
+    request guarded by ``If-Range``. The finished file is renamed into place.
+    """
+    session = session or get_default_session()
+    part_path = f"{dest_path}.part"
+    validator_path = f"{part_path}.validator"
+
+    for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+        try:
+            result = _download_part(url, part_path, validator_path, timeout, session)
+            break
+        except (http.client.IncompleteRead, ConnectionError, socket.timeout):
+            if attempt == DOWNLOAD_ATTEMPTS:
+                raise
+        except HTTPError as exc:
+            if exc.code != 416:
+                raise
+            _remove_file(part_path)
+            if attempt == DOWNLOAD_ATTEMPTS:
+                raise
+
+    os.replace(part_path, dest_path)
+    _remove_file(validator_path)
+    return DownloadedFile(
+        path=dest_path,
+        final_url=result.final_url,
+        content_type=result.content_type,
+        size=result.size,
+        resumed=result.resumed,
     )
-    context = ssl.create_default_context()
-    with urlopen(request, timeout=timeout, context=context) as response:
-        content = response.read()
-        final_url = response.geturl()
-        content_type = response.headers.get("Content-Type")
-    return FetchResult(content=content, final_url=final_url, content_type=content_type)
 
 
-def fetch_text(url: str, timeout: int = 30) -> FetchResult:
-    return fetch_bytes(url, timeout=timeout)
+def _download_part(
+    url: str,
+    part_path: str,
+    validator_path: str,
+    timeout: float,
+    session: HttpSession,
+) -> DownloadedFile:
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    validator = _read_validator(validator_path) if offset else None
+    headers = {"Accept-Encoding": "identity"}
+    if offset and validator:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator
+
+    with session.open(url, timeout=timeout, headers=headers) as response:
+        content_range = response.headers.get("Content-Range") or ""
+        resumed = response.status == 206 and content_range.startswith(
+            f"bytes {offset}-"
+        )
+        if not resumed:
+            offset = 0
+            _remove_file(validator_path)
+            validator = _strong_validator(response)
+            if validator:
+                with open(validator_path, "w", encoding="utf-8") as handle:
+                    handle.write(validator)
+
+        size = offset
+        with open(part_path, "ab" if resumed else "wb") as handle:
+            while True:
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                handle.write(chunk)
+                size += len(chunk)
+
+    return DownloadedFile(
+        path=part_path,
+        final_url=response.final_url,
+        content_type=response.content_type,
+        size=size,
+        resumed=resumed,
+    )
+
+
+def _strong_validator(response: HttpResponse) -> str | None:
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def _read_validator(path: str) -> str | None:
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return handle.read().strip() or None
+    except OSError:
+        return None
 
 
-def download_file(url: str, dest_path: str, timeout: int = 60) -> FetchResult:
-    result = fetch_bytes(url, timeout=timeout)
-    with open(dest_path, "wb") as handle:
-        handle.write(result.content)
-    return result
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,204 @@
+"""Opt-in profiling of a download run.
+
+While a :class:`Profiler` is active it runs ``cProfile`` on the thread that
+started it and records wall-clock spans of the functions marked with
+:func:`profiled` on every thread. Without an active profiler a marked
+function costs one global lookup per call. Work done in worker processes is
+not recorded; process pools pass :func:`reset_worker` as their initializer.
+"""
+
+from __future__ import annotations
+
+import functools
+import io
+import re
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import Callable, TypeVar
+
+F = TypeVar("F", bound=Callable[..., object])
+
+REPORT_LIMIT = 40
+
+_active: Profiler | None = None
+_NO_SPAN = nullcontext()
+
+
+@dataclass
+class SpanStats:
+    count: int = 0
+    seconds: float = 0.0
+    self_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+
+@dataclass
+class _Frame:
+    name: str
+    nested_seconds: float = 0.0
+
+
+def profiled(name: str) -> Callable[[F], F]:
+    """Record every call of the decorated function as a span ``name``."""
+
+    def decorate(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: object, **kwargs: object) -> object:
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.span(name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def span(name: str) -> AbstractContextManager[None]:
+    """Record the ``with`` block as a span if a profiler is active."""
+    profiler = _active
+    if profiler is None:
+        return _NO_SPAN
+    return profiler.span(name)
+
+
+def reset_worker() -> None:
+    """Forget the profiler a forked worker process inherited.
+
+    The copy may have been forked while another thread held its lock, so
+    marked functions in the worker must not record into it.
+    """
+    global _active
+    _active = None
+
+
+class Profiler:
+    """Collect a ``cProfile`` profile and wall-clock spans of one run.
+
+    Spans nest per thread. ``stacks`` maps each ``thread;outer;inner`` span
+    path to the time spent in it outside of nested spans, which is the
+    collapsed-stack format read by flamegraph tools.
+    """
+
+    def __init__(self) -> None:
+        import cProfile
+
+        self.spans: dict[str, SpanStats] = {}
+        self.stacks: dict[str, float] = {}
+        self.elapsed = 0.0
+        self._profile = cProfile.Profile()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started: float | None = None
+        self._thread = ""
+
+    def __enter__(self) -> Profiler:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        global _active
+        if _active is not None:
+            raise RuntimeError("Another profiler is already active.")
+        _active = self
+        self._thread = _thread_label()
+        self._started = time.perf_counter()
+        self._profile.enable()
+
+    def stop(self) -> None:
+        global _active
+        if self._started is None:
+            return
+        self._profile.disable()
+        self.elapsed = time.perf_counter() - self._started
+        self._started = None
+        if _active is self:
+            _active = None
+        prefix = f"{self._thread};"
+        with self._lock:
+            spanned = sum(
+                seconds
+                for path, seconds in self.stacks.items()
+                if path.startswith(prefix)
+            )
+            self.stacks[self._thread] = max(self.elapsed - spanned, 0.0)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        stack: list[_Frame] = self._local.__dict__.setdefault("stack", [])
+        frame = _Frame(name)
+        stack.append(frame)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            stack.pop()
+            if stack:
+                stack[-1].nested_seconds += seconds
+            path = ";".join([_thread_label(), *(entry.name for entry in stack), name])
+            self_seconds = seconds - frame.nested_seconds
+            with self._lock:
+                stats = self.spans.setdefault(name, SpanStats())
+                stats.count += 1
+                stats.seconds += seconds
+                stats.self_seconds += self_seconds
+                stats.max_seconds = max(stats.max_seconds, seconds)
+                self.stacks[path] = self.stacks.get(path, 0.0) + self_seconds
+
+    def report(self) -> str:
+        """Return the span table followed by the top ``cProfile`` entries."""
+        import pstats
+
+        lines = [
+            f"Wall time: {self.elapsed:.3f}s",
+            "",
+            f"{'span':<24} {'calls':>7} {'total':>10} {'self':>10} {'max':>9}",
+        ]
+        with self._lock:
+            spans = sorted(self.spans.items(), key=lambda item: -item[1].seconds)
+        for name, stats in spans:
+            lines.append(
+                f"{name:<24} {stats.count:>7} {stats.seconds:>9.3f}s "
+                f"{stats.self_seconds:>9.3f}s {stats.max_seconds:>8.3f}s"
+            )
+        lines.append("")
+        lines.append(f"cProfile of the {self._thread} thread:")
+        buffer = io.StringIO()
+        profile_stats = pstats.Stats(self._profile, stream=buffer)
+        profile_stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(REPORT_LIMIT)
+        lines.append(buffer.getvalue())
+        return "\n".join(lines)
+
+    def collapsed_stacks(self) -> str:
+        with self._lock:
+            stacks = sorted(self.stacks.items())
+        return "".join(
+            f"{path} {round(seconds * 1_000_000)}\n"
+            for path, seconds in stacks
+            if seconds > 0
+        )
+
+    def write(self, prefix: str) -> list[str]:
+        """Write ``<prefix>.txt``, ``<prefix>.collapsed`` and ``<prefix>.prof``."""
+        self.stop()
+        paths = [f"{prefix}.txt", f"{prefix}.collapsed", f"{prefix}.prof"]
+        with open(paths[0], "w", encoding="utf-8") as handle:
+            handle.write(self.report())
+        with open(paths[1], "w", encoding="utf-8") as handle:
+            handle.write(self.collapsed_stacks())
+        self._profile.dump_stats(paths[2])
+        return paths
+
+
+def _thread_label() -> str:
+    # Pool threads are numbered per worker; merge them into one stack root.
+    name = re.sub(r"_\d+$", "", threading.current_thread().name)
+    return re.sub(r"[;\s]+", "-", name)
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import threading
+
+from rich.console import Console
+from rich.progress import (
+    DownloadColumn,
+    Progress,
+    SpinnerColumn,
+    TextColumn,
+    TimeElapsedColumn,
+    TransferSpeedColumn,
+)
+
+from .events import (
+    CACHE_HIT,
+    CHAPTER_FETCHED,
+    EPUB_DOWNLOADED,
+    EPUB_WRITTEN,
+    IMAGE_FETCHED,
+    NETWORK_EVENTS,
+    Event,
+)
+
+
+class ProgressDisplay:
+    """Live progress bar on stderr fed by progress events.
+
+    Shows downloaded bytes, the transfer rate and counts of chapters, images,
+    cache hits and written books. Use it as an event handler.
+    """
+
+    def __init__(self, console: Console | None = None) -> None:
+        self._progress = Progress(
+            SpinnerColumn(),
+            TextColumn("{task.description}"),
+            DownloadColumn(),
+            TransferSpeedColumn(),
+            TimeElapsedColumn(),
+            console=console or Console(stderr=True),
+            transient=True,
+        )
+        self._task = self._progress.add_task("Starting", total=None)
+        self._counts = {CHAPTER_FETCHED: 0, IMAGE_FETCHED: 0, CACHE_HIT: 0}
+        self._books = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> ProgressDisplay:
+        self._progress.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._progress.stop()
+
+    def print(self, message: str) -> None:
+        self._progress.console.print(message, markup=False, highlight=False)
+
+    def __call__(self, event: Event) -> None:
+        with self._lock:
+            if event.kind in self._counts:
+                self._counts[event.kind] += 1
+            elif event.kind in (EPUB_WRITTEN, EPUB_DOWNLOADED):
+                self._books += 1
+            description = (
+                f"{self._counts[CHAPTER_FETCHED]} chapters, "
+                f"{self._counts[IMAGE_FETCHED]} images, "
+                f"{self._counts[CACHE_HIT]} cached, "
+                f"{self._books} books done"
+            )
+        advance = event.bytes if event.kind in NETWORK_EVENTS else 0
+        self._progress.update(self._task, advance=advance, description=description)
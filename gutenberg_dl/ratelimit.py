@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import email.utils
+import random
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+DEFAULT_MAX_CONNECTIONS = 8
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+PUSHBACK_STATUSES = frozenset({429, 503})
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often and how long to wait before repeating a failed request.
+
+    The delay grows exponentially from ``backoff`` up to ``max_backoff`` with
+    random jitter. A ``Retry-After`` value sent by the server is used instead
+    as long as it does not exceed ``max_retry_after``.
+    """
+
+    attempts: int = 4
+    backoff: float = 0.5
+    max_backoff: float = 30.0
+    max_retry_after: float = 300.0
+    statuses: frozenset[int] = field(default=RETRY_STATUSES)
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        if retry_after is not None and retry_after <= self.max_retry_after:
+            return max(retry_after, 0.0)
+        base = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return base / 2 + random.uniform(0, base / 2)
+
+
+@dataclass
+class RetryBudget:
+    """The attempts made for one request under a :class:`RetryPolicy`.
+
+    Every step that may repeat the request shares one budget, so connection
+    errors, retryable statuses and truncated bodies together allow at most
+    ``policy.attempts`` tries.
+    """
+
+    policy: RetryPolicy
+    attempt: int = 1
+
+    @property
+    def exhausted(self) -> bool:
+        return self.attempt >= self.policy.attempts
+
+    def delay(self, retry_after: float | None = None) -> float:
+        return self.policy.delay(self.attempt, retry_after)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Return the delay in seconds of a ``Retry-After`` header, if valid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+class HostLimiter:
+    """Token bucket plus adaptive concurrency limit for one host.
+
+    ``rate`` requests per second are admitted with bursts of up to ``burst``.
+    The number of concurrent requests starts at ``max_connections``; it is
+    halved whenever the server pushes back and grows again by about one per
+    round of successful requests.
+    """
+
+    def __init__(
+        self,
+        rate: float | None = None,
+        burst: int = 1,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    ) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_connections = max(max_connections, 1)
+        self.limit = float(self.max_connections)
+        self.active = 0
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0 and self.active < int(self.limit):
+                    wait = self._take_token(now)
+                    if wait <= 0:
+                        self.active += 1
+                        return
+                self._condition.wait(timeout=wait if wait > 0 else None)
+
+    def release(self) -> None:
+        with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    def success(self) -> None:
+        with self._condition:
+            if self.limit < self.max_connections:
+                self.limit = min(self.max_connections, self.limit + 1 / self.limit)
+                self._condition.notify_all()
+
+    def pushback(self, delay: float = 0.0) -> None:
+        with self._condition:
+            self.limit = max(1.0, self.limit / 2)
+            if delay > 0:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def _take_token(self, now: float) -> float:
+        if self.rate is None:
+            return 0.0
+        self._tokens = min(
+            float(self.burst), self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class RateLimiter:
+    """Per-host :class:`HostLimiter` instances shared by one session."""
+
+    def __init__(
+        self,
+        rate: float | None = None,
+        burst: int = 1,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_connections = max_connections
+        self._hosts: dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def host(self, host: str) -> HostLimiter:
+        with self._lock:
+            limiter = self._hosts.get(host)
+            if limiter is None:
+                limiter = HostLimiter(self.rate, self.burst, self.max_connections)
+                self._hosts[host] = limiter
+            return limiter
+
+    @contextmanager
+    def slot(self, host: str) -> Iterator[HostLimiter]:
+        limiter = self.host(host)
+        limiter.acquire()
+        try:
+            yield limiter
+        finally:
+            limiter.release()
@@ -1,4 +1,49 @@
-from .gutenberg import download_epub
-from .projekt import fetch_book
+"""Source backends.
 
-__all__ = ["download_epub", "fetch_book"]
+Submodules are imported on first attribute access, so importing this package
+does not pull in BeautifulSoup or ebooklib.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .gutenberg import download_epub, download_epub_async
+    from .projekt import (
+        SyncResult,
+        fetch_book,
+        fetch_book_async,
+        stream_book,
+        sync_book,
+    )
+
+_EXPORTS = {
+    "SyncResult": "projekt",
+    "download_epub": "gutenberg",
+    "download_epub_async": "gutenberg",
+    "fetch_book": "projekt",
+    "fetch_book_async": "projekt",
+    "stream_book": "projekt",
+    "sync_book": "projekt",
+}
+
+__all__ = [
+    "SyncResult",
+    "download_epub",
+    "download_epub_async",
+    "fetch_book",
+    "fetch_book_async",
+    "stream_book",
+    "sync_book",
+]
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
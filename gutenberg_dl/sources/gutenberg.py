@@ -1,17 +1,21 @@
 from __future__ import annotations
 
+import io
+import os
+import posixpath
 import re
-import shutil
-import tempfile
+import time
 import zipfile
+from collections.abc import Iterator
 from dataclasses import dataclass
-from typing import Callable
-from urllib.parse import urlparse
-from xml.etree.ElementTree import Element
+from typing import TYPE_CHECKING, Callable
+from urllib.parse import unquote, urlparse
 
 from defusedxml import ElementTree
 
-from ..net import download_file
+from ..events import EPUB_DOWNLOADED, Event, EventHandler
+from ..models import BookMetadata, Chapter, ImageAsset
+from ..net import HttpSession, download_file
 from ..utils import (
     EpubMetadata,
     ensure_parent_dir,
@@ -19,6 +23,13 @@ from ..utils import (
     resolve_output_path,
 )
 
+if TYPE_CHECKING:
+    from ..aionet import AsyncHttpSession
+    from .registry import BuildOptions
+
+METADATA_FIELDS = {"title", "creator", "language", "identifier"}
+CHAPTER_MEDIA_TYPES = {"application/xhtml+xml", "text/html"}
+
 
 @dataclass(frozen=True)
 class DownloadResult:
@@ -31,22 +42,132 @@ def download_epub(
     out_path: str | None,
     no_images: bool,
     log: Callable[[str], None],
+    session: HttpSession | None = None,
+    on_event: EventHandler | None = None,
 ) -> DownloadResult:
     download_url = derive_download_url(url, no_images)
     log(f"Downloading EPUB from {download_url}")
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".epub") as tmp:
-        temp_path = tmp.name
-    download_file(download_url, temp_path)
+    download_dir = _download_dir(out_path)
+    os.makedirs(download_dir, exist_ok=True)
+    file_name = os.path.basename(urlparse(download_url).path) or "book.epub"
+    temp_path = os.path.join(download_dir, f".gutenberg-dl-{file_name}")
+    started = time.perf_counter()
+    downloaded = download_file(download_url, temp_path, session=session)
+    if on_event is not None:
+        on_event(
+            Event(
+                EPUB_DOWNLOADED,
+                url=download_url,
+                bytes=downloaded.size,
+                duration=time.perf_counter() - started,
+            )
+        )
+
+    return _move_into_place(temp_path, out_path)
+
+
+async def download_epub_async(
+    url: str,
+    out_path: str | None,
+    no_images: bool,
+    log: Callable[[str], None],
+    session: AsyncHttpSession | None = None,
+    on_event: EventHandler | None = None,
+) -> DownloadResult:
+    """Asyncio counterpart of :func:`download_epub`.
+
+    The metadata of the downloaded file is read in the loop's default
+    executor. Interrupted downloads are not resumed.
+    """
+    import asyncio
+
+    from ..aionet import AsyncHttpSession, download_file_async
 
-    metadata = read_epub_metadata(temp_path)
-    default_name = make_book_filename(metadata.author, metadata.title)
-    output_path = resolve_output_path(out_path, default_name)
-    ensure_parent_dir(output_path)
-    shutil.move(temp_path, output_path)
+    if session is None:
+        async with AsyncHttpSession() as own_session:
+            return await download_epub_async(
+                url,
+                out_path,
+                no_images,
+                log,
+                session=own_session,
+                on_event=on_event,
+            )
+
+    download_url = derive_download_url(url, no_images)
+    log(f"Downloading EPUB from {download_url}")
+    download_dir = _download_dir(out_path)
+    os.makedirs(download_dir, exist_ok=True)
+    file_name = os.path.basename(urlparse(download_url).path) or "book.epub"
+    temp_path = os.path.join(download_dir, f".gutenberg-dl-{file_name}")
+    started = time.perf_counter()
+    downloaded = await download_file_async(download_url, temp_path, session)
+    if on_event is not None:
+        on_event(
+            Event(
+                EPUB_DOWNLOADED,
+                url=download_url,
+                bytes=downloaded.size,
+                duration=time.perf_counter() - started,
+            )
+        )
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _move_into_place, temp_path, out_path)
+
+
+def download_source(url: str, options: BuildOptions, log: Callable[[str], None]) -> str:
+    """Registry handler for gutenberg.org URLs."""
+    result = download_epub(
+        url,
+        options.out_path,
+        options.no_images,
+        log,
+        session=options.session,
+        on_event=options.on_event,
+    )
+    if options.formats == ("epub",):
+        return result.output_path
+
+    from ..formats import format_paths, write_formats
+
+    output_paths = format_paths(result.output_path, options.formats)
+    derived = {name: path for name, path in output_paths.items() if name != "epub"}
+    try:
+        metadata, items = read_epub_book(result.output_path, url)
+        write_formats(derived, metadata, items)
+    finally:
+        if "epub" not in output_paths:
+            os.remove(result.output_path)
+    first_path, *other_paths = output_paths.values()
+    for path in other_paths:
+        log(f"Wrote {path}")
+    return first_path
+
+
+def _move_into_place(temp_path: str, out_path: str | None) -> DownloadResult:
+    try:
+        metadata = read_epub_metadata(temp_path)
+        default_name = make_book_filename(metadata.author, metadata.title)
+        output_path = resolve_output_path(out_path, default_name)
+        ensure_parent_dir(output_path)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
 
     return DownloadResult(output_path=output_path, metadata=metadata)
 
 
+def _download_dir(out_path: str | None) -> str:
+    if not out_path:
+        return os.getcwd()
+    if out_path.endswith(os.sep) or os.path.isdir(out_path):
+        return out_path
+    return os.path.dirname(out_path) or os.getcwd()
+
+
 def derive_download_url(url: str, no_images: bool) -> str:
     parsed = urlparse(url)
     path = parsed.path
@@ -70,33 +191,129 @@ def derive_download_url(url: str, no_images: bool) -> str:
 
 
 def read_epub_metadata(path: str) -> EpubMetadata:
+    """Read title, author, language and identifier from an EPUB file.
+
+    The package document is parsed incrementally and parsing stops at the end
+    of its ``<metadata>`` element, so manifest and spine are never read.
+    """
     with zipfile.ZipFile(path, "r") as zip_handle:
-        container = zip_handle.read("META-INF/container.xml")
-        container_root = ElementTree.fromstring(container)
-        rootfile = container_root.find(".//{*}rootfile")
-        if rootfile is None:
-            return EpubMetadata(title=None, author=None, language=None)
-        opf_path = rootfile.get("full-path")
+        opf_path = _opf_path(zip_handle)
         if not opf_path:
             return EpubMetadata(title=None, author=None, language=None)
         opf_data = zip_handle.read(opf_path)
+    return _parse_opf_metadata(opf_data)
+
+
+def read_epub_book(
+    path: str, source_url: str
+) -> tuple[BookMetadata, Iterator[Chapter | ImageAsset]]:
+    """Read an EPUB back as chapters and images for the other output formats.
+
+    Images come first, then the spine documents in reading order without the
+    navigation document. File names
+    are relative to the package document, like the ones of a built book.
+    The archive is read lazily while the items are consumed.
+    """
+    with zipfile.ZipFile(path, "r") as zip_handle:
+        opf_path = _opf_path(zip_handle)
+        if not opf_path:
+            raise ValueError(f"No package document found in {path}.")
+        opf_data = zip_handle.read(opf_path)
+    info = _parse_opf_metadata(opf_data)
+    metadata = BookMetadata(
+        title=info.title or "Untitled",
+        author=info.author or "",
+        language=info.language or "en",
+        identifier=info.identifier or source_url,
+        description=None,
+        source_url=source_url,
+    )
+    return metadata, _iter_epub_items(path, opf_path, opf_data)
+
+
+def _iter_epub_items(
+    path: str, opf_path: str, opf_data: bytes
+) -> Iterator[Chapter | ImageAsset]:
+    root = ElementTree.fromstring(opf_data)
+    manifest: dict[str, tuple[str, str]] = {}
+    nav_ids: set[str | None] = set()
+    for item in root.iterfind(".//{*}manifest/{*}item"):
+        item_id = item.get("id")
+        href = item.get("href")
+        if item_id and href:
+            manifest[item_id] = (unquote(href), item.get("media-type", ""))
+        if "nav" in item.get("properties", "").split():
+            nav_ids.add(item_id)
+    spine = [
+        manifest[itemref.get("idref", "")]
+        for itemref in root.iterfind(".//{*}spine/{*}itemref")
+        if itemref.get("idref") in manifest and itemref.get("idref") not in nav_ids
+    ]
+
+    base = posixpath.dirname(opf_path)
+    with zipfile.ZipFile(path, "r") as zip_handle:
+        names = set(zip_handle.namelist())
+        for href, media_type in manifest.values():
+            entry = posixpath.normpath(posixpath.join(base, href))
+            if media_type.startswith("image/") and entry in names:
+                yield ImageAsset(
+                    url=href,
+                    file_name=href,
+                    media_type=media_type,
+                    content=zip_handle.read(entry),
+                )
+        for href, media_type in spine:
+            entry = posixpath.normpath(posixpath.join(base, href))
+            if media_type not in CHAPTER_MEDIA_TYPES or entry not in names:
+                continue
+            markup = zip_handle.read(entry).decode("utf-8", errors="replace")
+            yield Chapter(title=_document_title(markup), html=markup, file_name=href)
+
+
+def _opf_path(zip_handle: zipfile.ZipFile) -> str | None:
+    container = zip_handle.read("META-INF/container.xml")
+    container_root = ElementTree.fromstring(container)
+    rootfile = container_root.find(".//{*}rootfile")
+    if rootfile is None:
+        return None
+    return rootfile.get("full-path") or None
+
+
+def _document_title(markup: str) -> str:
+    match = re.search(r"<title[^>]*>(.*?)</title>", markup, re.IGNORECASE | re.DOTALL)
+    return " ".join(match.group(1).split()) if match else ""
+
+
+def _parse_opf_metadata(opf_data: bytes) -> EpubMetadata:
+    found: dict[str, str] = {}
+    unique_id = None
+    identifier = None
+    for event, node in ElementTree.iterparse(
+        io.BytesIO(opf_data), events=("start", "end")
+    ):
+        name = _local_name(node.tag)
+        if event == "start":
+            if name == "package":
+                unique_id = node.get("unique-identifier")
+            continue
+        if name == "metadata":
+            break
+        text = node.text.strip() if node.text else ""
+        if not text or name not in METADATA_FIELDS:
+            continue
+        if name == "identifier":
+            if identifier is None or (unique_id and node.get("id") == unique_id):
+                identifier = text
+            continue
+        found.setdefault(name, text)
+
+    return EpubMetadata(
+        title=found.get("title"),
+        author=found.get("creator"),
+        language=found.get("language"),
+        identifier=identifier,
+    )
+
 
-    opf_root = ElementTree.fromstring(opf_data)
-    metadata = opf_root.find(".//{*}metadata")
-    if metadata is None:
-        return EpubMetadata(title=None, author=None, language=None)
-
-    title = _find_text(metadata, "title")
-    author = _find_text(metadata, "creator")
-    language = _find_text(metadata, "language")
-    return EpubMetadata(title=title, author=author, language=language)
-
-
-def _find_text(root: Element, local_name: str) -> str | None:
-    for node in root.iter():
-        if node.tag.endswith(f"}}{local_name}") or node.tag == local_name:
-            if node.text:
-                text = node.text.strip()
-                if text:
-                    return text
-    return None
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
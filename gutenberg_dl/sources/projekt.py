@@ -3,17 +3,56 @@ from __future__ import annotations
 import hashlib
 import mimetypes
 import os
+import re
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Callable
+from typing import TYPE_CHECKING, Any, Callable, TypeVar
 from urllib.parse import urljoin, urlparse
 
 from bs4 import BeautifulSoup, Tag
 
+from ..checkpoint import BookCheckpoint
 from ..epub import wrap_chapter_html
-from ..models import Book, Chapter, ImageAsset
-from ..net import fetch_bytes
+from ..events import (
+    CHAPTER_FETCHED,
+    CHAPTER_PARSED,
+    IMAGE_FETCHED,
+    PAGE_FETCHED,
+    Event,
+    EventHandler,
+)
+from ..models import Book, BookMetadata, Chapter, ImageAsset
+from ..net import FetchResult, HttpSession, fetch_bytes, revalidate_bytes
+from ..profiling import profiled, reset_worker
 from ..utils import clean_text, guess_extension, slugify, unique_filename
 
+if TYPE_CHECKING:
+    from ..aionet import AsyncHttpSession
+
+_T = TypeVar("_T")
+
+IMAGE_PLACEHOLDER = "gutenberg-dl-image:"
+IMAGE_PLACEHOLDER_RE = re.compile(re.escape(IMAGE_PLACEHOLDER) + r"(\d+)")
+CHAPTER_PARSERS = ("bs4", "stream")
+IMAGE_SOURCE_ATTRS = (
+    "data-lazy-src",
+    "data-src",
+    "data-original",
+    "data-lazy-srcset",
+    "data-srcset",
+    "srcset",
+    "src",
+)
+
 
 @dataclass(frozen=True)
 class ChapterRef:
@@ -26,12 +65,401 @@ def fetch_book(
     no_images: bool,
     log: Callable[[str], None],
     debug_dir: str | None = None,
+    jobs: int = 1,
+    session: HttpSession | None = None,
+    image_jobs: int = 4,
+    work_dir: str | None = None,
+    resume: bool = False,
+    on_event: EventHandler | None = None,
+    parse_workers: int = 1,
+    parser: str = "bs4",
 ) -> Book:
-    page = fetch_bytes(url)
+    metadata, items = stream_book(
+        url,
+        no_images,
+        log,
+        debug_dir=debug_dir,
+        jobs=jobs,
+        session=session,
+        image_jobs=image_jobs,
+        work_dir=work_dir,
+        resume=resume,
+        on_event=on_event,
+        parse_workers=parse_workers,
+        parser=parser,
+    )
+    chapters: list[Chapter] = []
+    images: list[ImageAsset] = []
+    for item in items:
+        if isinstance(item, Chapter):
+            chapters.append(item)
+        else:
+            images.append(item)
+
+    return Book(
+        title=metadata.title,
+        author=metadata.author,
+        language=metadata.language,
+        identifier=metadata.identifier,
+        description=metadata.description,
+        source_url=metadata.source_url,
+        chapters=chapters,
+        images=images,
+    )
+
+
+def stream_book(
+    url: str,
+    no_images: bool,
+    log: Callable[[str], None],
+    debug_dir: str | None = None,
+    jobs: int = 1,
+    session: HttpSession | None = None,
+    image_jobs: int = 4,
+    work_dir: str | None = None,
+    resume: bool = False,
+    on_event: EventHandler | None = None,
+    parse_workers: int = 1,
+    parser: str = "bs4",
+) -> tuple[BookMetadata, Iterator[Chapter | ImageAsset]]:
+    """Read the book page and return its metadata plus a lazy item stream.
+
+    The iterator yields every image before the first chapter that uses it and
+    chapters in their original order, so the items can be written to an EPUB
+    as they arrive without keeping the whole book in memory.
+
+    With ``work_dir`` every parsed chapter and downloaded image is
+    checkpointed; ``resume`` reuses the checkpoints of an earlier run and only
+    fetches what is missing.
+
+    With ``parse_workers`` above one, chapters are parsed on a process pool
+    while later chapters are still downloading. ``parser`` selects the
+    chapter parser from :data:`CHAPTER_PARSERS`. The output is the same
+    either way.
+    """
+    metadata, chapter_refs = _read_book_page(url, session, debug_dir, on_event)
+    checkpoint = None
+    if work_dir:
+        checkpoint = BookCheckpoint(work_dir, metadata.identifier, resume=resume)
+    items = _iter_book_items(
+        chapter_refs,
+        metadata.language,
+        no_images,
+        log,
+        debug_dir,
+        jobs,
+        session,
+        image_jobs,
+        checkpoint,
+        on_event,
+        parse_workers,
+        parser,
+    )
+    return metadata, items
+
+
+class SyncResult:
+    """Outcome of :func:`sync_book`.
+
+    ``changed`` lists the 1-based indices of chapters whose content differs
+    from the last committed sync. ``items`` streams the full book from the
+    refreshed checkpoint. Call :meth:`commit` once the EPUB has been written
+    so the next sync compares against this state.
+    """
+
+    def __init__(
+        self,
+        metadata: BookMetadata,
+        changed: list[int],
+        removed: list[str],
+        up_to_date: bool,
+        items: Iterator[Chapter | ImageAsset],
+        checkpoint: BookCheckpoint,
+        state: dict[str, Any],
+    ) -> None:
+        self.metadata = metadata
+        self.changed = changed
+        self.removed = removed
+        self.up_to_date = up_to_date
+        self.items = items
+        self._checkpoint = checkpoint
+        self._state = state
+
+    def commit(self) -> None:
+        self._checkpoint.save_sync_state(self._state)
+
+
+def sync_book(
+    url: str,
+    no_images: bool,
+    log: Callable[[str], None],
+    work_dir: str,
+    debug_dir: str | None = None,
+    jobs: int = 1,
+    session: HttpSession | None = None,
+    image_jobs: int = 4,
+    on_event: EventHandler | None = None,
+    parse_workers: int = 1,
+    parser: str = "bs4",
+) -> SyncResult:
+    """Refresh the checkpoint of a book and report which chapters changed.
+
+    Chapters from the last sync are revalidated with their stored ``ETag`` or
+    ``Last-Modified`` values. Only chapters the server reports as modified and
+    whose content hash differs are parsed again.
+    """
+    metadata, chapter_refs = _read_book_page(url, session, debug_dir, on_event)
+    checkpoint = BookCheckpoint(work_dir, metadata.identifier, resume=True)
+    previous = checkpoint.load_sync_state() or {}
+    if previous.get("no_images") != no_images:
+        previous = {}
+    previous_chapters: list[dict[str, Any]] = previous.get("chapters", [])
+    known = {
+        chapter["url"]: chapter
+        for chapter in previous_chapters
+        if checkpoint.has_chapter(chapter["url"])
+    }
+
+    def revalidate(ref: ChapterRef) -> FetchResult | None:
+        old = known.get(ref.url)
+        if old is None:
+            return _fetch_timed(ref.url, CHAPTER_FETCHED, session, on_event)
+        started = time.perf_counter()
+        page = revalidate_bytes(
+            ref.url, old["etag"], old["last_modified"], session=session
+        )
+        if page is not None and on_event is not None:
+            on_event(
+                Event(
+                    CHAPTER_FETCHED,
+                    url=ref.url,
+                    bytes=len(page.content),
+                    duration=time.perf_counter() - started,
+                )
+            )
+        return page
+
+    states: list[dict[str, Any]] = []
+    changed: list[int] = []
+    changed_refs: deque[ChapterRef] = deque()
+
+    def changed_pages() -> Iterator[FetchResult]:
+        pages = _map_in_order(revalidate, chapter_refs, jobs)
+        for index, (ref, page) in enumerate(zip(chapter_refs, pages), start=1):
+            if page is None:
+                states.append(known[ref.url])
+                continue
+            old = known.get(ref.url)
+            digest = hashlib.sha256(page.content).hexdigest()
+            states.append(
+                {
+                    "url": ref.url,
+                    "etag": page.etag,
+                    "last_modified": page.last_modified,
+                    "digest": digest,
+                }
+            )
+            if old is not None and old["digest"] == digest:
+                continue
+            changed.append(index)
+            if debug_dir:
+                _write_debug_file(
+                    debug_dir, f"chapter-{index:03d}.raw.html", page.content
+                )
+            changed_refs.append(ref)
+            yield page
+
+    with _parse_executor(parse_workers) as executor:
+        parsed_pages = _parse_chapter_pages(
+            changed_pages(), no_images, parser, executor, parse_workers * 2, on_event
+        )
+        for _, parsed in parsed_pages:
+            checkpoint.save_chapter(changed_refs.popleft().url, no_images, *parsed)
+
+    current_urls = [ref.url for ref in chapter_refs]
+    removed = [
+        chapter["url"]
+        for chapter in previous_chapters
+        if chapter["url"] not in current_urls
+    ]
+    up_to_date = (
+        bool(previous)
+        and not changed
+        and [chapter["url"] for chapter in previous_chapters] == current_urls
+    )
+    if changed:
+        log(f"Changed chapters: {', '.join(str(index) for index in changed)}")
+    items = _iter_book_items(
+        chapter_refs,
+        metadata.language,
+        no_images,
+        log,
+        debug_dir,
+        jobs,
+        session,
+        image_jobs,
+        checkpoint,
+        on_event,
+        parse_workers,
+        parser,
+    )
+    state = {"no_images": no_images, "chapters": states}
+    return SyncResult(metadata, changed, removed, up_to_date, items, checkpoint, state)
+
+
+async def fetch_book_async(
+    url: str,
+    no_images: bool,
+    log: Callable[[str], None],
+    jobs: int = 8,
+    session: AsyncHttpSession | None = None,
+    executor: Executor | None = None,
+    on_event: EventHandler | None = None,
+    parser: str = "bs4",
+) -> Book:
+    """Asyncio counterpart of :func:`fetch_book`.
+
+    Chapter and image downloads run as concurrent tasks, at most ``jobs`` at
+    a time. HTML parsing is handed to ``executor`` (the loop's default
+    executor if omitted) so the event loop stays responsive. The returned
+    book is identical to the one :func:`fetch_book` builds.
+    """
+    import asyncio
+
+    from ..aionet import AsyncHttpSession
+
+    if session is None:
+        async with AsyncHttpSession() as own_session:
+            return await fetch_book_async(
+                url,
+                no_images,
+                log,
+                jobs=jobs,
+                session=own_session,
+                executor=executor,
+                on_event=on_event,
+                parser=parser,
+            )
+
+    loop = asyncio.get_running_loop()
+    limit = asyncio.Semaphore(max(jobs, 1))
+    image_tasks: dict[str, asyncio.Task[FetchResult]] = {}
+    tasks: list[asyncio.Task[Any]] = []
+
+    async def fetch(page_url: str, kind: str) -> FetchResult:
+        async with limit:
+            started = time.perf_counter()
+            result = await session.fetch(page_url)
+        if on_event is not None:
+            on_event(
+                Event(
+                    kind,
+                    url=page_url,
+                    bytes=len(result.content),
+                    duration=time.perf_counter() - started,
+                )
+            )
+        return result
+
+    async def load_chapter(ref: ChapterRef) -> tuple[str | None, str, list[str]]:
+        page = await fetch(ref.url, CHAPTER_FETCHED)
+        started = time.perf_counter()
+        parsed = await loop.run_in_executor(
+            executor,
+            _parse_chapter,
+            page.content,
+            page.final_url,
+            no_images,
+            parser,
+        )
+        if on_event is not None:
+            on_event(
+                Event(
+                    CHAPTER_PARSED,
+                    url=page.final_url,
+                    bytes=len(page.content),
+                    duration=time.perf_counter() - started,
+                )
+            )
+        for image_url in parsed[2]:
+            if image_url not in image_tasks:
+                task = asyncio.create_task(fetch(image_url, IMAGE_FETCHED))
+                image_tasks[image_url] = task
+                tasks.append(task)
+        return parsed
+
+    page = await fetch(url, PAGE_FETCHED)
+    metadata, chapter_refs = await loop.run_in_executor(
+        executor, _parse_book_page, page.content, page.final_url
+    )
+
+    namer = ImageNamer()
+    chapters: list[Chapter] = []
+    images: list[ImageAsset] = []
+    chapter_tasks = [asyncio.create_task(load_chapter(ref)) for ref in chapter_refs]
+    tasks.extend(chapter_tasks)
+    try:
+        for index, (ref, chapter_task) in enumerate(
+            zip(chapter_refs, chapter_tasks), start=1
+        ):
+            chapter_title, body_html, image_urls = await chapter_task
+            log(f"Downloaded chapter {index}/{len(chapter_refs)}")
+            names: dict[str, str] = {}
+            for image_url in image_urls:
+                name = namer.get(image_url)
+                if name is None:
+                    fetched = await image_tasks[image_url]
+                    name, asset = namer.add(image_url, fetched)
+                    if asset is not None:
+                        images.append(asset)
+                names[image_url] = name
+            body_html = _resolve_image_placeholders(body_html, image_urls, names)
+            if not body_html.strip():
+                body_html = "<p></p>"
+            title = chapter_title or ref.title or f"Chapter {index}"
+            chapters.append(_make_chapter(index, title, body_html, metadata.language))
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if len(namer):
+        log(f"Downloaded {len(namer)} images")
+    if namer.duplicates:
+        log(
+            f"Merged {namer.duplicates} duplicate images "
+            f"({namer.duplicate_bytes} bytes saved)"
+        )
+
+    return Book(
+        title=metadata.title,
+        author=metadata.author,
+        language=metadata.language,
+        identifier=metadata.identifier,
+        description=metadata.description,
+        source_url=metadata.source_url,
+        chapters=chapters,
+        images=images,
+    )
+
+
+def _read_book_page(
+    url: str,
+    session: HttpSession | None,
+    debug_dir: str | None,
+    on_event: EventHandler | None = None,
+) -> tuple[BookMetadata, list[ChapterRef]]:
+    page = _fetch_timed(url, PAGE_FETCHED, session, on_event)
     if debug_dir:
         os.makedirs(debug_dir, exist_ok=True)
         _write_debug_file(debug_dir, "book.html", page.content)
-    soup = BeautifulSoup(page.content, "html.parser")
+    return _parse_book_page(page.content, page.final_url)
+
+
+def _parse_book_page(
+    content: bytes, final_url: str
+) -> tuple[BookMetadata, list[ChapterRef]]:
+    soup = BeautifulSoup(content, "html.parser")
 
     title = (
         clean_text(_get_text(soup.select_one(".book-reader__title"))) or "Unknown title"
@@ -50,78 +478,284 @@ def fetch_book(
     if book_reader:
         identifier = _attr_str(book_reader, "data-gutenberg-book-id")
     if not identifier:
-        digest = hashlib.sha1(page.final_url.encode("utf-8")).hexdigest()
+        digest = hashlib.sha1(final_url.encode("utf-8")).hexdigest()
         identifier = f"projekt-gutenberg:{digest}"
 
-    chapter_refs = _parse_chapter_refs(soup, page.final_url)
+    chapter_refs = _parse_chapter_refs(soup, final_url)
     if not chapter_refs:
         raise ValueError("No chapters found on Projekt Gutenberg page.")
 
-    images: dict[str, ImageAsset] = {}
-    used_names: set[str] = set()
-    chapters: list[Chapter] = []
+    metadata = BookMetadata(
+        title=title,
+        author=author,
+        language=language,
+        identifier=identifier,
+        description=description,
+        source_url=final_url,
+    )
+    return metadata, chapter_refs
 
-    for index, ref in enumerate(chapter_refs, start=1):
-        log(f"Downloading chapter {index}/{len(chapter_refs)}")
-        chapter_page = fetch_bytes(ref.url)
-        if debug_dir:
-            _write_debug_file(
-                debug_dir,
-                f"chapter-{index:03d}.raw.html",
-                chapter_page.content,
-            )
-        chapter_title, body_html = _parse_chapter_content(
-            chapter_page.content,
-            chapter_page.final_url,
+
+def _iter_book_items(
+    chapter_refs: list[ChapterRef],
+    language: str,
+    no_images: bool,
+    log: Callable[[str], None],
+    debug_dir: str | None,
+    jobs: int,
+    session: HttpSession | None,
+    image_jobs: int,
+    checkpoint: BookCheckpoint | None = None,
+    on_event: EventHandler | None = None,
+    parse_workers: int = 1,
+    parser: str = "bs4",
+) -> Iterator[Chapter | ImageAsset]:
+    lookahead = max(jobs, 2)
+    pending: deque[tuple[int, str, str, list[str]]] = deque()
+    missing = [
+        checkpoint is None or not checkpoint.has_chapter(ref.url)
+        for ref in chapter_refs
+    ]
+    missing_refs = [ref for ref, is_missing in zip(chapter_refs, missing) if is_missing]
+    if len(missing_refs) < len(chapter_refs):
+        log(
+            f"Resuming {len(chapter_refs) - len(missing_refs)} of "
+            f"{len(chapter_refs)} chapters from checkpoint"
+        )
+
+    prefetcher = ImagePrefetcher(image_jobs, session, checkpoint, on_event)
+    with prefetcher, _parse_executor(parse_workers) as executor:
+        chapter_pages = _parse_chapter_pages(
+            _fetch_chapter_pages(missing_refs, jobs, session, on_event),
             no_images,
-            images,
-            used_names,
+            parser,
+            executor,
+            parse_workers * 2,
+            on_event,
         )
-        if not chapter_title:
-            chapter_title = ref.title or f"Chapter {index}"
-        if not body_html.strip():
-            body_html = "<p></p>"
-        chapter_html = wrap_chapter_html(chapter_title, body_html, language)
-        if debug_dir:
-            _write_debug_text(
-                debug_dir,
-                f"chapter-{index:03d}.content.html",
-                body_html,
-            )
-            _write_debug_text(
-                debug_dir,
-                f"chapter-{index:03d}.xhtml",
-                chapter_html,
-            )
-        chapters.append(
-            Chapter(
-                title=chapter_title,
-                html=chapter_html,
-                file_name=f"chap_{index:03d}.xhtml",
+        for index, (ref, is_missing) in enumerate(zip(chapter_refs, missing), start=1):
+            parsed = None
+            if not is_missing and checkpoint is not None:
+                parsed = checkpoint.load_chapter(ref.url, no_images)
+            if parsed is None:
+                log(f"Downloading chapter {index}/{len(chapter_refs)}")
+                if is_missing:
+                    chapter_page, parsed = next(chapter_pages)
+                else:
+                    chapter_page = _fetch_timed(
+                        ref.url, CHAPTER_FETCHED, session, on_event
+                    )
+                    parsed = _parse_timed(chapter_page, no_images, parser, on_event)
+                if debug_dir:
+                    _write_debug_file(
+                        debug_dir,
+                        f"chapter-{index:03d}.raw.html",
+                        chapter_page.content,
+                    )
+                if checkpoint is not None:
+                    checkpoint.save_chapter(ref.url, no_images, *parsed)
+
+            chapter_title, body_html, image_urls = parsed
+            for image_url in image_urls:
+                prefetcher.request(image_url)
+            if not chapter_title:
+                chapter_title = ref.title or f"Chapter {index}"
+            pending.append((index, chapter_title, body_html, image_urls))
+            while len(pending) > lookahead:
+                yield from _finish_chapter(
+                    pending.popleft(), prefetcher, language, debug_dir
+                )
+        while pending:
+            yield from _finish_chapter(
+                pending.popleft(), prefetcher, language, debug_dir
             )
+
+    if len(prefetcher):
+        log(f"Downloaded {len(prefetcher)} images")
+    if prefetcher.duplicates:
+        log(
+            f"Merged {prefetcher.duplicates} duplicate images "
+            f"({prefetcher.duplicate_bytes} bytes saved)"
         )
 
-    if debug_dir and images:
-        images_dir = os.path.join(debug_dir, "images")
-        os.makedirs(images_dir, exist_ok=True)
-        for asset in images.values():
+
+def _finish_chapter(
+    parsed: tuple[int, str, str, list[str]],
+    prefetcher: ImagePrefetcher,
+    language: str,
+    debug_dir: str | None,
+) -> Iterator[Chapter | ImageAsset]:
+    index, chapter_title, body_html, image_urls = parsed
+    names, new_assets = prefetcher.resolve(image_urls)
+    for asset in new_assets:
+        if debug_dir:
             image_path = os.path.join(debug_dir, asset.file_name)
             os.makedirs(os.path.dirname(image_path), exist_ok=True)
             with open(image_path, "wb") as handle:
                 handle.write(asset.content)
+        yield asset
 
-    return Book(
+    body_html = _resolve_image_placeholders(body_html, image_urls, names)
+    if not body_html.strip():
+        body_html = "<p></p>"
+    chapter = _make_chapter(index, chapter_title, body_html, language)
+    if debug_dir:
+        _write_debug_text(
+            debug_dir,
+            f"chapter-{index:03d}.content.html",
+            body_html,
+        )
+        _write_debug_text(
+            debug_dir,
+            f"chapter-{index:03d}.xhtml",
+            chapter.html,
+        )
+    yield chapter
+
+
+def _make_chapter(index: int, title: str, body_html: str, language: str) -> Chapter:
+    return Chapter(
         title=title,
-        author=author,
-        language=language,
-        identifier=identifier,
-        description=description,
-        source_url=page.final_url,
-        chapters=chapters,
-        images=list(images.values()),
+        html=wrap_chapter_html(title, body_html, language),
+        file_name=f"chap_{index:03d}.xhtml",
     )
 
 
+def _fetch_chapter_pages(
+    chapter_refs: list[ChapterRef],
+    jobs: int,
+    session: HttpSession | None,
+    on_event: EventHandler | None = None,
+) -> Iterator[FetchResult]:
+    return _map_in_order(
+        lambda ref: _fetch_timed(ref.url, CHAPTER_FETCHED, session, on_event),
+        chapter_refs,
+        jobs,
+    )
+
+
+def _fetch_timed(
+    url: str, kind: str, session: HttpSession | None, on_event: EventHandler | None
+) -> FetchResult:
+    started = time.perf_counter()
+    result = fetch_bytes(url, session=session)
+    if on_event is not None:
+        on_event(
+            Event(
+                kind,
+                url=url,
+                bytes=len(result.content),
+                duration=time.perf_counter() - started,
+            )
+        )
+    return result
+
+
+def _parse_timed(
+    page: FetchResult, no_images: bool, parser: str, on_event: EventHandler | None
+) -> tuple[str | None, str, list[str]]:
+    parsed, duration = _parse_measured(page.content, page.final_url, no_images, parser)
+    _report_parsed(page, duration, on_event)
+    return parsed
+
+
+def _parse_measured(
+    html: bytes, base_url: str, no_images: bool, parser: str = "bs4"
+) -> tuple[tuple[str | None, str, list[str]], float]:
+    started = time.perf_counter()
+    parsed = _parse_chapter(html, base_url, no_images, parser)
+    return parsed, time.perf_counter() - started
+
+
+def _report_parsed(
+    page: FetchResult, duration: float, on_event: EventHandler | None
+) -> None:
+    if on_event is not None:
+        on_event(
+            Event(
+                CHAPTER_PARSED,
+                url=page.final_url,
+                bytes=len(page.content),
+                duration=duration,
+            )
+        )
+
+
+@contextmanager
+def _parse_executor(workers: int) -> Iterator[ProcessPoolExecutor | None]:
+    if workers <= 1:
+        yield None
+        return
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=reset_worker)
+    try:
+        yield executor
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _parse_chapter_pages(
+    pages: Iterator[FetchResult],
+    no_images: bool,
+    parser: str,
+    executor: ProcessPoolExecutor | None,
+    window: int,
+    on_event: EventHandler | None,
+) -> Iterator[tuple[FetchResult, tuple[str | None, str, list[str]]]]:
+    """Pair every page with its parsed content, in order.
+
+    With an ``executor`` up to ``window`` pages are parsed in worker
+    processes while the next pages are still being downloaded. Only the raw
+    bytes go to the workers; the image URLs come back with the parsed body.
+    """
+    if executor is None:
+        for page in pages:
+            yield page, _parse_timed(page, no_images, parser, on_event)
+        return
+
+    pending: deque[tuple[FetchResult, Future[Any]]] = deque()
+
+    def finish() -> tuple[FetchResult, tuple[str | None, str, list[str]]]:
+        page, future = pending.popleft()
+        parsed, duration = future.result()
+        _report_parsed(page, duration, on_event)
+        return page, parsed
+
+    try:
+        for page in pages:
+            future = executor.submit(
+                _parse_measured, page.content, page.final_url, no_images, parser
+            )
+            pending.append((page, future))
+            if len(pending) > window:
+                yield finish()
+        while pending:
+            yield finish()
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+def _map_in_order(
+    func: Callable[[ChapterRef], _T], chapter_refs: list[ChapterRef], jobs: int
+) -> Iterator[_T]:
+    if jobs <= 1:
+        for ref in chapter_refs:
+            yield func(ref)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=jobs)
+    window: deque[Future[_T]] = deque()
+    try:
+        for ref in chapter_refs:
+            window.append(executor.submit(func, ref))
+            if len(window) > jobs * 2:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
 def _parse_chapter_refs(soup: BeautifulSoup, base_url: str) -> list[ChapterRef]:
     refs: list[ChapterRef] = []
     for link in soup.select(".book-reader__chapter-list a"):
@@ -148,95 +782,204 @@ def _parse_chapter_refs(soup: BeautifulSoup, base_url: str) -> list[ChapterRef]:
     return refs
 
 
+def _parse_chapter(
+    html: bytes, base_url: str, no_images: bool, parser: str = "bs4"
+) -> tuple[str | None, str, list[str]]:
+    if parser == "stream":
+        from .projekt_stream import parse_chapter_stream
+
+        return parse_chapter_stream(html, base_url, no_images)
+    if parser != "bs4":
+        raise ValueError(f"Unknown chapter parser: {parser!r}")
+    return _parse_chapter_content(html, base_url, no_images)
+
+
+@profiled("_parse_chapter_content")
 def _parse_chapter_content(
     html: bytes,
     base_url: str,
     no_images: bool,
-    images: dict[str, ImageAsset],
-    used_names: set[str],
-) -> tuple[str | None, str]:
+) -> tuple[str | None, str, list[str]]:
     soup = BeautifulSoup(html, "html.parser")
     title = clean_text(_get_text(soup.select_one(".book-reader__chapter-heading")))
     content = soup.select_one(".book-reader__chapter-content-wrapper")
     if content is None:
         content = soup.select_one(".book-reader__chapter-text")
     if content is None:
-        return title, ""
+        return title, "", []
 
     for tag in content.find_all(["script", "style"]):
         tag.decompose()
 
+    image_urls: list[str] = []
     if no_images:
         for img in content.find_all("img"):
             img.decompose()
     else:
-        _rewrite_images(content, base_url, images, used_names)
+        _rewrite_images(content, base_url, image_urls)
 
     body_html = "".join(str(child) for child in content.contents)
-    return title, body_html
+    return title, body_html, image_urls
 
 
-def _rewrite_images(
-    content: Tag,
-    base_url: str,
-    images: dict[str, ImageAsset],
-    used_names: set[str],
-) -> None:
+@profiled("_rewrite_images")
+def _rewrite_images(content: Tag, base_url: str, image_urls: list[str]) -> None:
     for img in content.find_all("img"):
         image_url = _select_image_url(img, base_url)
         if not image_url:
             continue
-        asset = images.get(image_url)
-        if asset is None:
-            fetched = fetch_bytes(image_url)
-            media_type = _media_type_from_response(fetched.content_type, image_url)
-            ext = guess_extension(image_url, media_type)
-            parsed = urlparse(image_url)
-            base_name = os.path.basename(parsed.path) or "image"
-            stem, _ = os.path.splitext(base_name)
-            safe_stem = slugify(stem)
-            filename = unique_filename(f"{safe_stem}{ext}", used_names)
-            asset = ImageAsset(
-                url=image_url,
-                file_name=f"images/{filename}",
-                media_type=media_type,
-                content=fetched.content,
-            )
-            images[image_url] = asset
-        img["src"] = asset.file_name
-        for attr in (
-            "srcset",
-            "data-srcset",
-            "data-lazy-srcset",
-            "data-src",
-            "data-lazy-src",
-            "data-original",
-        ):
-            img.attrs.pop(attr, None)
+        if image_url not in image_urls:
+            image_urls.append(image_url)
+        img["src"] = f"{IMAGE_PLACEHOLDER}{image_urls.index(image_url)}"
+        for attr in IMAGE_SOURCE_ATTRS:
+            if attr != "src":
+                img.attrs.pop(attr, None)
     for noscript in content.find_all("noscript"):
         noscript.decompose()
 
 
+def _resolve_image_placeholders(
+    body_html: str, image_urls: list[str], names: dict[str, str]
+) -> str:
+    if not image_urls:
+        return body_html
+    return IMAGE_PLACEHOLDER_RE.sub(
+        lambda match: names[image_urls[int(match.group(1))]], body_html
+    )
+
+
+class ImagePrefetcher:
+    """Fetch chapter images in the background while chapters are parsed.
+
+    Each URL is downloaded once no matter how many chapters reference it, and
+    URLs that return identical bytes share a single asset. File names are
+    assigned in discovery order, so they do not depend on which download
+    finishes first.
+    """
+
+    def __init__(
+        self,
+        jobs: int,
+        session: HttpSession | None = None,
+        checkpoint: BookCheckpoint | None = None,
+        on_event: EventHandler | None = None,
+    ) -> None:
+        self._session = session
+        self._checkpoint = checkpoint
+        self._on_event = on_event
+        self._executor = ThreadPoolExecutor(max_workers=max(jobs, 1))
+        self._futures: dict[str, Future[FetchResult]] = {}
+        self._namer = ImageNamer()
+
+    def __enter__(self) -> ImagePrefetcher:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._futures) + len(self._namer)
+
+    @property
+    def duplicates(self) -> int:
+        return self._namer.duplicates
+
+    @property
+    def duplicate_bytes(self) -> int:
+        return self._namer.duplicate_bytes
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def request(self, url: str) -> None:
+        if url not in self._futures and self._namer.get(url) is None:
+            self._futures[url] = self._executor.submit(self._fetch, url)
+
+    def _fetch(self, url: str) -> FetchResult:
+        if self._checkpoint is not None:
+            cached = self._checkpoint.load_image(url)
+            if cached is not None:
+                return cached
+        fetched = _fetch_timed(url, IMAGE_FETCHED, self._session, self._on_event)
+        if self._checkpoint is not None:
+            self._checkpoint.save_image(url, fetched)
+        return fetched
+
+    def resolve(self, urls: list[str]) -> tuple[dict[str, str], list[ImageAsset]]:
+        """Wait for ``urls`` and return their file names and any new assets.
+
+        Assets are returned only the first time their content is resolved.
+        Call this in discovery order to keep file names deterministic.
+        """
+        names: dict[str, str] = {}
+        new_assets: list[ImageAsset] = []
+        for url in urls:
+            name = self._namer.get(url)
+            if name is None:
+                name, asset = self._namer.add(url, self._futures.pop(url).result())
+                if asset is not None:
+                    new_assets.append(asset)
+            names[url] = name
+        return names, new_assets
+
+
+class ImageNamer:
+    """Assign EPUB file names to downloaded images in discovery order.
+
+    Images with identical bytes share the name of the first one.
+    """
+
+    def __init__(self) -> None:
+        self.duplicates = 0
+        self.duplicate_bytes = 0
+        self._names: dict[str, str] = {}
+        self._names_by_digest: dict[str, str] = {}
+        self._used_names: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def get(self, url: str) -> str | None:
+        return self._names.get(url)
+
+    def add(self, url: str, fetched: FetchResult) -> tuple[str, ImageAsset | None]:
+        """Name ``url`` and return the new asset unless its content is known."""
+        digest = hashlib.sha256(fetched.content).hexdigest()
+        name = self._names_by_digest.get(digest)
+        asset = None
+        if name is None:
+            asset = _make_image_asset(url, fetched, self._used_names)
+            name = asset.file_name
+            self._names_by_digest[digest] = name
+        else:
+            self.duplicates += 1
+            self.duplicate_bytes += len(fetched.content)
+        self._names[url] = name
+        return name, asset
+
+
+def _make_image_asset(
+    image_url: str, fetched: FetchResult, used_names: set[str]
+) -> ImageAsset:
+    media_type = _media_type_from_response(fetched.content_type, image_url)
+    ext = guess_extension(image_url, media_type)
+    parsed = urlparse(image_url)
+    base_name = os.path.basename(parsed.path) or "image"
+    stem, _ = os.path.splitext(base_name)
+    safe_stem = slugify(stem)
+    filename = unique_filename(f"{safe_stem}{ext}", used_names)
+    return ImageAsset(
+        url=image_url,
+        file_name=f"images/{filename}",
+        media_type=media_type,
+        content=fetched.content,
+    )
+
+
 def _select_image_url(img: Tag, base_url: str) -> str | None:
-    for attr in (
-        "data-lazy-src",
-        "data-src",
-        "data-original",
-        "data-lazy-srcset",
-        "data-srcset",
-        "srcset",
-        "src",
-    ):
-        value = _attr_str(img, attr)
-        if not value:
-            continue
-        if attr.endswith("srcset"):
-            value = _first_src_from_srcset(value)
-            if not value:
-                continue
-        if attr == "src" and value.startswith("data:"):
-            continue
-        return urljoin(base_url, value)
+    image_url = _image_url_from_attrs(lambda attr: _attr_str(img, attr), base_url)
+    if image_url:
+        return image_url
 
     sibling = img.next_sibling
     while sibling is not None:
@@ -251,6 +994,23 @@ def _select_image_url(img: Tag, base_url: str) -> str | None:
     return None
 
 
+def _image_url_from_attrs(
+    get_attr: Callable[[str], str | None], base_url: str
+) -> str | None:
+    for attr in IMAGE_SOURCE_ATTRS:
+        value = get_attr(attr)
+        if not value:
+            continue
+        if attr.endswith("srcset"):
+            value = _first_src_from_srcset(value)
+            if not value:
+                continue
+        if attr == "src" and value.startswith("data:"):
+            continue
+        return urljoin(base_url, value)
+    return None
+
+
 def _first_src_from_srcset(srcset: str) -> str | None:
     parts = [part.strip() for part in srcset.split(",") if part.strip()]
     if not parts:
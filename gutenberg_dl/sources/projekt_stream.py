@@ -0,0 +1,397 @@
+"""Tree-free extraction of Projekt Gutenberg chapter pages.
+
+:func:`parse_chapter_stream` returns the same title, body and image URLs as
+``projekt._parse_chapter_content`` without building a BeautifulSoup tree.
+The page makes a single pass through :class:`html.parser.HTMLParser`, the
+tokenizer behind BeautifulSoup's ``html.parser`` builder, and only the
+serialized content element is kept. Parsing stops as soon as the content
+element and the chapter heading are complete.
+
+Tag nesting, void elements, whitespace-only strings, entities and attribute
+output follow the rules of the builder and of the ``minimal`` formatter, so
+both engines produce the same markup.
+"""
+
+from __future__ import annotations
+
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+from bs4.builder import HTMLTreeBuilder
+from bs4.dammit import EntitySubstitution, UnicodeDammit
+from bs4.element import (
+    CData,
+    CharsetMetaAttributeValue,
+    Comment,
+    ContentMetaAttributeValue,
+    Declaration,
+    Doctype,
+    PreformattedString,
+    ProcessingInstruction,
+)
+
+from ..profiling import profiled
+from ..utils import clean_text
+from .projekt import IMAGE_PLACEHOLDER, IMAGE_SOURCE_ATTRS, _image_url_from_attrs
+
+CONTENT_CLASS = "book-reader__chapter-content-wrapper"
+FALLBACK_CONTENT_CLASS = "book-reader__chapter-text"
+HEADING_CLASS = "book-reader__chapter-heading"
+
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+_VOID_ELEMENTS = frozenset(HTMLTreeBuilder.DEFAULT_EMPTY_ELEMENT_TAGS)
+_LIST_ATTRIBUTES = HTMLTreeBuilder.DEFAULT_CDATA_LIST_ATTRIBUTES
+_UNIVERSAL_LIST_ATTRIBUTES = frozenset(_LIST_ATTRIBUTES.get("*", ()))
+_PRESERVE_WHITESPACE = frozenset(HTMLTreeBuilder.DEFAULT_PRESERVE_WHITESPACE_TAGS)
+_STRING_CONTAINERS = frozenset(HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS)
+_DROPPED = frozenset(("script", "style"))
+_REWRITTEN_ATTRS = frozenset(attr for attr in IMAGE_SOURCE_ATTRS if attr != "src")
+_NUMERIC_REFERENCES = {
+    10: re.compile("^([0-9]+)(.*)"),
+    16: re.compile("^([0-9a-f]+)(.*)"),
+}
+_OUTPUT_ENCODING = "utf-8"
+
+
+@profiled("parse_chapter_stream")
+def parse_chapter_stream(
+    html: bytes,
+    base_url: str,
+    no_images: bool,
+) -> tuple[str | None, str, list[str]]:
+    if isinstance(html, bytes):
+        markup = UnicodeDammit(html, is_html=True).unicode_markup
+    else:
+        markup = html
+    parser = _ChapterParser(base_url, no_images)
+    try:
+        parser.feed(markup)
+        parser.close()
+        parser.finish()
+    except _Complete:
+        pass
+
+    title = None
+    if parser.title_parts is not None:
+        title = clean_text("".join(parser.title_parts))
+    content = parser.content or parser.fallback
+    if content is None:
+        return title, "", []
+    body_html, image_urls = content.render()
+    return title, body_html, image_urls
+
+
+class _Complete(Exception):
+    """Raised to stop tokenizing once nothing after it can change the result."""
+
+
+class _Image:
+    __slots__ = ("attrs", "index", "url")
+
+    def __init__(self, attrs: dict[str, str], url: str | None) -> None:
+        self.attrs = attrs
+        self.url = url
+        self.index = 0
+
+    def render(self) -> str:
+        if self.url is None:
+            return _start_tag("img", self.attrs, True)
+        attrs = {
+            key: value
+            for key, value in self.attrs.items()
+            if key not in _REWRITTEN_ATTRS
+        }
+        attrs["src"] = f"{IMAGE_PLACEHOLDER}{self.index}"
+        return _start_tag("img", attrs, True)
+
+
+class _Capture:
+    """Serialized children of one candidate content element."""
+
+    def __init__(self, depth: int) -> None:
+        # Stack length while the element is open.
+        self.depth = depth
+        # Stack length while a dropped subtree is open, 0 when visible.
+        self.hidden_at = 0
+        self.done = False
+        self.pieces: list[str | _Image] = []
+        self.images: list[_Image] = []
+
+    def render(self) -> tuple[str, list[str]]:
+        image_urls: list[str] = []
+        indices: dict[str, int] = {}
+        for image in self.images:
+            if image.url is None:
+                continue
+            index = indices.get(image.url)
+            if index is None:
+                index = indices[image.url] = len(image_urls)
+                image_urls.append(image.url)
+            image.index = index
+        body_html = "".join(
+            piece if isinstance(piece, str) else piece.render() for piece in self.pieces
+        )
+        return body_html, image_urls
+
+
+class _ChapterParser(HTMLParser):
+    def __init__(self, base_url: str, no_images: bool) -> None:
+        super().__init__(convert_charrefs=False)
+        self.base_url = base_url
+        self.no_images = no_images
+        self.content: _Capture | None = None
+        self.fallback: _Capture | None = None
+        self.title_parts: list[str] | None = None
+        self._capture: _Capture | None = None
+        self._title_depth = 0
+        self._stack: list[str] = []
+        self._open: dict[str, int] = {}
+        self._preserve = 0
+        self._containers = 0
+        self._data: list[str] = []
+        self._closed_voids: list[str] = []
+        # Images without a usable URL, by stack index of their parent, and
+        # the ones handed to an open <noscript> sibling for its first <img>.
+        self._pending: dict[int, list[_Image]] = {}
+        self._waiting: dict[int, list[_Image]] = {}
+
+    def finish(self) -> None:
+        self._end_data()
+        while self._stack:
+            self._pop()
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self._start(tag, attrs, tag in _VOID_ELEMENTS)
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self._start(tag, attrs, False)
+        self._end(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self._closed_voids:
+            self._closed_voids.remove(tag)
+        else:
+            self._end(tag)
+
+    def handle_data(self, data: str) -> None:
+        self._data.append(data)
+
+    def handle_charref(self, name: str) -> None:
+        base = 10
+        if name.startswith(("x", "X")):
+            name = name[1:]
+            base = 16
+        extra_data = ""
+        try:
+            number: int | None = int(name, base)
+        except ValueError:
+            number = None
+            match = _NUMERIC_REFERENCES[base].search(name)
+            if match is not None:
+                number = int(match.group(1), base)
+                extra_data = match.group(2)
+        if number is None:
+            self._data.append("")
+            self._data.append(name)
+            return
+        self._data.append(UnicodeDammit.numeric_character_reference(number)[0])
+        self._data.append(extra_data)
+
+    def handle_entityref(self, name: str) -> None:
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self._data.append(character if character is not None else f"&{name}")
+
+    def handle_comment(self, data: str) -> None:
+        self._special(data, Comment)
+
+    def handle_decl(self, decl: str) -> None:
+        self._special(decl[len("DOCTYPE ") :], Doctype)
+
+    def unknown_decl(self, data: str) -> None:
+        if data.upper().startswith("CDATA["):
+            self._special(data[len("CDATA[") :], CData)
+        else:
+            self._special(data, Declaration)
+
+    def handle_pi(self, data: str) -> None:
+        self._special(data, ProcessingInstruction)
+
+    def _special(self, data: str, kind: type[PreformattedString]) -> None:
+        self._end_data()
+        self._data.append(data)
+        self._end_data(kind)
+
+    def _end_data(self, kind: type[PreformattedString] | None = None) -> None:
+        if not self._data:
+            return
+        data = "".join(self._data)
+        self._data = []
+        if not self._preserve and not data.strip(_ASCII_SPACES):
+            data = "\n" if "\n" in data else " "
+
+        if self._title_depth and (
+            kind is CData or (kind is None and not self._containers)
+        ):
+            assert self.title_parts is not None
+            self.title_parts.append(data)
+
+        capture = self._capture
+        if capture is None or capture.hidden_at:
+            return
+        if len(self._stack) == capture.depth:
+            # The content's own strings are joined with str(), unescaped.
+            capture.pieces.append(data)
+        elif kind is None:
+            capture.pieces.append(EntitySubstitution.substitute_xml(data))
+        else:
+            capture.pieces.append(kind.PREFIX + data + kind.SUFFIX)
+
+    def _start(
+        self, name: str, attrs: list[tuple[str, str | None]], close: bool
+    ) -> None:
+        self._end_data()
+        values: dict[str, str] = {}
+        for key, value in attrs:
+            values[key] = "" if value is None else value
+        tag_list_attributes = _LIST_ATTRIBUTES.get(name, ())
+        for key, value in values.items():
+            if key in _UNIVERSAL_LIST_ATTRIBUTES or key in tag_list_attributes:
+                values[key] = " ".join(value.split())
+
+        depth = len(self._stack)
+        capture = self._capture
+        if capture is not None:
+            self._capture_start(capture, name, values, depth)
+
+        self._stack.append(name)
+        self._open[name] = self._open.get(name, 0) + 1
+        if name in _PRESERVE_WHITESPACE:
+            self._preserve += 1
+        if name in _STRING_CONTAINERS:
+            self._containers += 1
+
+        classes = values.get("class")
+        if classes:
+            self._match_classes(classes.split(" "))
+
+        if close:
+            self._end(name)
+            self._closed_voids.append(name)
+
+    def _capture_start(
+        self,
+        capture: _Capture,
+        name: str,
+        values: dict[str, str],
+        depth: int,
+    ) -> None:
+        image = None
+        if name == "img" and not self.no_images:
+            if self._waiting:
+                src = values.get("src")
+                fallback = urljoin(self.base_url, src) if src else None
+                for images in self._waiting.values():
+                    for waiting in images:
+                        waiting.url = fallback
+                self._waiting.clear()
+            image = _Image(values, _image_url_from_attrs(values.get, self.base_url))
+            if image.url is None:
+                self._pending.setdefault(depth - 1, []).append(image)
+            capture.images.append(image)
+        elif name == "noscript" and depth - 1 in self._pending:
+            self._waiting[depth] = self._pending.pop(depth - 1)
+
+        if capture.hidden_at:
+            return
+        if (
+            name in _DROPPED
+            or (name == "noscript" and not self.no_images)
+            or (name == "img" and self.no_images)
+        ):
+            capture.hidden_at = depth + 1
+        elif image is not None:
+            capture.pieces.append(image)
+        else:
+            if name == "meta":
+                _substitute_meta_charset(values)
+            capture.pieces.append(_start_tag(name, values, name in _VOID_ELEMENTS))
+
+    def _match_classes(self, classes: list[str]) -> None:
+        if CONTENT_CLASS in classes and self.content is None:
+            self.content = self._capture = _Capture(len(self._stack))
+            self.fallback = None
+            self._pending.clear()
+            self._waiting.clear()
+        elif (
+            FALLBACK_CONTENT_CLASS in classes
+            and self.content is None
+            and self.fallback is None
+        ):
+            self.fallback = self._capture = _Capture(len(self._stack))
+        if HEADING_CLASS in classes and self.title_parts is None:
+            self.title_parts = []
+            self._title_depth = len(self._stack)
+
+    def _end(self, name: str) -> None:
+        self._end_data()
+        if not self._open.get(name):
+            return
+        while self._pop() != name:
+            pass
+
+    def _pop(self) -> str:
+        depth = len(self._stack)
+        name = self._stack.pop()
+        self._open[name] -= 1
+        if name in _PRESERVE_WHITESPACE:
+            self._preserve -= 1
+        if name in _STRING_CONTAINERS:
+            self._containers -= 1
+
+        capture = self._capture
+        if capture is not None:
+            if self._pending:
+                self._pending.pop(depth - 1, None)
+            if self._waiting:
+                self._waiting.pop(depth - 1, None)
+            if capture.hidden_at:
+                if capture.hidden_at == depth:
+                    capture.hidden_at = 0
+            elif depth == capture.depth:
+                capture.done = True
+                self._capture = None
+                self._pending.clear()
+                self._waiting.clear()
+            elif name not in _VOID_ELEMENTS:
+                capture.pieces.append(f"</{name}>")
+
+        if depth == self._title_depth:
+            self._title_depth = 0
+        if (
+            self.content is not None
+            and self.content.done
+            and self.title_parts is not None
+            and not self._title_depth
+        ):
+            raise _Complete
+        return name
+
+
+def _start_tag(name: str, attrs: dict[str, str], void: bool) -> str:
+    parts = [name]
+    for key, value in sorted(attrs.items()):
+        value = EntitySubstitution.substitute_xml(value)
+        parts.append(f"{key}={EntitySubstitution.quoted_attribute_value(value)}")
+    return f"<{' '.join(parts)}{'/>' if void else '>'}"
+
+
+def _substitute_meta_charset(values: dict[str, str]) -> None:
+    if "charset" in values:
+        values["charset"] = CharsetMetaAttributeValue(
+            values["charset"]
+        ).substitute_encoding(_OUTPUT_ENCODING)
+    elif "content" in values and values.get("http-equiv", "").lower() == "content-type":
+        values["content"] = ContentMetaAttributeValue(
+            values["content"]
+        ).substitute_encoding(_OUTPUT_ENCODING)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import importlib
+import sys
+from dataclasses import dataclass
+from functools import cache
+from typing import TYPE_CHECKING, Callable
+from urllib.parse import urlparse
+
+if TYPE_CHECKING:
+    from ..events import EventHandler
+    from ..images import ImageOptions
+    from ..net import HttpSession
+
+ENTRY_POINT_GROUP = "gutenberg_dl.sources"
+
+
+@dataclass(frozen=True)
+class BuildOptions:
+    """Settings of one download run, passed to every source handler."""
+
+    session: HttpSession
+    out_path: str | None = None
+    no_images: bool = False
+    debug: bool = False
+    jobs: int = 1
+    image_jobs: int = 4
+    parse_workers: int = 1
+    parser: str = "bs4"
+    compress_level: int = 6
+    formats: tuple[str, ...] = ("epub",)
+    work_dir: str | None = None
+    resume: bool = False
+    sync: bool = False
+    image_options: ImageOptions | None = None
+    on_event: EventHandler | None = None
+
+
+SourceHandler = Callable[[str, BuildOptions, Callable[[str], None]], str]
+
+
+@dataclass(frozen=True)
+class Source:
+    """A source backend, resolved by name or by the host of a URL.
+
+    ``handler`` names a ``"module:function"`` that takes the URL, the
+    :class:`BuildOptions` and a log callback and returns the path of the
+    first output in ``BuildOptions.formats``. The module is imported only
+    when the source is used.
+    """
+
+    name: str
+    hosts: tuple[str, ...]
+    handler: str
+
+    def matches(self, url: str) -> bool:
+        host = urlparse(url).netloc.lower()
+        return any(pattern in host for pattern in self.hosts)
+
+    def load(self) -> SourceHandler:
+        module_name, _, attr = self.handler.partition(":")
+        return getattr(importlib.import_module(module_name), attr)
+
+
+BUILTIN_SOURCES = (
+    Source(
+        "projekt", ("projekt-gutenberg.org",), "gutenberg_dl.build:build_projekt_epub"
+    ),
+    Source(
+        "gutenberg",
+        ("gutenberg.org",),
+        "gutenberg_dl.sources.gutenberg:download_source",
+    ),
+)
+
+
+@cache
+def plugin_sources() -> tuple[Source, ...]:
+    """Sources registered by other packages under the entry point group.
+
+    Each entry point must refer to a :class:`Source` instance.
+    """
+    from importlib.metadata import entry_points
+
+    if sys.version_info < (3, 10):
+        group = entry_points().get(ENTRY_POINT_GROUP, [])
+    else:
+        group = entry_points(group=ENTRY_POINT_GROUP)
+    sources: list[Source] = []
+    for entry_point in group:
+        source = entry_point.load()
+        if not isinstance(source, Source):
+            raise TypeError(
+                f"Entry point {entry_point.name!r} does not refer to a Source."
+            )
+        sources.append(source)
+    return tuple(sources)
+
+
+def find_source(name: str) -> Source | None:
+    name = name.lower()
+    for source in BUILTIN_SOURCES:
+        if source.name == name:
+            return source
+    for source in plugin_sources():
+        if source.name == name:
+            return source
+    return None
+
+
+def detect_source(url: str) -> Source | None:
+    """Return the first source whose hosts match ``url``.
+
+    Built-in sources are checked first, so entry points are only read for
+    URLs they do not handle.
+    """
+    for source in BUILTIN_SOURCES:
+        if source.matches(url):
+            return source
+    for source in plugin_sources():
+        if source.matches(url):
+            return source
+    return None
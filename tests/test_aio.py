@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+
+import pytest
+
+from benchmarks.mock_site import MockSite, SiteConfig
+from gutenberg_dl import aionet
+from gutenberg_dl.aionet import AsyncHttpSession
+from gutenberg_dl.net import HttpSession
+from gutenberg_dl.ratelimit import RetryPolicy
+from gutenberg_dl.sources import (
+    download_epub_async,
+    fetch_book,
+    fetch_book_async,
+)
+
+from .conftest import LocalServer, send_bytes
+
+
+def test_fetch_book_async_matches_fetch_book() -> None:
+    config = SiteConfig(
+        chapters=6, paragraphs=3, images_per_chapter=2, image_size=256, latency=0
+    )
+    with MockSite(config) as site, HttpSession() as session:
+        serial = fetch_book(site.book_url, False, lambda message: None, session=session)
+        concurrent = asyncio.run(
+            fetch_book_async(site.book_url, False, lambda message: None, jobs=4)
+        )
+
+    assert concurrent == serial
+    assert len(concurrent.chapters) == 6
+
+
+def test_async_session_retries_redirects_and_reads_chunked(
+    http_server: LocalServer,
+) -> None:
+    attempts: list[str] = []
+
+    def flaky(handler: BaseHTTPRequestHandler) -> None:
+        attempts.append(handler.path)
+        if len(attempts) == 1:
+            send_bytes(handler, b"busy", status=503, headers={"Retry-After": "0"})
+            return
+        send_bytes(handler, b"", status=302, headers={"Location": "/chunked"})
+
+    def chunked(handler: BaseHTTPRequestHandler) -> None:
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/plain")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        for part in (b"Hallo ", b"Welt"):
+            handler.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+        handler.wfile.write(b"0\r\n\r\n")
+
+    http_server.routes["/start"] = flaky
+    http_server.routes["/chunked"] = chunked
+
+    async def run() -> tuple[bytes, str, int]:
+        async with AsyncHttpSession(retry=RetryPolicy(backoff=0)) as session:
+            first = await session.fetch(http_server.url("/start"))
+            second = await session.fetch(http_server.url("/chunked"))
+            assert second.content == first.content
+            return first.content, first.final_url, session.stats.connections_reused
+
+    content, final_url, reused = asyncio.run(run())
+
+    assert content == b"Hallo Welt"
+    assert final_url == http_server.url("/chunked")
+    assert attempts == ["/start", "/start"]
+    assert reused >= 1
+
+
+def test_async_session_retries_body_cut_mid_chunk(http_server: LocalServer) -> None:
+    attempts: list[str] = []
+
+    def cut(handler: BaseHTTPRequestHandler) -> None:
+        attempts.append(handler.path)
+        handler.send_response(200)
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        handler.wfile.write(b"6\r\nHallo \r\n")
+        if len(attempts) == 1:
+            handler.close_connection = True
+            return
+        handler.wfile.write(b"4\r\nWelt\r\n0\r\n\r\n")
+
+    http_server.routes["/cut"] = cut
+
+    async def run() -> tuple[bytes, int]:
+        async with AsyncHttpSession(retry=RetryPolicy(backoff=0)) as session:
+            result = await session.fetch(http_server.url("/cut"))
+            return result.content, session.stats.requests
+
+    content, requests = asyncio.run(run())
+
+    assert content == b"Hallo Welt"
+    assert requests == 2
+    assert attempts == ["/cut", "/cut"]
+
+
+def test_async_session_sends_one_accept_encoding(http_server: LocalServer) -> None:
+    seen: list[list[str]] = []
+
+    def echo(handler: BaseHTTPRequestHandler) -> None:
+        seen.append(handler.headers.get_all("Accept-Encoding") or [])
+        send_bytes(handler, b"ok")
+
+    http_server.routes["/echo"] = echo
+
+    async def run() -> bytes:
+        async with AsyncHttpSession() as session:
+            result = await session.fetch(
+                http_server.url("/echo"), headers={"accept-encoding": "gzip"}
+            )
+            return result.content
+
+    assert asyncio.run(run()) == b"ok"
+    assert seen == [["identity"]]
+
+
+def test_async_session_closes_connections_dropped_twice(
+    http_server: LocalServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    attempts: list[str] = []
+    closed: list[aionet._Connection] = []
+    close = aionet._Connection.close
+
+    def record_close(conn: aionet._Connection) -> None:
+        closed.append(conn)
+        close(conn)
+
+    def drop(handler: BaseHTTPRequestHandler) -> None:
+        attempts.append(handler.path)
+        if len(attempts) in (2, 3):
+            handler.close_connection = True
+            return
+        send_bytes(handler, b"ok")
+
+    monkeypatch.setattr(aionet._Connection, "close", record_close)
+    http_server.routes["/drop"] = drop
+
+    async def run() -> tuple[bytes, int]:
+        async with AsyncHttpSession(retry=RetryPolicy(backoff=0)) as session:
+            await session.fetch(http_server.url("/drop"))
+            result = await session.fetch(http_server.url("/drop"))
+        return result.content, session.stats.connections_opened
+
+    content, opened = asyncio.run(run())
+
+    assert content == b"ok"
+    assert len(attempts) == 4
+    assert opened == 3
+    assert len(set(closed)) == opened
+
+
+def test_download_epub_async_names_file_from_metadata(tmp_path: Path) -> None:
+    config = SiteConfig(chapters=1, epub_chapters=2, latency=0)
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    with MockSite(config) as site:
+        result = asyncio.run(
+            download_epub_async(site.epub_url, str(out_dir), False, print)
+        )
+
+    assert os.path.dirname(result.output_path) == str(out_dir)
+    assert result.metadata.title
+    assert os.listdir(out_dir) == [os.path.basename(result.output_path)]
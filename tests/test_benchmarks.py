@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from benchmarks.mock_site import SiteConfig
+from benchmarks.run import run_benchmarks
+
+
+def test_benchmarks_run_against_mock_site() -> None:
+    config = SiteConfig(
+        chapters=2, paragraphs=2, images_per_chapter=1, image_size=64, epub_chapters=2
+    )
+
+    results = run_benchmarks(config, repeat=1, jobs=2, image_jobs=2)
+
+    assert [result.name for result in results] == [
+        "fetch_book",
+        "stream_and_write",
+        "parse_chapters",
+        "write_epub",
+        "download_epub",
+    ]
+    assert all(result.best > 0 and result.peak_memory > 0 for result in results)
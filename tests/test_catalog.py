@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import gzip
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from gutenberg_dl.catalog import connect, ingest_file, query_ids
+from gutenberg_dl.cli import main
+
+HEADER = "Text#,Type,Issued,Title,Language,Authors,Subjects,LoCC,Bookshelves\n"
+ROWS = [
+    (
+        '2229,Text,2000-06-01,Faust,de,"Goethe, Johann Wolfgang von, 1749-1832",'
+        '"Tragedies; German drama",PT,German Literature\n'
+    ),
+    (
+        '1342,Text,1998-06-01,Pride and Prejudice,en,"Austen, Jane, 1775-1817",'
+        '"England -- Fiction; Love stories",PR,Best Books Ever Listings\n'
+    ),
+    '5000,Sound,2004-01-01,Faust (Audio),de,"Goethe, Johann Wolfgang von",,,\n',
+    '9999,Text,2010-01-01,Briefe,de; en,"Goethe, Johann Wolfgang von",Letters,PT,\n',
+]
+
+
+def test_catalog_ingest_is_incremental(tmp_path: Path) -> None:
+    db_path = str(tmp_path / "catalog.sqlite")
+    csv_path = tmp_path / "pg_catalog.csv"
+    csv_path.write_text(HEADER + "".join(ROWS), encoding="utf-8")
+
+    first = ingest_file(db_path, str(csv_path))
+    assert (first.added, first.updated, first.unchanged) == (4, 0, 0)
+
+    newer = tmp_path / "pg_catalog.csv.gz"
+    changed = ROWS[1].replace("Pride and Prejudice", "Pride & Prejudice")
+    with gzip.open(newer, "wt", encoding="utf-8") as handle:
+        handle.write(HEADER + ROWS[0] + changed + ROWS[2] + ROWS[3])
+    second = ingest_file(db_path, str(newer))
+    assert (second.added, second.updated, second.unchanged) == (0, 1, 3)
+
+    conn = connect(db_path)
+    try:
+        assert list(query_ids(conn, language="de")) == [2229, 9999]
+        assert list(query_ids(conn, author="goethe", book_type=None)) == [
+            2229,
+            5000,
+            9999,
+        ]
+        assert list(query_ids(conn, subject="fiction")) == [1342]
+        assert list(query_ids(conn, language="en", limit=1)) == [1342]
+    finally:
+        conn.close()
+
+
+def test_catalog_query_prints_urls(tmp_path: Path) -> None:
+    db_path = str(tmp_path / "catalog.sqlite")
+    csv_path = tmp_path / "pg_catalog.csv"
+    csv_path.write_text(HEADER + "".join(ROWS), encoding="utf-8")
+    runner = CliRunner()
+
+    ingested = runner.invoke(
+        main, ["catalog", "ingest", str(csv_path), "--db", db_path]
+    )
+    queried = runner.invoke(
+        main, ["catalog", "query", "--db", db_path, "--language", "de", "--urls"]
+    )
+
+    assert ingested.exit_code == 0, ingested.output
+    assert queried.exit_code == 0, queried.output
+    assert queried.stdout.splitlines() == [
+        "https://www.gutenberg.org/ebooks/2229",
+        "https://www.gutenberg.org/ebooks/9999",
+    ]
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from gutenberg_dl.cli import main
+from gutenberg_dl.epub import build_epub, wrap_chapter_html
+from gutenberg_dl.models import Book, Chapter
+
+from .conftest import LocalServer, send_bytes
+
+
+def _epub_bytes(tmp_path: Path, title: str) -> bytes:
+    book = Book(
+        title=title,
+        author="Tester",
+        language="de",
+        identifier=f"id-{title}",
+        description=None,
+        source_url="https://www.gutenberg.org/",
+        chapters=[
+            Chapter(
+                title="Kapitel 1",
+                html=wrap_chapter_html("Kapitel 1", "<p>Text</p>", "de"),
+                file_name="chap_001.xhtml",
+            )
+        ],
+        images=[],
+    )
+    path = build_epub(book, str(tmp_path / f"{title}.epub"))
+    return Path(path).read_bytes()
+
+
+def test_batch_mode_writes_summary(http_server: LocalServer, tmp_path: Path) -> None:
+    for title in ("Eins", "Zwei"):
+        body = _epub_bytes(tmp_path, title)
+        http_server.routes[f"/{title}.epub"] = lambda handler, body=body: send_bytes(
+            handler, body
+        )
+    url_file = tmp_path / "urls.txt"
+    url_file.write_text(
+        f"# reading list\n{http_server.url('/Zwei.epub')}\n\n"
+        f"{http_server.url('/Drei.epub')}\n"
+    )
+    out_dir = tmp_path / "out"
+
+    result = CliRunner().invoke(
+        main,
+        [
+            http_server.url("/Eins.epub"),
+            "--from-file",
+            str(url_file),
+            "--source",
+            "gutenberg",
+            "--out",
+            str(out_dir),
+            "--summary",
+            "-",
+            "--quiet",
+        ],
+    )
+
+    assert result.exit_code == 1
+    summary = json.loads(result.stdout)
+    assert summary["succeeded"] == 2
+    assert summary["failed"] == 1
+    books = summary["books"]
+    assert [book["ok"] for book in books] == [True, True, False]
+    assert books[0]["output_path"] == str(out_dir / "tester-eins.epub")
+    assert books[0]["bytes"] > 0
+    assert "404" in books[2]["error"]
+    assert summary["bytes"] == books[0]["bytes"] + books[1]["bytes"]
+
+
+def test_stats_json_reports_download(http_server: LocalServer, tmp_path: Path) -> None:
+    body = _epub_bytes(tmp_path, "Eins")
+    http_server.routes["/Eins.epub"] = lambda handler: send_bytes(handler, body)
+
+    result = CliRunner().invoke(
+        main,
+        [
+            http_server.url("/Eins.epub"),
+            "--out",
+            str(tmp_path / "out.epub"),
+            "--source",
+            "gutenberg",
+            "--stats",
+            "json",
+            "--quiet",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    stats = json.loads(result.stdout)
+    assert stats["bytes_downloaded"] == len(body)
+    assert stats["events"]["epub_downloaded"]["count"] == 1
+    assert stats["http"]["requests"] == 1
+    assert stats["throughput"] > 0
+
+
+def test_profile_writes_report_next_to_output(
+    http_server: LocalServer, tmp_path: Path
+) -> None:
+    body = _epub_bytes(tmp_path, "Eins")
+    http_server.routes["/Eins.epub"] = lambda handler: send_bytes(handler, body)
+
+    result = CliRunner().invoke(
+        main,
+        [
+            http_server.url("/Eins.epub"),
+            "--out",
+            str(tmp_path / "out.epub"),
+            "--source",
+            "gutenberg",
+            "--profile",
+            "--quiet",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    report = (tmp_path / "out.profile.txt").read_text(encoding="utf-8")
+    assert report.startswith("Wall time: ")
+    assert "connect" in report
+    stacks = (tmp_path / "out.profile.collapsed").read_text(encoding="utf-8")
+    assert any(line.startswith("MainThread;connect ") for line in stacks.splitlines())
+    assert (tmp_path / "out.profile.prof").stat().st_size > 0
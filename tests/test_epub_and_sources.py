@@ -1,8 +1,24 @@
+import os
 import tempfile
+import zipfile
+from pathlib import Path
 
-from gutenberg_dl.epub import build_epub, wrap_chapter_html
-from gutenberg_dl.models import Book, Chapter
-from gutenberg_dl.sources.gutenberg import derive_download_url
+import ebooklib
+from ebooklib import epub
+
+from gutenberg_dl.epub import EpubWriter, build_epub, wrap_chapter_html, write_epub
+from gutenberg_dl.formats import format_paths, write_formats
+from gutenberg_dl.models import Book, BookMetadata, Chapter, ImageAsset
+from gutenberg_dl.net import HttpSession
+from gutenberg_dl.sources.gutenberg import (
+    derive_download_url,
+    download_epub,
+    download_source,
+    read_epub_metadata,
+)
+from gutenberg_dl.sources.registry import BuildOptions
+
+from .conftest import LocalServer, send_bytes
 
 
 def test_derive_download_url_with_images() -> None:
@@ -46,3 +62,260 @@ def test_build_epub_with_empty_chapter() -> None:
         output_path = f"{temp_dir}/test.epub"
         result = build_epub(book, output_path)
         assert result == output_path
+
+
+def test_download_epub_names_file_from_metadata(
+    http_server: LocalServer, tmp_path: Path
+) -> None:
+    book = Book(
+        title="Testbuch",
+        author="Tester",
+        language="de",
+        identifier="test-id",
+        description=None,
+        source_url="https://www.gutenberg.org/ebooks/1",
+        chapters=[
+            Chapter(
+                title="Kapitel 1",
+                html=wrap_chapter_html("Kapitel 1", "<p>Text</p>", "de"),
+                file_name="chap_001.xhtml",
+            )
+        ],
+        images=[],
+    )
+    source_path = build_epub(book, str(tmp_path / "source.epub"))
+    with open(source_path, "rb") as handle:
+        body = handle.read()
+    http_server.routes["/ebooks/1.epub3.images"] = lambda handler: send_bytes(
+        handler, body, content_type="application/epub+zip"
+    )
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    result = download_epub(
+        http_server.url("/ebooks/1.epub3.images"),
+        str(out_dir),
+        False,
+        lambda message: None,
+    )
+
+    assert result.output_path == str(out_dir / "tester-testbuch.epub")
+    assert result.metadata.title == "Testbuch"
+    assert sorted(os.listdir(out_dir)) == ["tester-testbuch.epub"]
+
+
+def test_epub_writer_streams_entries(tmp_path: Path) -> None:
+    metadata = BookMetadata(
+        title="Testbuch",
+        author="Tester",
+        language="de",
+        identifier="test-id",
+        description=None,
+        source_url="https://projekt-gutenberg.org/",
+    )
+    output_path = str(tmp_path / "stream.epub")
+
+    with EpubWriter(output_path, metadata) as writer:
+        writer.add_image(
+            ImageAsset(
+                url="https://example.com/a.png",
+                file_name="images/a.png",
+                media_type="image/png",
+                content=b"png",
+            )
+        )
+        writer.add_chapter(
+            Chapter(
+                title="Kapitel 1",
+                html=wrap_chapter_html(
+                    "Kapitel 1", '<p>A<br><img src="images/a.png">', "de"
+                ),
+                file_name="chap_001.xhtml",
+            )
+        )
+        assert not os.path.exists(output_path)
+
+    with zipfile.ZipFile(output_path) as archive:
+        infos = archive.infolist()
+        assert infos[0].filename == "mimetype"
+        assert infos[0].compress_type == zipfile.ZIP_STORED
+        assert archive.read("mimetype") == b"application/epub+zip"
+        chapter = archive.read("EPUB/chap_001.xhtml").decode("utf-8")
+        opf = archive.read("EPUB/content.opf").decode("utf-8")
+    assert '<img src="images/a.png"/>' in chapter
+    assert 'href="images/a.png" id="image_0" media-type="image/png"' in opf
+    assert '<itemref idref="chapter_0"/>' in opf
+    assert read_epub_metadata(output_path).title == "Testbuch"
+
+
+def test_write_epub_stores_compressed_media_and_keeps_order(tmp_path: Path) -> None:
+    metadata = BookMetadata(
+        title="Testbuch",
+        author=None,
+        language="de",
+        identifier="test-id",
+        description=None,
+        source_url=None,
+    )
+    items: list[Chapter | ImageAsset] = [
+        ImageAsset(
+            url="https://example.com/a.jpg",
+            file_name="images/a.jpg",
+            media_type="image/jpeg",
+            content=os.urandom(4096),
+        ),
+        ImageAsset(
+            url="https://example.com/b.bmp",
+            file_name="images/b.bmp",
+            media_type="image/bmp",
+            content=b"BM" + bytes(4096),
+        ),
+    ]
+    items.extend(
+        Chapter(
+            title=f"Kapitel {index}",
+            html=wrap_chapter_html(f"Kapitel {index}", "<p>Text</p>" * 200, "de"),
+            file_name=f"chap_{index:03d}.xhtml",
+        )
+        for index in range(1, 9)
+    )
+
+    packed_path = write_epub(str(tmp_path / "packed.epub"), metadata, items, workers=3)
+    stored_path = write_epub(
+        str(tmp_path / "stored.epub"), metadata, items, compress_level=0
+    )
+
+    with zipfile.ZipFile(packed_path) as packed, zipfile.ZipFile(stored_path) as stored:
+        assert packed.testzip() is None
+        names = packed.namelist()
+        assert names == stored.namelist()
+        assert names[:5] == [
+            "mimetype",
+            "META-INF/container.xml",
+            "EPUB/style/style.css",
+            "EPUB/images/a.jpg",
+            "EPUB/images/b.bmp",
+        ]
+        assert names[-3:] == ["EPUB/content.opf", "EPUB/toc.ncx", "EPUB/nav.xhtml"]
+        types = {info.filename: info.compress_type for info in packed.infolist()}
+        assert types["mimetype"] == zipfile.ZIP_STORED
+        assert types["EPUB/images/a.jpg"] == zipfile.ZIP_STORED
+        assert types["EPUB/images/b.bmp"] == zipfile.ZIP_DEFLATED
+        assert types["EPUB/chap_008.xhtml"] == zipfile.ZIP_DEFLATED
+        assert {info.compress_type for info in stored.infolist()} == {
+            zipfile.ZIP_STORED
+        }
+        assert stored.testzip() is None
+        for name in names[1:]:
+            if name != "EPUB/content.opf":
+                assert packed.read(name) == stored.read(name)
+    assert read_epub_metadata(packed_path).title == "Testbuch"
+    for path in (packed_path, stored_path):
+        book = epub.read_epub(path)
+        assert book.get_item_with_href("images/a.jpg").content == items[0].content
+        assert len(list(book.get_items_of_type(ebooklib.ITEM_DOCUMENT))) == 9
+
+
+def test_write_formats_renders_text_and_html_from_one_stream(tmp_path: Path) -> None:
+    metadata = BookMetadata(
+        title="Testbuch",
+        author="Tester",
+        language="de",
+        identifier="test-id",
+        description=None,
+        source_url="https://example.com/book",
+    )
+    items = [
+        ImageAsset(
+            url="https://example.com/a.png",
+            file_name="images/a.png",
+            media_type="image/png",
+            content=b"png",
+        ),
+        Chapter(
+            title="Kapitel 1",
+            html=wrap_chapter_html(
+                "Kapitel 1",
+                '<p>Erste  Zeile<br/>zweite</p><img src="images/a.png" alt=""/>'
+                '<p><a href="chap_002.xhtml">weiter</a></p>',
+                "de",
+            ),
+            file_name="chap_001.xhtml",
+        ),
+        Chapter(
+            title="Kapitel 2",
+            html=wrap_chapter_html("Kapitel 2", "<p>Ende</p>", "de"),
+            file_name="chap_002.xhtml",
+        ),
+    ]
+    consumed = []
+
+    def stream():
+        for item in items:
+            consumed.append(item)
+            yield item
+
+    paths = write_formats(
+        format_paths(str(tmp_path / "book.epub"), ("epub", "txt", "html")),
+        metadata,
+        stream(),
+    )
+
+    assert len(consumed) == len(items)
+    assert paths["txt"] == str(tmp_path / "book.txt")
+    text = Path(paths["txt"]).read_text(encoding="utf-8")
+    assert text.startswith("Testbuch\nTester\n")
+    assert "Kapitel 1\n\nErste Zeile\nzweite\n\nweiter" in text
+    page = Path(paths["html"]).read_text(encoding="utf-8")
+    assert '<section id="chap-002">' in page
+    assert 'src="book_files/images/a.png"' in page
+    assert 'href="#chap-002"' in page
+    assert (tmp_path / "book_files" / "images" / "a.png").read_bytes() == b"png"
+    with zipfile.ZipFile(paths["epub"]) as archive:
+        assert archive.testzip() is None
+    assert sorted(os.listdir(tmp_path)) == [
+        "book.epub",
+        "book.html",
+        "book.txt",
+        "book_files",
+    ]
+
+
+def test_download_source_derives_text_from_downloaded_epub(
+    http_server: LocalServer, tmp_path: Path
+) -> None:
+    book = Book(
+        title="Testbuch",
+        author="Tester",
+        language="de",
+        identifier="test-id",
+        description=None,
+        source_url="https://www.gutenberg.org/ebooks/1",
+        chapters=[
+            Chapter(
+                title="Kapitel 1",
+                html=wrap_chapter_html("Kapitel 1", "<p>Text</p>", "de"),
+                file_name="chap_001.xhtml",
+            )
+        ],
+        images=[],
+    )
+    with open(build_epub(book, str(tmp_path / "source.epub")), "rb") as handle:
+        body = handle.read()
+    http_server.routes["/ebooks/1.epub3.images"] = lambda handler: send_bytes(
+        handler, body, content_type="application/epub+zip"
+    )
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    with HttpSession() as session:
+        output_path = download_source(
+            http_server.url("/ebooks/1.epub3.images"),
+            BuildOptions(session=session, out_path=str(out_dir), formats=("txt",)),
+            lambda message: None,
+        )
+
+    assert output_path == str(out_dir / "tester-testbuch.txt")
+    assert sorted(os.listdir(out_dir)) == ["tester-testbuch.txt"]
+    text = Path(output_path).read_text(encoding="utf-8")
+    assert text == "Testbuch\nTester\n\n\nKapitel 1\n\nText\n"
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from gutenberg_dl.images import ImageOptimizer, ImageOptions, optimize_image
+from gutenberg_dl.models import Chapter, ImageAsset
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _image_bytes(size: tuple[int, int], fmt: str) -> bytes:
+    image = Image.new("RGB", size)
+    for x in range(0, size[0], 7):
+        for y in range(0, size[1], 5):
+            image.putpixel((x, y), (x % 256, y % 256, (x * y) % 256))
+    output = io.BytesIO()
+    image.save(output, fmt)
+    return output.getvalue()
+
+
+def test_optimize_image_downscales_jpeg() -> None:
+    content = _image_bytes((800, 400), "JPEG")
+
+    optimized, media_type = optimize_image(
+        content, "image/jpeg", ImageOptions(max_dimension=200, jpeg_quality=70)
+    )
+
+    assert media_type == "image/jpeg"
+    with Image.open(io.BytesIO(optimized)) as image:
+        assert image.size == (200, 100)
+
+
+def test_optimize_image_keeps_unsupported_types() -> None:
+    content = b"<svg xmlns='http://www.w3.org/2000/svg'/>"
+
+    assert optimize_image(content, "image/svg+xml", ImageOptions()) == (
+        content,
+        "image/svg+xml",
+    )
+
+
+def test_optimizer_renames_converted_images() -> None:
+    items = [
+        ImageAsset(
+            url="https://example.org/scan.bmp",
+            file_name="images/scan.bmp",
+            media_type="image/bmp",
+            content=_image_bytes((64, 64), "BMP"),
+        ),
+        Chapter(
+            title="Kapitel",
+            html=(
+                '<p><img alt="x" src="images/scan.bmp"/>'
+                '<a href="images/scan.bmp" title="images/scan.bmp">'
+                '"images/scan.bmp"</a></p>'
+            ),
+            file_name="chapter_1.xhtml",
+        ),
+    ]
+
+    with ImageOptimizer(ImageOptions(), workers=2) as optimizer:
+        result = list(optimizer.process(items))
+
+    image, chapter = result
+    assert isinstance(image, ImageAsset)
+    assert isinstance(chapter, Chapter)
+    assert image.file_name == "images/scan.jpg"
+    assert image.media_type == "image/jpeg"
+    assert chapter.html == (
+        '<p><img alt="x" src="images/scan.jpg"/>'
+        '<a href="images/scan.bmp" title="images/scan.bmp">'
+        '"images/scan.bmp"</a></p>'
+    )
+    assert optimizer.stats.images == 1
+    assert optimizer.stats.bytes_after < optimizer.stats.bytes_before
+
+
+def test_optimizer_keeps_images_pillow_cannot_decode() -> None:
+    png = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+    truncated = _image_bytes((64, 64), "JPEG")[:200]
+    items = [
+        ImageAsset(
+            url=f"https://example.org/{name}",
+            file_name=f"images/{name}",
+            media_type=media_type,
+            content=content,
+        )
+        for name, media_type, content in [
+            ("broken.png", "image/png", png),
+            ("cut.jpg", "image/jpeg", truncated),
+            ("garbage.bmp", "image/bmp", b"not an image"),
+        ]
+    ]
+
+    with ImageOptimizer(ImageOptions(), workers=2) as optimizer:
+        result = list(optimizer.process(items))
+
+    assert result == items
+    assert optimizer.stats.images == 3
+    assert optimizer.stats.optimized == 0
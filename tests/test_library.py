@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from gutenberg_dl.epub import wrap_chapter_html, write_epub
+from gutenberg_dl.library import scan_library
+from gutenberg_dl.models import BookMetadata, Chapter
+
+
+def _write_book(path: Path, title: str) -> None:
+    metadata = BookMetadata(
+        title=title,
+        author="Tester",
+        language="de",
+        identifier=f"id-{title}",
+        description=None,
+        source_url="https://www.gutenberg.org/",
+    )
+    chapter = Chapter(
+        title="Kapitel 1",
+        html=wrap_chapter_html("Kapitel 1", "<p>Text</p>", "de"),
+        file_name="chap_001.xhtml",
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_epub(str(path), metadata, [chapter])
+
+
+def test_scan_library_caches_unchanged_files(tmp_path: Path) -> None:
+    library = tmp_path / "library"
+    index_path = str(tmp_path / "index.sqlite")
+    _write_book(library / "a" / "eins.epub", "Eins")
+    _write_book(library / "b" / "zwei.epub", "Zwei")
+    (library / "broken.epub").write_bytes(b"not a zip")
+
+    first = scan_library(str(library), index_path, workers=2)
+
+    assert (first.scanned, first.cached, first.removed) == (3, 0, 0)
+    assert first.errors == 1
+    eins = first.entries[0]
+    assert eins.path == str(library / "a" / "eins.epub")
+    assert (eins.title, eins.author, eins.language, eins.identifier) == (
+        "Eins",
+        "Tester",
+        "de",
+        "id-Eins",
+    )
+
+    _write_book(library / "b" / "zwei.epub", "Zwei neu")
+    stat = os.stat(library / "b" / "zwei.epub")
+    os.utime(library / "b" / "zwei.epub", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    (library / "broken.epub").unlink()
+
+    second = scan_library(str(library), index_path, workers=2)
+
+    assert (second.scanned, second.cached, second.removed) == (1, 1, 1)
+    assert [entry.title for entry in second.entries] == ["Eins", "Zwei neu"]
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+
+import pytest
+
+from gutenberg_dl.mirror import mirror_books, parse_id_ranges
+from gutenberg_dl.net import HttpSession
+
+from .conftest import LocalServer, Route, send_bytes
+
+
+def test_parse_id_ranges() -> None:
+    assert parse_id_ranges(["3-5,1", "4", " 10 "]) == [1, 3, 4, 5, 10]
+    with pytest.raises(ValueError):
+        parse_id_ranges(["5-3"])
+
+
+def test_mirror_skips_unchanged_books(http_server: LocalServer, tmp_path: Path) -> None:
+    books = {1: b"epub one", 2: b"epub two"}
+
+    def route(book_id: int) -> Route:
+        def handler(request: BaseHTTPRequestHandler) -> None:
+            body = books[book_id]
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if request.headers.get("If-None-Match") == etag:
+                send_bytes(request, b"", status=304)
+                return
+            send_bytes(
+                request,
+                body,
+                content_type="application/epub+zip",
+                headers={"ETag": etag},
+            )
+
+        return handler
+
+    for book_id in books:
+        http_server.routes[f"/ebooks/{book_id}.epub3.images"] = route(book_id)
+    base_url = http_server.url("")
+    directory = tmp_path / "mirror"
+
+    with HttpSession() as session:
+        first = mirror_books(
+            [1, 2, 3], str(directory), workers=2, session=session, base_url=base_url
+        )
+        books[2] = b"epub two, revised"
+        second = mirror_books(
+            [1, 2, 3], str(directory), workers=2, session=session, base_url=base_url
+        )
+
+    assert (first.downloaded, first.current, first.missing) == (2, 0, 1)
+    assert (second.downloaded, second.current, second.missing) == (1, 1, 1)
+    assert (directory / "2" / "pg2-images.epub").read_bytes() == b"epub two, revised"
+    assert not (directory / "3").exists()
+    manifest = json.loads((directory / "manifest.json").read_text())
+    entry = manifest["books"]["2"]
+    assert entry["size"] == len(books[2])
+    assert entry["sha256"] == hashlib.sha256(books[2]).hexdigest()
+    assert entry["path"] == "2/pg2-images.epub"
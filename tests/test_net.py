@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import gzip
+import http.client
+import os
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.error import HTTPError
+
+import pytest
+
+from gutenberg_dl.cache import ResponseCache
+from gutenberg_dl.decoding import (
+    DecompressionLimitError,
+    decode_body,
+    supported_encodings,
+)
+from gutenberg_dl.net import HttpSession, download_file, fetch_bytes
+from gutenberg_dl.ratelimit import (
+    HostLimiter,
+    RateLimiter,
+    RetryPolicy,
+    parse_retry_after,
+)
+
+from .conftest import LocalServer, Route, send_bytes
+
+
+def test_session_reuses_keep_alive_connections(http_server: LocalServer) -> None:
+    http_server.routes["/page"] = lambda handler: send_bytes(handler, b"hello")
+
+    with HttpSession() as session:
+        for _ in range(3):
+            result = fetch_bytes(http_server.url("/page"), session=session)
+            assert result.content == b"hello"
+            assert result.content_type == "text/html; charset=utf-8"
+
+        assert session.stats.requests == 3
+        assert session.stats.connections_opened == 1
+        assert session.stats.connections_reused == 2
+
+
+def test_session_follows_redirects(http_server: LocalServer) -> None:
+    http_server.routes["/old"] = lambda handler: send_bytes(
+        handler, b"", status=301, headers={"Location": "/new"}
+    )
+    http_server.routes["/new"] = lambda handler: send_bytes(handler, b"moved")
+
+    with HttpSession() as session:
+        result = session.fetch(http_server.url("/old"))
+
+    assert result.content == b"moved"
+    assert result.final_url == http_server.url("/new")
+
+
+def test_session_raises_http_error(http_server: LocalServer) -> None:
+    with HttpSession() as session, pytest.raises(HTTPError) as excinfo:
+        session.fetch(http_server.url("/missing"))
+
+    assert excinfo.value.code == 404
+
+
+def test_session_revalidates_cached_responses(
+    http_server: LocalServer, tmp_path: Path
+) -> None:
+    def page(handler: BaseHTTPRequestHandler) -> None:
+        if handler.headers.get("If-None-Match") == '"v1"':
+            send_bytes(handler, b"", status=304)
+            return
+        send_bytes(handler, b"chapter", headers={"ETag": '"v1"'})
+
+    http_server.routes["/chapter"] = page
+    cache = ResponseCache(str(tmp_path))
+
+    with HttpSession(cache=cache) as session:
+        first = session.fetch(http_server.url("/chapter"))
+    with HttpSession(cache=ResponseCache(str(tmp_path))) as session:
+        second = session.fetch(http_server.url("/chapter"))
+        assert session.stats.cache_hits == 1
+
+    assert first == second
+    assert http_server.requests[-1][1]["If-None-Match"] == '"v1"'
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = ResponseCache(str(tmp_path), max_bytes=10)
+    for index, url in enumerate(["a", "b"]):
+        cache.store(url, url, url.encode() * 4, None, f'"{url}"', None)
+        os.utime(cache._entry_path(url), (1000 + index, 1000 + index))
+    entry_a = cache.lookup("a")
+    assert entry_a is not None
+    assert cache.read(entry_a) == b"aaaa"
+
+    cache.store("c", "c", b"cccc", None, '"c"', None)
+
+    assert cache.lookup("a") is not None
+    assert cache.lookup("b") is None
+    assert cache.lookup("c") is not None
+
+
+def _ranged_file(body: bytes) -> Route:
+    def route(handler: BaseHTTPRequestHandler) -> None:
+        headers = {"ETag": '"epub-v1"', "Accept-Ranges": "bytes"}
+        range_header = handler.headers.get("Range")
+        if range_header and handler.headers.get("If-Range") == '"epub-v1"':
+            start = int(range_header.split("=", 1)[1].rstrip("-"))
+            headers["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+            send_bytes(handler, body[start:], status=206, headers=headers)
+            return
+        send_bytes(handler, body, content_type="application/epub+zip", headers=headers)
+
+    return route
+
+
+def test_download_file_streams_to_destination(
+    http_server: LocalServer, tmp_path: Path
+) -> None:
+    body = os.urandom(300_000)
+    http_server.routes["/book.epub"] = _ranged_file(body)
+    dest_path = tmp_path / "book.epub"
+
+    with HttpSession() as session:
+        result = download_file(
+            http_server.url("/book.epub"), str(dest_path), session=session
+        )
+
+    assert dest_path.read_bytes() == body
+    assert result.size == len(body)
+    assert not result.resumed
+    assert not (tmp_path / "book.epub.part").exists()
+
+
+def test_download_file_resumes_partial_file(
+    http_server: LocalServer, tmp_path: Path
+) -> None:
+    body = os.urandom(300_000)
+    http_server.routes["/book.epub"] = _ranged_file(body)
+    dest_path = tmp_path / "book.epub"
+    (tmp_path / "book.epub.part").write_bytes(body[:1000])
+    (tmp_path / "book.epub.part.validator").write_text('"epub-v1"')
+
+    with HttpSession() as session:
+        result = download_file(
+            http_server.url("/book.epub"), str(dest_path), session=session
+        )
+
+    assert result.resumed
+    assert dest_path.read_bytes() == body
+    assert http_server.requests[-1][1]["Range"] == "bytes=1000-"
+
+
+def test_session_retries_after_pushback(http_server: LocalServer) -> None:
+    responses = iter([429, 503, 200])
+
+    def flaky(handler: BaseHTTPRequestHandler) -> None:
+        status = next(responses)
+        body = b"ok" if status == 200 else b"slow down"
+        send_bytes(handler, body, status=status, headers={"Retry-After": "0"})
+
+    http_server.routes["/flaky"] = flaky
+    limiter = RateLimiter(max_connections=4)
+
+    with HttpSession(rate_limiter=limiter) as session:
+        result = session.fetch(http_server.url("/flaky"))
+
+    assert result.content == b"ok"
+    assert session.stats.requests == 3
+    host = limiter.host("127.0.0.1")
+    assert host.limit < 4
+    assert host.active == 0
+
+
+def test_session_gives_up_after_retry_attempts(http_server: LocalServer) -> None:
+    http_server.routes["/busy"] = lambda handler: send_bytes(
+        handler, b"busy", status=503
+    )
+    retry = RetryPolicy(attempts=2, backoff=0.01)
+
+    with HttpSession(retry=retry) as session, pytest.raises(HTTPError) as excinfo:
+        session.fetch(http_server.url("/busy"))
+
+    assert excinfo.value.code == 503
+    assert session.stats.requests == 2
+
+
+def test_session_shares_retry_budget_with_truncated_bodies(
+    http_server: LocalServer,
+) -> None:
+    statuses = iter([503, 200, 503, 200])
+
+    def truncating(handler: BaseHTTPRequestHandler) -> None:
+        status = next(statuses)
+        if status == 503:
+            send_bytes(handler, b"busy", status=503)
+            return
+        handler.send_response(200)
+        handler.send_header("Content-Length", "100")
+        handler.end_headers()
+        handler.wfile.write(b"cut short")
+        handler.close_connection = True
+
+    http_server.routes["/cut"] = truncating
+    retry = RetryPolicy(attempts=4, backoff=0.01)
+
+    with HttpSession(retry=retry) as session, pytest.raises(http.client.IncompleteRead):
+        session.fetch(http_server.url("/cut"))
+
+    assert session.stats.requests == 4
+
+
+def test_rate_limiter_paces_requests() -> None:
+    limiter = HostLimiter(rate=50, burst=1)
+    started = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+        limiter.release()
+
+    assert time.monotonic() - started >= 0.09
+
+
+def test_parse_retry_after_accepts_seconds_and_dates() -> None:
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+
+
+def test_session_decompresses_encoded_responses(http_server: LocalServer) -> None:
+    body = b"<p>Kapitel</p>" * 2000
+    seen: list[str | None] = []
+
+    def page(handler: BaseHTTPRequestHandler) -> None:
+        seen.append(handler.headers.get("Accept-Encoding"))
+        send_bytes(handler, gzip.compress(body), headers={"Content-Encoding": "gzip"})
+
+    def raw_deflate(handler: BaseHTTPRequestHandler) -> None:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        encoded = compressor.compress(body) + compressor.flush()
+        send_bytes(handler, encoded, headers={"Content-Encoding": "deflate"})
+
+    http_server.routes["/gzip"] = page
+    http_server.routes["/deflate"] = raw_deflate
+
+    with HttpSession() as session:
+        assert session.fetch(http_server.url("/gzip")).content == body
+        assert session.fetch(http_server.url("/deflate")).content == body
+
+    assert seen[0] is not None and "gzip" in seen[0]
+    assert session.stats.decompressed_bytes == 2 * len(body)
+    assert 0 < session.stats.compressed_bytes < len(body) // 10
+
+
+@pytest.mark.parametrize("encoding", ["br", "zstd"])
+def test_decode_body_rejects_corrupt_optional_encodings(encoding: str) -> None:
+    if encoding not in supported_encodings():
+        pytest.skip(f"no {encoding} decoder installed")
+
+    with pytest.raises(ValueError, match=f"Could not decode {encoding} body"):
+        decode_body([b"definitely not compressed" * 10], encoding)
+
+
+def test_session_rejects_decompression_bombs(http_server: LocalServer) -> None:
+    bomb = gzip.compress(bytes(8 * 1024 * 1024))
+    http_server.routes["/bomb"] = lambda handler: send_bytes(
+        handler, bomb, headers={"Content-Encoding": "gzip"}
+    )
+
+    session = HttpSession(max_decoded_size=1024 * 1024)
+    with session, pytest.raises(DecompressionLimitError):
+        session.fetch(http_server.url("/bomb"))
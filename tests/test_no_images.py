@@ -12,15 +12,12 @@ def test_parse_chapter_content_no_images_removes_imgs() -> None:
       </body>
     </html>
     """
-    images: dict[str, projekt_source.ImageAsset] = {}
-    title, body_html = projekt_source._parse_chapter_content(
+    title, body_html, image_urls = projekt_source._parse_chapter_content(
         html,
         "https://example.com/base",
         True,
-        images,
-        set(),
     )
 
     assert title is None
     assert "<img" not in body_html
-    assert images == {}
+    assert image_urls == []
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from gutenberg_dl import profiling
+from gutenberg_dl.profiling import Profiler, profiled, reset_worker, span
+
+
+@profiled("outer")
+def _outer() -> None:
+    time.sleep(0.01)
+    with span("inner"):
+        time.sleep(0.02)
+
+
+def _profiler_in_worker() -> bool:
+    _outer()
+    return profiling._active is not None
+
+
+def test_profiler_records_nested_spans_only_while_active() -> None:
+    _outer()
+
+    with Profiler() as profiler:
+        _outer()
+        _outer()
+    _outer()
+
+    assert set(profiler.spans) == {"outer", "inner"}
+    outer = profiler.spans["outer"]
+    inner = profiler.spans["inner"]
+    assert outer.count == inner.count == 2
+    assert outer.self_seconds == pytest.approx(outer.seconds - inner.seconds)
+    assert inner.self_seconds == pytest.approx(inner.seconds)
+    paths = {
+        line.rsplit(" ", 1)[0] for line in profiler.collapsed_stacks().splitlines()
+    }
+    assert paths == {"MainThread", "MainThread;outer", "MainThread;outer;inner"}
+
+
+def test_worker_processes_do_not_record_into_inherited_profiler() -> None:
+    executor = ProcessPoolExecutor(max_workers=1, initializer=reset_worker)
+    with Profiler() as profiler, executor:
+        assert executor.submit(_profiler_in_worker).result(timeout=30) is False
+
+    assert profiler.spans == {}
@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import hashlib
+import random
+import re
+import time
+from pathlib import Path
+
+import pytest
+
+from gutenberg_dl.epub import write_epub
+from gutenberg_dl.events import (
+    CHAPTER_FETCHED,
+    CHAPTER_PARSED,
+    EPUB_WRITTEN,
+    IMAGE_FETCHED,
+    PAGE_FETCHED,
+    Metrics,
+)
+from gutenberg_dl.models import Chapter
+from gutenberg_dl.net import FetchResult, HttpSession
+from gutenberg_dl.sources import projekt as projekt_source
+
+BOOK_URL = "https://projekt-gutenberg.org/authors/test/books/buch/"
+
+
+def _book_page(chapter_count: int) -> bytes:
+    links = "".join(
+        f'<a href="chapter-{index}/">'
+        f'<span class="book-reader__chapter-title">Kapitel {index}</span></a>'
+        for index in range(1, chapter_count + 1)
+    )
+    return f"""
+    <html lang="de">
+      <body>
+        <div class="book-reader" data-gutenberg-book-id="4711">
+          <h1 class="book-reader__title">Testbuch</h1>
+          <a class="book-reader__author-link">Tester</a>
+          <nav class="book-reader__chapter-list">{links}</nav>
+        </div>
+      </body>
+    </html>
+    """.encode()
+
+
+def _chapter_page(index: int) -> bytes:
+    return f"""
+    <html>
+      <body>
+        <div class="book-reader__chapter-content-wrapper">
+          <p>Text {index}</p>
+          <img src="/images/figure.png" />
+          <img src="/images/chapter-{index}/figure.png" />
+        </div>
+      </body>
+    </html>
+    """.encode()
+
+
+@pytest.fixture
+def fake_site(monkeypatch: pytest.MonkeyPatch) -> dict[str, bytes]:
+    chapter_count = 8
+    overrides: dict[str, bytes] = {}
+
+    def fake_fetch_bytes(
+        url: str, timeout: int = 30, session: HttpSession | None = None
+    ) -> FetchResult:
+        time.sleep(random.uniform(0, 0.01))
+        if url in overrides:
+            content = overrides[url]
+            content_type = "text/html"
+        elif url == BOOK_URL:
+            content = _book_page(chapter_count)
+            content_type = "text/html"
+        elif url.endswith(".png"):
+            content = url.encode()
+            content_type = "image/png"
+        else:
+            index = int(url.rstrip("/").rsplit("-", 1)[1])
+            content = _chapter_page(index)
+            content_type = "text/html"
+        etag = f'"{hashlib.sha1(content).hexdigest()}"'
+        return FetchResult(
+            content=content, final_url=url, content_type=content_type, etag=etag
+        )
+
+    def fake_revalidate_bytes(
+        url: str,
+        etag: str | None,
+        last_modified: str | None,
+        timeout: int = 30,
+        session: HttpSession | None = None,
+    ) -> FetchResult | None:
+        result = fake_fetch_bytes(url, timeout=timeout, session=session)
+        return None if result.etag == etag else result
+
+    monkeypatch.setattr(projekt_source, "fetch_bytes", fake_fetch_bytes)
+    monkeypatch.setattr(projekt_source, "revalidate_bytes", fake_revalidate_bytes)
+    return overrides
+
+
+@pytest.mark.usefixtures("fake_site")
+def test_fetch_book_parallel_matches_serial() -> None:
+    serial = projekt_source.fetch_book(BOOK_URL, False, lambda message: None)
+    parallel = projekt_source.fetch_book(BOOK_URL, False, lambda message: None, jobs=4)
+
+    assert [chapter.file_name for chapter in parallel.chapters] == [
+        f"chap_{index:03d}.xhtml" for index in range(1, 9)
+    ]
+    assert parallel.chapters == serial.chapters
+    assert parallel.images == serial.images
+    assert parallel.images[0].file_name == "images/figure.png"
+    assert parallel.images[1].file_name == "images/figure-1.png"
+
+
+def test_fetch_book_fetches_shared_images_once(
+    monkeypatch: pytest.MonkeyPatch, fake_site: dict[str, bytes]
+) -> None:
+    fetched: list[str] = []
+    fake_fetch_bytes = projekt_source.fetch_bytes
+
+    def counting_fetch_bytes(
+        url: str, timeout: int = 30, session: HttpSession | None = None
+    ) -> FetchResult:
+        fetched.append(url)
+        return fake_fetch_bytes(url, timeout=timeout, session=session)
+
+    monkeypatch.setattr(projekt_source, "fetch_bytes", counting_fetch_bytes)
+
+    book = projekt_source.fetch_book(
+        BOOK_URL, False, lambda message: None, image_jobs=3
+    )
+
+    shared_url = "https://projekt-gutenberg.org/images/figure.png"
+    assert fetched.count(shared_url) == 1
+    assert len(book.images) == 9
+    for chapter in book.chapters:
+        assert 'src="images/figure.png"' in chapter.html
+        assert projekt_source.IMAGE_PLACEHOLDER not in chapter.html
+
+
+def test_image_prefetcher_merges_identical_content(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    def fake_fetch_bytes(
+        url: str, timeout: int = 30, session: HttpSession | None = None
+    ) -> FetchResult:
+        content = b"unique" if "photo" in url else b"ornament"
+        return FetchResult(content=content, final_url=url, content_type="image/png")
+
+    monkeypatch.setattr(projekt_source, "fetch_bytes", fake_fetch_bytes)
+    urls = [
+        "https://cdn.example.com/a/vignette.png",
+        "https://example.com/photo.png",
+        "https://example.com/b/vignette.png?v=2",
+    ]
+
+    with projekt_source.ImagePrefetcher(2) as prefetcher:
+        for url in urls:
+            prefetcher.request(url)
+        names, assets = prefetcher.resolve(urls)
+
+    assert names[urls[0]] == names[urls[2]] == "images/vignette.png"
+    assert names[urls[1]] == "images/photo.png"
+    assert [asset.url for asset in assets] == urls[:2]
+    assert prefetcher.duplicates == 1
+    assert prefetcher.duplicate_bytes == len(b"ornament")
+
+
+@pytest.mark.usefixtures("fake_site")
+def test_stream_book_yields_images_before_their_chapter() -> None:
+    metadata, items = projekt_source.stream_book(
+        BOOK_URL, False, lambda message: None, jobs=3
+    )
+
+    assert metadata.title == "Testbuch"
+    assert metadata.identifier == "4711"
+    written: set[str] = set()
+    chapters = 0
+    for item in items:
+        if isinstance(item, Chapter):
+            chapters += 1
+            for name in re.findall(r'src="([^"]+)"', item.html):
+                assert name in written
+        else:
+            written.add(item.file_name)
+    assert chapters == 8
+
+
+def test_fetch_book_resumes_from_checkpoint(
+    monkeypatch: pytest.MonkeyPatch, fake_site: dict[str, bytes], tmp_path: Path
+) -> None:
+    fake_fetch_bytes = projekt_source.fetch_bytes
+    expected = projekt_source.fetch_book(BOOK_URL, False, lambda message: None)
+    fetched: list[str] = []
+    failing = {BOOK_URL + "chapter-5/"}
+
+    def flaky_fetch_bytes(
+        url: str, timeout: int = 30, session: HttpSession | None = None
+    ) -> FetchResult:
+        if url in failing:
+            raise ConnectionError("connection reset")
+        fetched.append(url)
+        return fake_fetch_bytes(url, timeout=timeout, session=session)
+
+    monkeypatch.setattr(projekt_source, "fetch_bytes", flaky_fetch_bytes)
+    with pytest.raises(ConnectionError):
+        projekt_source.fetch_book(
+            BOOK_URL, False, lambda message: None, work_dir=str(tmp_path)
+        )
+
+    failing.clear()
+    fetched.clear()
+    book = projekt_source.fetch_book(
+        BOOK_URL, False, lambda message: None, work_dir=str(tmp_path), resume=True
+    )
+
+    assert book.chapters == expected.chapters
+    assert book.images == expected.images
+    assert BOOK_URL + "chapter-1/" not in fetched
+    assert BOOK_URL + "chapter-5/" in fetched
+    assert "https://projekt-gutenberg.org/images/figure.png" not in fetched
+
+
+def test_sync_book_reparses_only_changed_chapters(
+    monkeypatch: pytest.MonkeyPatch, fake_site: dict[str, bytes], tmp_path: Path
+) -> None:
+    first = projekt_source.sync_book(
+        BOOK_URL, False, lambda message: None, str(tmp_path)
+    )
+    assert first.changed == list(range(1, 9))
+    assert not first.up_to_date
+    list(first.items)
+    first.commit()
+
+    parsed: list[str] = []
+    parse_chapter_content = projekt_source._parse_chapter_content
+
+    def counting_parse(
+        html: bytes, base_url: str, no_images: bool
+    ) -> tuple[str | None, str, list[str]]:
+        parsed.append(base_url)
+        return parse_chapter_content(html, base_url, no_images)
+
+    monkeypatch.setattr(projekt_source, "_parse_chapter_content", counting_parse)
+    unchanged = projekt_source.sync_book(
+        BOOK_URL, False, lambda message: None, str(tmp_path)
+    )
+    assert unchanged.changed == []
+    assert unchanged.up_to_date
+    assert parsed == []
+
+    chapter_url = BOOK_URL + "chapter-3/"
+    fake_site[chapter_url] = _chapter_page(3).replace(b"Text 3", b"Korrigiert")
+    changed = projekt_source.sync_book(
+        BOOK_URL, False, lambda message: None, str(tmp_path)
+    )
+    chapters = [item for item in changed.items if isinstance(item, Chapter)]
+
+    assert changed.changed == [3]
+    assert not changed.up_to_date
+    assert parsed == [chapter_url]
+    assert "Korrigiert" in chapters[2].html
+    assert "Text 4" in chapters[3].html
+
+
+@pytest.mark.usefixtures("fake_site")
+def test_stream_book_reports_events(tmp_path: Path) -> None:
+    metrics = Metrics()
+
+    metadata, items = projekt_source.stream_book(
+        BOOK_URL, False, lambda message: None, jobs=2, on_event=metrics
+    )
+    write_epub(str(tmp_path / "book.epub"), metadata, items, on_event=metrics)
+
+    assert metrics.phase(PAGE_FETCHED).count == 1
+    assert metrics.phase(CHAPTER_FETCHED).count == 8
+    assert metrics.phase(CHAPTER_PARSED).count == 8
+    assert metrics.phase(IMAGE_FETCHED).count == 9
+    written = metrics.phase(EPUB_WRITTEN)
+    assert written.count == 1
+    assert written.bytes == (tmp_path / "book.epub").stat().st_size
+    summary = metrics.summary(elapsed=1.0)
+    assert summary["bytes_downloaded"] == summary["throughput"] > 0
+    assert summary["parse_seconds"] > 0
+
+
+@pytest.mark.usefixtures("fake_site")
+def test_fetch_book_parse_workers_match_serial() -> None:
+    metrics = Metrics()
+    serial = projekt_source.fetch_book(BOOK_URL, False, lambda message: None)
+    pooled = projekt_source.fetch_book(
+        BOOK_URL, False, lambda message: None, jobs=3, parse_workers=2, on_event=metrics
+    )
+
+    assert pooled == serial
+    assert metrics.phase(CHAPTER_PARSED).count == 8
+
+
+@pytest.mark.usefixtures("fake_site")
+def test_fetch_book_stream_parser_matches_default() -> None:
+    default = projekt_source.fetch_book(BOOK_URL, False, lambda message: None)
+    streamed = projekt_source.fetch_book(
+        BOOK_URL, False, lambda message: None, jobs=3, parser="stream"
+    )
+
+    assert streamed == default
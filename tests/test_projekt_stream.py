@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import pytest
+
+from benchmarks.mock_site import BOOK_PATH, MockSite, SiteConfig
+from gutenberg_dl.sources import projekt as projekt_source
+from gutenberg_dl.sources.projekt_stream import parse_chapter_stream
+
+BASE_URL = "https://projekt-gutenberg.org/authors/test/books/buch/kapitel-1/"
+
+PAGES = [
+    # Heading with script, ruby and CDATA strings; escaping and quoting.
+    b"""<html><head><title>t</title></head><body>
+    <h1 class="book-reader__chapter-heading"> Erstes <script>x()</script>
+      <rt>r</rt>&amp; <![CDATA[Kapitel]]> </h1>
+    <div class="x  book-reader__chapter-content-wrapper">a &lt; b<!--top-->
+      <p class=" a  b ">x &lt; y &quot;z&quot;<!---->  <br></br><br/><x/></p>
+      <a rel=" next  prev " title="it's &quot;q&quot;" href="?a=1&amp;b=2">l</a>
+      <pre>  </pre><textarea> </textarea>&#65;&#x42;&#1234567;&#xZZ;&bogus;&nbsp
+      <style>p { color: red }</style><meta charset="latin-1">
+      <table><tr><td headers=" h1  h2">c</td></tr></table>
+      <p>unclosed<span>also unclosed
+    </div><p>after</p></body></html>""",
+    # Lazy images, data URIs, srcsets and <noscript> fallbacks.
+    b"""<div class="book-reader__chapter-content-wrapper">
+    <p><img src="a.png" srcset="b.png 2x" alt='say "hi"' class="  c  d ">
+    <img data-src="lazy.png" src="data:image/gif;base64,R0lG">
+    <img src="data:image/gif;base64,R0lG"><span>between</span>
+    <noscript><img src="fallback.png"></noscript>
+    <img data-lazy-srcset=" , "><img src=""><noscript></noscript>
+    <noscript><p><img src="nested.png"></p></noscript></p>
+    <img alt="lost"><p><noscript><img src="elsewhere.png"></noscript></p>
+    <img data-srcset="set.png 1x, set2.png 2x" SRC="a.png">
+    </div>""",
+    # The wrapper wins over an earlier fallback element.
+    b"""<div class="book-reader__chapter-text"><p>old<img src="i.png"></p></div>
+    <div class="book-reader__chapter-content-wrapper"><p>new<img src="j.png">
+    <img src="i.png"></p></div>""",
+    # Fallback element, stray end tags and a heading after the content.
+    b"""<div class="book-reader__chapter-text"><p>only<img src="i.png"></div>
+    </span></p>tail<h2 class="book-reader__chapter-heading">Sp\xc3\xa4t</h2>""",
+    b"""<?xml version="1.0"?><!DOCTYPE html>
+    <div class="book-reader__chapter-content-wrapper"><!DOCTYPE x><?pi?>
+    <p>q</p><![if x]></div>""",
+    "<div class='book-reader__chapter-content-wrapper'><p>\xfc &auml;</p></div>".encode(
+        "latin-1"
+    ),
+    b"<p>no content</p>",
+]
+
+
+@pytest.mark.parametrize("no_images", [False, True])
+@pytest.mark.parametrize("page", PAGES)
+@pytest.mark.filterwarnings("ignore::bs4.XMLParsedAsHTMLWarning")
+def test_stream_parser_matches_soup(page: bytes, no_images: bool) -> None:
+    expected = projekt_source._parse_chapter_content(page, BASE_URL, no_images)
+
+    assert parse_chapter_stream(page, BASE_URL, no_images) == expected
+
+
+def test_stream_parser_matches_soup_on_mock_chapters() -> None:
+    config = SiteConfig(chapters=3, paragraphs=5, images_per_chapter=2)
+    with MockSite(config) as site:
+        pages = site.chapter_pages()
+        base_url = site.url(BOOK_PATH)
+
+    for page in pages:
+        expected = projekt_source._parse_chapter_content(page, base_url, False)
+        assert expected[2]
+        assert projekt_source._parse_chapter(page, base_url, False, "stream") == (
+            expected
+        )
+
+
+def test_parse_chapter_rejects_unknown_parser() -> None:
+    with pytest.raises(ValueError, match="lxml"):
+        projekt_source._parse_chapter(PAGES[0], BASE_URL, False, "lxml")
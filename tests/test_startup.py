@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from pathlib import Path
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from benchmarks.startup import SCENARIOS, heavy_modules
+from gutenberg_dl.cli import main
+from gutenberg_dl.sources import registry
+from gutenberg_dl.sources.registry import BuildOptions, Source
+
+
+def test_gutenberg_downloads_do_not_import_parsers() -> None:
+    assert heavy_modules(SCENARIOS["import_cli"]) == []
+    assert heavy_modules(SCENARIOS["gutenberg_source"]) == []
+    assert "bs4" in heavy_modules(SCENARIOS["projekt_source"])
+
+
+def test_cli_defaults_match_lazily_imported_modules() -> None:
+    from gutenberg_dl import catalog, images, library, mirror
+
+    def default(command: click.Command, name: str) -> object:
+        return next(param.default for param in command.params if param.name == name)
+
+    download = main.commands["download"]
+    assert default(download, "max_image_dimension") == images.DEFAULT_MAX_DIMENSION
+    assert default(download, "jpeg_quality") == images.DEFAULT_JPEG_QUALITY
+    query = main.commands["catalog"].commands["query"]  # type: ignore[attr-defined]
+    assert default(query, "db_path") == catalog.DEFAULT_CATALOG_DB
+    assert default(main.commands["scan"], "index_path") == library.DEFAULT_LIBRARY_INDEX
+    assert default(main.commands["mirror"], "base_url") == mirror.DEFAULT_BASE_URL
+
+
+def write_marker(url: str, options: BuildOptions, log: Callable[[str], None]) -> str:
+    assert options.out_path is not None
+    path = Path(options.out_path) / "plugin.epub"
+    path.write_text(url)
+    return str(path)
+
+
+def test_plugin_source_is_detected_by_host(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    plugin = Source("example", ("books.example.org",), f"{__name__}:write_marker")
+    monkeypatch.setattr(registry, "plugin_sources", lambda: (plugin,))
+
+    assert registry.detect_source("https://books.example.org/1") == plugin
+    assert registry.find_source("EXAMPLE") == plugin
+    assert registry.detect_source("https://example.com/") is None
+
+    result = CliRunner().invoke(
+        main, ["https://books.example.org/1", "--out", str(tmp_path) + "/"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / "plugin.epub").read_text() == "https://books.example.org/1"
+
+
+def test_unsupported_url_reads_installed_entry_points() -> None:
+    registry.plugin_sources.cache_clear()
+    try:
+        assert all(isinstance(source, Source) for source in registry.plugin_sources())
+        assert registry.detect_source("https://example.com/book") is None
+        assert registry.find_source("no-such-source") is None
+
+        result = CliRunner().invoke(main, ["https://example.com/book"])
+    finally:
+        registry.plugin_sources.cache_clear()
+
+    assert result.exit_code == 1
+    assert "Unsupported URL" in result.output